@@ -0,0 +1,236 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from bs4 import BeautifulSoup
+
+# Benchmarks every site parser over the recorded chapter pages in
+# benchmarks/fixtures/ (chapters/second and peak memory per parse), plus the
+# JSON load/clean/validate pipeline on a synthetic full Bible. Results are
+# printed as JSON so runs can be compared before and after performance work:
+#
+#   python3 benchmarks/bench_parsers.py --output bench_before.json
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+SCRIPTS_DIR = os.path.join(BENCH_DIR, "..", "scripts")
+sys.path.insert(0, SCRIPTS_DIR)
+
+import bible_io  # noqa: E402
+import bible_model  # noqa: E402
+import bible_schema  # noqa: E402
+import book_validator  # noqa: E402
+import clean_bible_it  # noqa: E402
+import clean_bible_la  # noqa: E402
+import fix_bible_fr  # noqa: E402
+import scrape_bibliacatolica  # noqa: E402
+import scrape_bibliacatolica_fr  # noqa: E402
+import scrape_biblegateway  # noqa: E402
+import scrape_esther_fr  # noqa: E402
+import scrape_german  # noqa: E402
+import scrape_gratis  # noqa: E402
+import scrape_vatican_es  # noqa: E402
+import scrape_vatican_it  # noqa: E402
+import validator  # noqa: E402
+import verse_anomalies  # noqa: E402
+from crawl_plan import load_index  # noqa: E402
+
+
+def parse_biblegateway(page):
+    chapters, _ = scrape_biblegateway.extract_passage(BeautifulSoup(page, "html.parser"))
+    return chapters.get(("Ps", "119"), {})
+
+
+def parse_vatican_es(page):
+    scrape_vatican_es.extract_book_info(page)
+    return scrape_vatican_es.extract_verses(page)
+
+
+def parse_vatican_it(page):
+    return scrape_vatican_it.extract_verses(BeautifulSoup(page.encode("utf-8"), "html.parser"))
+
+
+def parse_uibk(page):
+    return scrape_german.parse_chapter_text(page, "Ps", 119)
+
+
+def parse_gratis(page):
+    return scrape_gratis.parse_chapter_verses(BeautifulSoup(page, "html.parser"))
+
+
+def parse_bibliacatolica(page):
+    return scrape_bibliacatolica.parse_chapter(BeautifulSoup(page, "html.parser"))
+
+
+def parse_bibliacatolica_fr(page):
+    return scrape_bibliacatolica_fr.parse_chapter(BeautifulSoup(page, "html.parser"))
+
+
+def parse_stepbible(page):
+    return scrape_esther_fr.parse_chapter(page)
+
+
+# Fixture file -> parse function (HTML text in, {verse: text} out)
+PARSERS = {
+    "biblegateway.html": parse_biblegateway,
+    "vatican_es.htm": parse_vatican_es,
+    "vatican_it.htm": parse_vatican_it,
+    "uibk.html": parse_uibk,
+    "gratis.html": parse_gratis,
+    "bibliacatolica.html": parse_bibliacatolica,
+    "bibliacatolica_fr.html": parse_bibliacatolica_fr,
+    "stepbible.html": parse_stepbible,
+}
+
+
+def measure(fn, repeat):
+    """Time fn over repeat calls and measure the peak memory of one call."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, {
+        "runs": repeat,
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+        "per_second": round(repeat / sum(timings), 2),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def bench_parsers(repeat):
+    results = {}
+    for file_name, parse in PARSERS.items():
+        with open(os.path.join(FIXTURE_DIR, file_name), "r", encoding="utf-8") as f:
+            page = f.read()
+
+        verses, stats = measure(lambda: parse(page), repeat)
+        stats["page_kb"] = round(len(page.encode("utf-8")) / 1024, 1)
+        stats["verses"] = len(verses or {})
+        stats["chapters_per_second"] = stats.pop("per_second")
+        results[os.path.splitext(file_name)[0]] = stats
+    return results
+
+
+def synthetic_bible(verses_per_chapter=25):
+    """A full 73-book Bible shaped like the scraper output, using fixture-length verse text."""
+    with open(os.path.join(SCRIPTS_DIR, "json", "psalms_pr_modern.json"), "r", encoding="utf-8") as f:
+        sample = list(json.load(f)["Ps"]["chapters"]["119"].values())
+
+    bible_data = {}
+    position = 0
+    for book in load_index():
+        chapters = {}
+        for chapter in range(1, book["num_chapters"] + 1):
+            verses = {}
+            for verse in range(1, verses_per_chapter + 1):
+                verses[str(verse)] = f"{sample[position % len(sample)]} (1:{verse}) [{verse}a]"
+                position += 1
+            chapters[str(chapter)] = verses
+        bible_data[book["osis"]] = {"title": book["display"], "chapters": chapters}
+    return bible_data
+
+
+def clean_all(bible_data):
+    """Run every cleaner the repo has over a Bible, as the cleanup scripts would."""
+    cleaned = fix_bible_fr.clean_bible_data(bible_data)
+    for book in cleaned.values():
+        for chapter in book["chapters"].values():
+            for verse_num, verse_text in chapter.items():
+                chapter[verse_num] = clean_bible_la.clean_verse_text(clean_bible_it.clean_verse_text(verse_text))
+    return cleaned
+
+
+def validate_all(bible_data):
+    for book_data in bible_data.values():
+        validator.validate_book_structure(book_data)
+    validator.compare_counts(bible_data, bible_data)
+    validator.compare_verses(bible_data, bible_data)
+
+
+def bench_pipeline(repeat):
+    bible_data = synthetic_bible()
+    encoded = json.dumps(bible_data, ensure_ascii=False, indent=2)
+    verse_count = sum(len(chapter) for book in bible_data.values() for chapter in book["chapters"].values())
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bible_synthetic.json")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(encoded)
+
+        def validate_file():
+            # The validator reports on stdout; keep that out of the JSON results
+            with contextlib.redirect_stdout(io.StringIO()):
+                book_validator.validate_bible_json(path)
+
+        compact = bible_model.CompactBible.from_dict(bible_data)
+
+        steps = {
+            "json_dump": lambda: json.dumps(bible_data, ensure_ascii=False, indent=2),
+            "json_load": lambda: json.loads(encoded),
+            "schema_dump": lambda: bible_schema.dumps(bible_data, indent=2),
+            "schema_load": lambda: bible_io.load_bible_json(path),
+            "clean": lambda: clean_all(bible_data),
+            "validate": lambda: validate_all(bible_data),
+            "clean_file": lambda: fix_bible_fr.clean_bible_file(path, os.path.join(tmp_dir, "bible_cleaned.json")),
+            "validate_file": validate_file,
+            "compact_build": lambda: bible_model.CompactBible.from_dict(bible_data),
+            "compact_load": lambda: bible_model.CompactBible.load(path),
+            "compact_iterate": lambda: sum(len(text) for book in compact.values()
+                                           for chapter in book.chapters() for _, text in chapter.items()),
+            "anomaly_screen": lambda: verse_anomalies.score_verses(bible_data),
+        }
+
+        results = {"backend": bible_schema.BACKEND, "verses": verse_count, "json_mb": round(len(encoded.encode("utf-8")) / 1024 / 1024, 2)}
+        for name, step in steps.items():
+            _, stats = measure(step, repeat)
+            stats.pop("per_second")
+            results[name] = stats
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the site parsers and the JSON pipeline.')
+    parser.add_argument('--repeat', type=int, default=20, help='Parses per fixture (default: 20)')
+    parser.add_argument('--pipeline-repeat', type=int, default=3, help='Runs per pipeline step (default: 3)')
+    parser.add_argument('--skip-pipeline', action='store_true', help='Only benchmark the site parsers')
+    parser.add_argument('--output', type=str, help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "parsers": bench_parsers(args.repeat),
+    }
+    if not args.skip_pipeline:
+        results["pipeline"] = bench_pipeline(args.pipeline_repeat)
+
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import argparse
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Throughput-vs-concurrency sweep against the local mock server.
+#
+# For every injected latency a mock_server.py process is started, and for
+# every concurrency level a fresh worker process crawls the first --limit
+# chapters of a source's crawl plan through the shared fetcher and the
+# source's own parse function, with no politeness delay. Each point reports
+# chapters/second, p50/p99 request latency, CPU time per chapter and the
+# worker's memory high-water mark, as a table and optionally JSON:
+#
+#   python3 benchmarks/load_test.py gratis --concurrency 1 2 4 8 16 --latency 0.05 0.2
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(BENCH_DIR, "..", "scripts")
+sys.path.insert(0, SCRIPTS_DIR)
+
+SOURCES = ["biblegateway", "bibliacatolica", "bibliacatolica_fr", "gratis", "german", "stepbible", "vatican_es", "vatican_it"]
+
+
+def source_tasks(source: str) -> Tuple[List[str], Callable[[str, str], Dict]]:
+    """The chapter URLs a source's scraper would fetch, and its parse function ((url, page text) -> verses)."""
+    from bs4 import BeautifulSoup
+    import sources
+
+    if source in sources.SOURCES:
+        tasks = {task.url: task for task in sources.source_plan(source, use_cache=False)}
+        return list(tasks), lambda url, page: sources.parse_page(source, page, tasks[url].osis, tasks[url].chapter)
+    if source in ("vatican_es", "vatican_it"):
+        # The Vatican scrapers discover their chapter pages from the index page
+        from urllib.parse import urljoin
+        from fetch import get_fetcher
+        import scrape_vatican_es
+        import scrape_vatican_it
+        index_url = (scrape_vatican_es.BASE_URL if source == "vatican_es" else "https://www.vatican.va/archive/ITA0001/") + "_INDEX.HTM"
+        soup = BeautifulSoup(get_fetcher().get_text(index_url), "html.parser")
+        urls = list(dict.fromkeys(urljoin(index_url, link["href"]) for link in soup.find_all("a", href=True)
+                                  if link["href"].startswith("__P")))
+        if source == "vatican_es":
+            return urls, lambda url, page: scrape_vatican_es.extract_verses(page)
+        return urls, lambda url, page: scrape_vatican_it.extract_verses(BeautifulSoup(page, "html.parser"))
+    raise ValueError(f"Unknown source: {source}")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))]
+
+
+def run_point(source: str, concurrency: int, limit: int) -> Dict:
+    """Crawl up to `limit` chapters with `concurrency` threads; runs inside a worker process."""
+    import requests
+    from fetch import Fetcher
+
+    urls, parse = source_tasks(source)
+    urls = urls[:limit]
+    fetcher = Fetcher(retries=3, max_cache_bytes=0)  # nothing is fetched twice, so don't hold pages
+
+    def crawl(url) -> Tuple[Optional[float], bool]:
+        """(fetch latency, or None if the fetch failed; whether the chapter was parsed)."""
+        start = time.perf_counter()
+        try:
+            page = fetcher.get_text(url, encoding="utf-8")
+        except requests.exceptions.RequestException:
+            return None, False
+        latency = time.perf_counter() - start
+        try:
+            return latency, bool(parse(url, page))
+        except Exception:
+            # A page the parser chokes on is a failed chapter, not a failed sweep point
+            return latency, False
+
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(crawl, urls))
+    elapsed = time.perf_counter() - start
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+
+    latencies = [latency for latency, _ in results if latency is not None]
+    failed = sum(not parsed for _, parsed in results)
+    cpu = (usage.ru_utime - usage_before.ru_utime) + (usage.ru_stime - usage_before.ru_stime)
+    chapters = len(urls)
+    return {
+        "source": source,
+        "concurrency": concurrency,
+        "chapters": chapters,
+        "failed": failed,
+        "seconds": round(elapsed, 3),
+        "chapters_per_second": round(chapters / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "cpu_ms_per_chapter": round(cpu * 1000 / chapters, 2) if chapters else 0.0,
+        # ru_maxrss is in kilobytes on Linux
+        "max_rss_mb": round(usage.ru_maxrss / 1024, 1),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_mock_server(latency: float, args) -> Tuple[subprocess.Popen, str]:
+    port = free_port()
+    command = [sys.executable, os.path.join(BENCH_DIR, "mock_server.py"), "--port", str(port),
+               "--latency", str(latency), "--jitter", str(args.jitter), "--error-rate", str(args.error_rate),
+               "--drop-rate", str(args.drop_rate), "--seed", str(args.seed)]
+    if args.bandwidth:
+        command += ["--bandwidth", str(args.bandwidth)]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return server, url
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("Mock server did not start")
+
+
+def run_worker(source: str, concurrency: int, limit: int, mock_url: str) -> Dict:
+    """Run one sweep point in a fresh process so CPU and memory are its own."""
+    env = dict(os.environ, SCRAPER_MOCK_URL=mock_url)
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), source, "--worker", "--concurrency", str(concurrency),
+         "--limit", str(limit)],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def print_table(results: List[Dict]):
+    columns = [("latency_s", "latency"), ("concurrency", "conc"), ("chapters_per_second", "ch/s"), ("p50_ms", "p50 ms"),
+               ("p99_ms", "p99 ms"), ("cpu_ms_per_chapter", "cpu ms/ch"), ("max_rss_mb", "rss MB"), ("failed", "failed")]
+    print("  ".join(f"{title:>10}" for _, title in columns))
+    for result in results:
+        print("  ".join(f"{result[key]:>10}" for key, _ in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep scraper throughput over concurrency and latency against the mock server.')
+    parser.add_argument('source', choices=SOURCES, help='Source whose crawl plan and parser to use')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16], help='Concurrency levels')
+    parser.add_argument('--latency', type=float, nargs='+', default=[0.05, 0.2], help='Injected latencies in seconds')
+    parser.add_argument('--limit', type=int, default=200, help='Chapters per sweep point (default: 200)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random latency per request')
+    parser.add_argument('--bandwidth', type=float, help='Mock server bandwidth in KB/s')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of 429/503 responses')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='Share of dropped connections')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for injected faults')
+    parser.add_argument('--output', type=str, help='Also write the results to this JSON file')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_point(args.source, args.concurrency[0], args.limit)))
+        return
+
+    results = []
+    for latency in args.latency:
+        server, url = start_mock_server(latency, args)
+        try:
+            for concurrency in args.concurrency:
+                result = run_worker(args.source, concurrency, args.limit, url)
+                result["latency_s"] = latency
+                results.append(result)
+                print(f"latency {latency}s, concurrency {concurrency}: {result['chapters_per_second']} chapters/s",
+                      file=sys.stderr)
+        finally:
+            server.terminate()
+            server.wait()
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"source": args.source, "limit": args.limit, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
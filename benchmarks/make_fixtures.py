@@ -0,0 +1,149 @@
+import html
+import json
+import os
+
+# Generates the synthetic chapter pages in benchmarks/fixtures/. Each page
+# reproduces the markup the matching scraper parses (see the structure notes in
+# the scrapers), filled with Psalm 119 from scripts/json so every fixture has
+# the same 176 verses. A recorded page saved under the same file name can
+# replace any of them. The builders take the book and chapter so that
+# mock_server.py can render any chapter of any source the same way.
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_verses():
+    with open(os.path.join(ROOT_DIR, "scripts", "json", "psalms_pr_modern.json"), "r", encoding="utf-8") as f:
+        chapter = json.load(f)["Ps"]["chapters"]["119"]
+    return [(number, html.escape(text, quote=False)) for number, text in chapter.items()]
+
+
+def page(body, head=""):
+    return f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">{head}</head><body>\n{body}\n</body></html>\n"
+
+
+def biblegateway_passage(verses, osis="Ps", chapter=119, name="Psalm", version="NABRE"):
+    """One chapter of one version, as BibleGateway renders it inside the version's div."""
+    lines = [f'<h1 class="passage-display"><span class="passage-display-bcv">{name} {chapter}</span></h1>']
+    footnotes = []
+    for number, text in verses:
+        verse_class = f"text {osis}-{chapter}-{number}"
+        if int(number) % 8 == 1:
+            lines.append(f'<h3><span id="en-{version}-{number}" class="{verse_class}">Stanza {number}</span></h3>')
+        label = f'<span class="chapternum">{chapter} </span>' if number == "1" else f'<sup class="versenum">{number} </sup>'
+        half = len(text) // 2
+        split = text.rfind(" ", 0, half) if half else -1
+        first, second = (text[:split], text[split + 1:]) if split > 0 else (text, "")
+        marker = ""
+        if int(number) % 5 == 0:
+            note_id = f"fen-{version}-{number}a"
+            marker = f'<sup data-fn="#{note_id}" class="footnote">[<a href="#{note_id}">a</a>]</sup>'
+            footnotes.append(f'<li id="{note_id}"><a href="#en-{version}-{number}">{name} {chapter}:{number}</a> '
+                             f'<span class="footnote-text">Note on verse {number}.</span></li>')
+        lines.append(f'<p class="line"><span class="{verse_class}">{label}{first}{marker}</span>'
+                     f'<br class="poetry"><span class="indent-1"><span class="indent-1-breaks">    </span>'
+                     f'<span class="{verse_class}">{second}</span></span></p>')
+    lines.append('<div class="footnotes"><h4>Footnotes</h4><ol>' + "".join(footnotes) + '</ol></div>')
+    return "\n".join(lines)
+
+
+def biblegateway_page(passages):
+    """A (possibly parallel) passage page from {version: [chapter passage html, ...]}."""
+    columns = [f'<div class="version-{version} result-text-style-normal text-html">\n' + "\n".join(blocks) + "\n</div>"
+               for version, blocks in passages.items()]
+    return page('<div class="passage-text"><div class="passage-content passage-class-0">\n'
+                + "\n".join(columns) + "\n</div></div>")
+
+
+def biblegateway(verses, osis="Ps", chapter=119, name="Psalm", version="NABRE"):
+    return biblegateway_page({version: [biblegateway_passage(verses, osis, chapter, name, version)]})
+
+
+def vatican_es(verses, chapter=119, name="SALMOS"):
+    style = 'class="MsoNormal" align="left" style="margin-left:0cm;text-align:left;\ntext-indent:0cm"'
+    lines = []
+    for number, text in verses:
+        half = len(text) // 2
+        split = text.rfind(" ", 0, half) if half else -1
+        if split > 0:
+            lines.append(f'<p {style}>{number} {text[:split]} </p>')
+            lines.append(f'<p {style}>{text[split + 1:]} </p>')
+        else:
+            lines.append(f'<p {style}>{number} {text} </p>')
+    head = f'<meta name="part" content="Biblia > {name} > {chapter}">'
+    return page("\n".join(lines), head)
+
+
+def vatican_it(verses, chapter=119, name="Salmi"):
+    body = [f'<p align="center"><font size="2">{name} {chapter}</font></p><p>']
+    body.extend(f'[{number}]{text}<br>' for number, text in verses)
+    body.append('</p><p align="center"><a href="__P1.HTM">Precedente</a> - <a href="__P3.HTM">Successivo</a></p>')
+    body.append('<p><font size="1">Copyright (c) Libreria Editrice Vaticana</font></p>')
+    return page("\n".join(body))
+
+
+def uibk(verses, chapter=119, name="Ps"):
+    rows = ['<table border="0" width="100%">']
+    for number, text in verses:
+        half = len(text) // 2
+        split = text.rfind(" ", 0, half) if half else -1
+        text = f"{text[:split]} /\n    {text[split + 1:]}" if split > 0 else text
+        rows.append(f'<tr>\n  <td width="10%">\n    <a id="{number}" href="#{number}" name="{number}"><strong>{name} {chapter},{number}</strong></a>\n  </td>\n'
+                    f'  <td width="75%">\n    {text}\n  </td>\n  <td width="15%"></td>\n</tr>')
+    rows.append('</table>')
+    return page("\n".join(rows))
+
+
+def gratis(verses, name="Psaumes"):
+    spans = [f'<span class="verse"><a name="{number}">{number}</a> {text} </span>' for number, text in verses]
+    return page('<ul><li><a href="/fr/dejer/ps/118">118</a></li><li><a href="/fr/dejer/ps/120">120</a></li></ul>'
+                f'<strong>{name}</strong>\n<div class="chapter">' + "\n".join(spans) + "</div>")
+
+
+def bibliacatolica(verses):
+    paragraphs = [f'<p><strong>{number}.</strong> {text}{"*" if int(number) % 7 == 0 else ""}</p>' for number, text in verses]
+    return page('<ul class="listChapter"><li><a href="/biblia-ave-maria/salmos/1/">1</a></li></ul>\n'
+                '<section class="entry">\n' + "\n".join(paragraphs) + "\n</section>")
+
+
+def bibliacatolica_fr(verses):
+    rows = []
+    for number, text in verses:
+        rows.append(
+            '<div class="row clearfix">'
+            f'<div class="col-sm-6 col-md-6 col-lg-6"><p class="v1"><strong>{number}.</strong> <span class="t">{text}</span></p></div>'
+            f'<div class="col-sm-6 col-md-6 col-lg-6"><p class="v2"><strong>{number}.</strong> <span class="t">{text}</span></p></div>'
+            '</div>'
+        )
+    return page('<section class="entry">\n' + "\n".join(rows) + "\n</section>")
+
+
+def stepbible(verses, osis="Ps", chapter=119):
+    spans = [
+        f'<span dir="ltr" class="verse ltrDirection"><a name="{osis}.{chapter}.{number}" class="verseLink">'
+        f'<span class="verseNumber">{number}</span></a><a name="{osis}.{chapter}.{number}" class="verseLink"></a> {text}</span>'
+        for number, text in verses
+    ]
+    return page('<div class="passageContentHolder">\n' + "\n".join(spans) + "\n</div>")
+
+
+FIXTURES = {
+    "biblegateway.html": biblegateway,
+    "vatican_es.htm": vatican_es,
+    "vatican_it.htm": vatican_it,
+    "uibk.html": uibk,
+    "gratis.html": gratis,
+    "bibliacatolica.html": bibliacatolica,
+    "bibliacatolica_fr.html": bibliacatolica_fr,
+    "stepbible.html": stepbible,
+}
+
+
+if __name__ == "__main__":
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    verses = load_verses()
+    for file_name, build in FIXTURES.items():
+        with open(os.path.join(FIXTURE_DIR, file_name), "w", encoding="utf-8") as f:
+            f.write(build(verses))
+        print(f"Wrote {file_name}")
@@ -0,0 +1,408 @@
+import argparse
+import html
+import json
+import os
+import random
+import re
+import socket
+import sys
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# A local stand-in for every site the scrapers crawl, for load and fault
+# testing without touching the real hosts. Pages are synthesized with the
+# fixture builders (make_fixtures.py) under the same URL schemes the scrapers
+# request, for every book and chapter in the crawl plan:
+#
+#   /passage/?search=Genesis+1;+Genesis+2&version=NABRE;RSVCE   BibleGateway
+#   /archive/ESL0506/_INDEX.HTM, /archive/ESL0506/__P*.HTM       Vatican (es)
+#   /archive/ITA0001/_INDEX.HTM, /archive/ITA0001/__P*.HTM       Vatican (it)
+#   /theol/leseraum/bibel/, /theol/leseraum/bibel/{code}{n}.html  uibk.ac.at
+#   /fr/dejer/{slug}/, /fr/dejer/{slug}/{n}/                      gratis.bible
+#   /{translation}/{slug}/{n}/                                    bibliacatolica.com.br
+#   /?q=version={v}@reference={slug}.{n}                          stepbible.org
+#   /v2/translations.json, /v2/{abbr}/books.json, /v2/{abbr}/{n}.json   getBible
+#
+# Latency, bandwidth, 429/503 responses and dropped connections can be
+# injected. Faults are drawn from (seed, URL, attempt number), so a run hits
+# the same faults in the same places whatever the thread scheduling.
+# Point the scrapers at it with SCRAPER_MOCK_URL (see fetch.py):
+#
+#   python3 benchmarks/mock_server.py --port 8765 --latency 0.2 --error-rate 0.05
+#   SCRAPER_MOCK_URL=http://127.0.0.1:8765 python3 scripts/scrape_gratis.py
+#
+# GET /__stats returns request and fault counters as JSON; GET /__reset clears them.
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "scripts"))
+
+import make_fixtures  # noqa: E402
+import getbible  # noqa: E402
+import scrape_bibliacatolica  # noqa: E402
+import scrape_german  # noqa: E402
+import scrape_vatican_es  # noqa: E402
+import scrape_vatican_it  # noqa: E402
+from crawl_plan import chapter_counts, load_index  # noqa: E402
+
+CHUNK_SIZE = 16 * 1024
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 makes concurrent clients wait for SYN retries
+    request_queue_size = 256
+
+
+# A chapter or chapter range of a passage search, with optional verses
+BIBLEGATEWAY_SPAN = re.compile(r"(\d+)(?::(\d+))?(?:-(\d+)(?::(\d+))?)?")
+
+
+class MockSite:
+    """Renders the page for a request path, for every source the scrapers know."""
+
+    def __init__(self, verses_per_chapter: int = 25):
+        self.verses_per_chapter = verses_per_chapter
+        self.sample = make_fixtures.load_verses()
+        index = load_index()
+        self.display_names = {book["osis"]: book["display"] for book in index}
+        self.osis_by_display = {book["display"]: book["osis"] for book in index}
+        self.counts = chapter_counts("biblegateway")
+
+        # Vatican pages are named __P<n>.HTM and listed on the index page
+        self.vatican_es_pages: Dict[str, Tuple[str, int, str]] = {}
+        spanish_names = {}
+        for name, osis in scrape_vatican_es.BOOK_MAPPING.items():
+            spanish_names.setdefault(osis, name)
+        reserved = {book["url"] for book in scrape_vatican_es.ONE_PAGE_BOOKS.values()}
+        number = 0
+        for osis, name in spanish_names.items():
+            if osis not in self.counts or osis in scrape_vatican_es.ONE_PAGE_BOOKS:
+                continue
+            for chapter in range(1, self.counts[osis] + 1):
+                number += 1
+                while f"__P{number:X}.HTM" in reserved:
+                    number += 1
+                self.vatican_es_pages[f"__P{number:X}.HTM"] = (osis, chapter, name)
+        for osis, book in scrape_vatican_es.ONE_PAGE_BOOKS.items():
+            self.vatican_es_pages[book["url"]] = (osis, 1, book["title"])
+
+        self.vatican_it_books = [(name, osis) for name, osis in scrape_vatican_it.OSIS_CODES.items() if osis in self.counts]
+        self.vatican_it_pages: Dict[str, Tuple[str, int, str]] = {}
+        number = 0
+        for name, osis in self.vatican_it_books:
+            for chapter in range(1, self.counts[osis] + 1):
+                number += 1
+                self.vatican_it_pages[f"__P{number:X}.HTM"] = (osis, chapter, name)
+
+        self.german_counts = chapter_counts("german")
+        self.german_codes = {
+            scrape_german.URL_MAP.get(code, code.lower()): code for code in scrape_german.OSIS_MAP
+        }
+        self.gratis_counts = chapter_counts("gratis")
+        self.catolica_counts = chapter_counts("bibliacatolica")
+        self.catolica_slugs = {book["slug"]: osis for osis, book in scrape_bibliacatolica.bible_dictionary.items()}
+
+    def verses(self, osis: str, chapter: int):
+        """Deterministic synthetic verses (HTML-escaped) for a chapter."""
+        count = self.verses_per_chapter + (len(osis) * 7 + chapter * 3) % 11 - 5
+        offset = sum(map(ord, osis)) * 31 + chapter * 17
+        return [(str(verse), self.sample[(offset + verse) % len(self.sample)][1]) for verse in range(1, count + 1)]
+
+    def render(self, path: str, query: str) -> Optional[Tuple[str, str]]:
+        """Return (content type, body) for a request, or None for a 404."""
+        params = parse_qs(query)
+        path = unquote(path)
+
+        if path.startswith("/passage"):
+            return "text/html; charset=utf-8", self.biblegateway(params)
+        if path.startswith("/archive/ESL0506/"):
+            return self.vatican_es(path.rsplit("/", 1)[1])
+        if path.startswith("/archive/ITA0001/"):
+            return self.vatican_it(path.rsplit("/", 1)[1])
+        if path.startswith("/theol/leseraum/bibel/"):
+            return self.uibk(path.rsplit("/", 1)[1])
+        if path.startswith("/v2/"):
+            return self.getbible(path)
+        if path.startswith("/fr/dejer/"):
+            return self.gratis(path)
+        if path == "/" and "q" in params:
+            return self.stepbible(params["q"][0])
+        if path.startswith("/biblia-"):
+            return self.bibliacatolica(path)
+        return None
+
+    def biblegateway(self, params) -> str:
+        versions = params.get("version", ["NABRE"])[0].split(";")
+        chapters = []
+        for reference in params.get("search", [""])[0].split(";"):
+            # "Genesis 1", "Genesis 1-5" (as scrape_biblegateway batches them) or "Genesis 1:3-2:4"
+            display, _, span = reference.strip().rpartition(" ")
+            match = BIBLEGATEWAY_SPAN.fullmatch(span)
+            if display not in self.osis_by_display or not match:
+                continue
+            first, first_verse, last, last_verse = match.groups()
+            # "1:5-9" is a verse range within chapter 1, not chapters 1 to 9
+            last = first if last is None or (first_verse and not last_verse) else last
+            for chapter in range(int(first), int(last) + 1):
+                chapters.append((self.osis_by_display[display], display, chapter))
+        return make_fixtures.biblegateway_page({
+            version: [make_fixtures.biblegateway_passage(self.verses(osis, chapter), osis, chapter, display, version)
+                      for osis, display, chapter in chapters]
+            for version in versions
+        })
+
+    def vatican_es(self, page_name: str):
+        if page_name == "_INDEX.HTM":
+            links = "\n".join(f'<a href="{name}">{chapter}</a>' for name, (_, chapter, _) in self.vatican_es_pages.items())
+            return "text/html; charset=utf-8", make_fixtures.page(links)
+        if page_name not in self.vatican_es_pages:
+            return None
+        osis, chapter, name = self.vatican_es_pages[page_name]
+        return "text/html; charset=utf-8", make_fixtures.vatican_es(self.verses(osis, chapter), chapter, name)
+
+    def vatican_it(self, page_name: str):
+        if page_name == "_INDEX.HTM":
+            books = []
+            pages = iter(self.vatican_it_pages)
+            for name, osis in self.vatican_it_books:
+                links = "".join(f'<li><a href="{next(pages)}">{chapter}</a></li>' for chapter in range(1, self.counts[osis] + 1))
+                books.append(f'<p><font size="2">{html.escape(name)}</font></p><ul>{links}</ul>')
+            return "text/html; charset=utf-8", make_fixtures.page("\n".join(books))
+        if page_name not in self.vatican_it_pages:
+            return None
+        osis, chapter, name = self.vatican_it_pages[page_name]
+        return "text/html; charset=utf-8", make_fixtures.vatican_it(self.verses(osis, chapter), chapter, name)
+
+    def uibk(self, page_name: str):
+        if page_name == "":
+            rows = []
+            for url_code, code in self.german_codes.items():
+                osis = scrape_german.OSIS_MAP[code]
+                links = " ".join(f'<a href="{url_code}{n}.html">{n}</a>' for n in range(1, self.german_counts.get(osis, 0) + 1))
+                rows.append(f'<tr><td><a href="{url_code}1.html">{self.display_names.get(osis, code)}</a></td>'
+                            f'<td><a href="{url_code}1.html">{code}</a></td><td>{links}</td></tr>')
+            return "text/html; charset=utf-8", make_fixtures.page("<table>\n" + "\n".join(rows) + "\n</table>")
+        match = re.fullmatch(r"(\d?[a-z]+)(\d+)\.html", page_name)
+        if not match or match.group(1) not in self.german_codes:
+            return None
+        code = self.german_codes[match.group(1)]
+        chapter = int(match.group(2))
+        return "text/html; charset=utf-8", make_fixtures.uibk(self.verses(scrape_german.OSIS_MAP[code], chapter), chapter, code)
+
+    def gratis(self, path: str):
+        parts = [part for part in path.split("/") if part][2:]
+        osis = next((osis for osis in self.gratis_counts if osis.lower() == (parts[0] if parts else "")), None)
+        if osis is None:
+            return None
+        name = self.display_names.get(osis, osis)
+        if len(parts) == 1:
+            links = "".join(f'<li><a href="/fr/dejer/{parts[0]}/{n}">{n}</a></li>' for n in range(1, self.gratis_counts[osis] + 1))
+            return "text/html; charset=utf-8", make_fixtures.page(f"<ul>{links}</ul><strong>{name}</strong>")
+        if not parts[1].isdigit():
+            return None
+        return "text/html; charset=utf-8", make_fixtures.gratis(self.verses(osis, int(parts[1])), name)
+
+    def bibliacatolica(self, path: str):
+        parts = [part for part in path.split("/") if part]
+        if len(parts) != 3 or parts[1] not in self.catolica_slugs or not parts[2].isdigit():
+            return None
+        verses = self.verses(self.catolica_slugs[parts[1]], int(parts[2]))
+        build = make_fixtures.bibliacatolica_fr if "-vs-" in parts[0] else make_fixtures.bibliacatolica
+        return "text/html; charset=utf-8", build(verses)
+
+    def stepbible(self, q: str):
+        match = re.search(r"reference=(\w+)\.(\d+)", q)
+        if not match:
+            return None
+        osis, chapter = match.group(1), int(match.group(2))
+        return "text/html; charset=utf-8", make_fixtures.stepbible(self.verses(osis, chapter), osis, chapter)
+
+    def getbible(self, path: str):
+        parts = [part for part in path.split("/") if part][1:]
+        if parts == ["translations.json"]:
+            return "application/json", json.dumps({"mock": {"translation": "Mock Translation", "abbreviation": "mock"}})
+        if len(parts) != 2:
+            return None
+        abbreviation, file_name = parts
+        if file_name == "books.json":
+            return "application/json", json.dumps({
+                number: {"name": book["english_name"], "url": f"https://api.getbible.net/v2/{abbreviation}/{number}.json"}
+                for number, book in getbible.number_to_osis.items()
+            })
+        number = file_name[:-len(".json")]
+        if number not in getbible.number_to_osis:
+            return None
+        osis = getbible.number_to_osis[number]["osis"]
+        chapters = [
+            {"chapter": chapter, "verses": [{"verse": int(verse), "text": html.unescape(text)}
+                                            for verse, text in self.verses(osis, chapter)]}
+            for chapter in range(1, self.counts.get(osis, 1) + 1)
+        ]
+        return "application/json", json.dumps({"name": getbible.number_to_osis[number]["english_name"], "chapters": chapters})
+
+
+class MockServer:
+    """
+    The stand-in server, run in a background thread.
+
+    Args:
+        host, port: Address to listen on (port 0 picks a free port).
+        latency: Seconds to wait before answering each request.
+        jitter: Extra random latency, uniformly up to this many seconds.
+        bandwidth: Response bytes per second (None for unthrottled).
+        error_rate: Share of requests answered with 429 or 503.
+        drop_rate: Share of requests whose connection is closed without a response.
+        seed: Seed for the fault and jitter draws.
+        verses_per_chapter: Average number of verses in each synthesized chapter.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 bandwidth: Optional[float] = None, error_rate: float = 0.0, drop_rate: float = 0.0,
+                 seed: int = 0, verses_per_chapter: int = 25, verbose: bool = False):
+        self.site = MockSite(verses_per_chapter)
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.seed = seed
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self._attempts: Dict[str, int] = {}
+        self.reset_stats()
+
+        self.render = lru_cache(maxsize=4096)(self.site.render)
+        self.httpd = _Server((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset_stats(self):
+        with self._lock:
+            self._attempts.clear()
+            self.stats = {"requests": 0, "bytes": 0, "errors": 0, "drops": 0, "not_found": 0}
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def draw(self, url: str) -> random.Random:
+        """A random stream fixed by the seed, the URL and how often it was requested."""
+        with self._lock:
+            attempt = self._attempts.get(url, 0)
+            self._attempts[url] = attempt + 1
+        return random.Random(f"{self.seed}:{url}:{attempt}")
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes; don't let Nagle hold the body back
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                if server.verbose:
+                    super().log_message(format, *args)
+
+            def send_body(self, status: int, content_type: str, body: bytes, headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                for start in range(0, len(body), CHUNK_SIZE):
+                    chunk = body[start:start + CHUNK_SIZE]
+                    self.wfile.write(chunk)
+                    if server.bandwidth:
+                        time.sleep(len(chunk) / server.bandwidth)
+                server._count("bytes", len(body))
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path == "/__stats":
+                    with server._lock:
+                        stats = dict(server.stats)
+                    return self.send_body(200, "application/json", json.dumps(stats).encode("utf-8"))
+                if parts.path == "/__reset":
+                    server.reset_stats()
+                    return self.send_body(200, "application/json", b"{}")
+
+                server._count("requests")
+                rng = server.draw(self.path)
+                time.sleep(server.latency + server.jitter * rng.random())
+
+                fault = rng.random()
+                if fault < server.drop_rate:
+                    server._count("drops")
+                    self.close_connection = True
+                    self.connection.shutdown(socket.SHUT_RDWR)
+                    return
+                if fault < server.drop_rate + server.error_rate:
+                    server._count("errors")
+                    status = 429 if rng.random() < 0.5 else 503
+                    return self.send_body(status, "text/plain", b"try again later", {"Retry-After": "0"})
+
+                page = server.render(parts.path, parts.query)
+                if page is None:
+                    server._count("not_found")
+                    return self.send_body(404, "text/plain", b"not found")
+                content_type, body = page
+                self.send_body(200, content_type, body.encode("utf-8"))
+
+        return Handler
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve synthetic pages for every scraper source.')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds of latency per request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random latency, up to this many seconds')
+    parser.add_argument('--bandwidth', type=float, help='Response bandwidth in KB/s (default: unthrottled)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with 429/503')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='Share of connections dropped without a response')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for faults and jitter')
+    parser.add_argument('--verses', type=int, default=25, help='Average verses per chapter')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    server = MockServer(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                        bandwidth=args.bandwidth * 1024 if args.bandwidth else None,
+                        error_rate=args.error_rate, drop_rate=args.drop_rate, seed=args.seed,
+                        verses_per_chapter=args.verses, verbose=args.verbose)
+    print(f"Serving on {server.url} - run scrapers with SCRAPER_MOCK_URL={server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import argparse
+import difflib
+import hashlib
+import json
+from typing import Dict, List, Mapping, Optional
+
+import numpy as np
+
+from bible_shards import load_bible
+
+# Verse-level diff of two Bibles: two scrapes of the same translation, or a
+# file before and after a cleaning pass such as fix_bible_fr.py.
+#
+# Every verse of both inputs is reduced to a "book chapter verse" key and a
+# 64-bit BLAKE2 hash of its text. Matching the sorted keys of the two sides
+# and comparing their hashes finds the added, removed and changed verses in a
+# few array operations, so a whole Bible costs about as much as reading it.
+# Only the changed verses are then compared word by word with difflib.
+#
+#   python3 scripts/bible_diff.py data/bible_fr_old.json data/bible_fr.json
+#   python3 scripts/bible_diff.py data/bible_fr_old.json data/bible_fr.json --book Gen --json
+
+# Separates the key parts; cannot occur in OSIS codes or verse labels
+KEY_SEPARATOR = "\x1f"
+
+
+def flatten(bible_data: Mapping, books: Optional[List[str]] = None) -> Dict:
+    """
+    The verses of a Bible as parallel lists of book, chapter, verse and text,
+    plus their keys and text hashes as NumPy arrays.
+    """
+    osis_list, chapters, verses, texts = [], [], [], []
+    for osis in bible_data:
+        if books and osis not in books:
+            continue
+        for chapter_num, chapter in bible_data[osis].get("chapters", {}).items():
+            for verse_num, verse_text in chapter.items():
+                osis_list.append(osis)
+                chapters.append(chapter_num)
+                verses.append(verse_num)
+                texts.append(verse_text)
+
+    keys = [KEY_SEPARATOR.join(parts) for parts in zip(osis_list, chapters, verses)]
+    digests = b"".join(hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+                       for text in texts)
+    return {
+        "book": osis_list,
+        "chapter": chapters,
+        "verse": verses,
+        "text": texts,
+        "key": np.array(keys, dtype=np.dtypes.StringDType()),
+        "hash": np.frombuffer(digests, dtype=np.uint64),
+    }
+
+
+def word_diff(old: str, new: str) -> List[Dict[str, str]]:
+    """
+    The edits turning one verse into the other, word by word, as
+    {"op": "equal" | "replace" | "delete" | "insert", "old": ..., "new": ...}.
+    """
+    old_words, new_words = old.split(), new.split()
+    matcher = difflib.SequenceMatcher(None, old_words, new_words, autojunk=False)
+    return [
+        {"op": op, "old": " ".join(old_words[i1:i2]), "new": " ".join(new_words[j1:j2])}
+        for op, i1, i2, j1, j2 in matcher.get_opcodes()
+    ]
+
+
+def format_word_diff(edits: List[Dict[str, str]]) -> str:
+    """Edits in wdiff notation: [-removed words-]{+added words+}."""
+    parts = []
+    for edit in edits:
+        if edit["op"] == "equal":
+            parts.append(edit["old"])
+            continue
+        if edit["old"]:
+            parts.append(f"[-{edit['old']}-]")
+        if edit["new"]:
+            parts.append(f"{{+{edit['new']}+}}")
+    return " ".join(parts)
+
+
+def diff_bibles(old_data: Mapping, new_data: Mapping, books: Optional[List[str]] = None) -> Dict:
+    """
+    Compare two Bibles verse by verse.
+
+    Args:
+        old_data: The earlier Bible ({osis: {title, chapters}}, or a sharded Bible).
+        new_data: The later Bible.
+        books: OSIS codes to compare (default: all).
+
+    Returns:
+        Dict: "summary" counts and the "changed", "added" and "removed"
+        verses. Changed verses carry both texts and their word-level
+        "edits" (see word_diff); verses are listed in the order of the file
+        they come from (the new one for changed and added verses).
+    """
+    old, new = flatten(old_data, books), flatten(new_data, books)
+
+    # Keys are unique within each side, so sorting both and searching one in
+    # the other pairs up every verse present in both
+    old_order = np.argsort(old["key"], kind="stable")
+    old_sorted = old["key"][old_order]
+    positions = np.searchsorted(old_sorted, new["key"])
+    in_range = positions < len(old_sorted)
+    matched = np.zeros(len(new["key"]), dtype=bool)
+    matched[in_range] = old_sorted[positions[in_range]] == new["key"][in_range]
+
+    new_matched = np.flatnonzero(matched)
+    old_matched = old_order[positions[matched]]
+    differs = old["hash"][old_matched] != new["hash"][new_matched]
+    changed_new, changed_old = new_matched[differs], old_matched[differs]
+    added = np.flatnonzero(~matched)
+    removed_mask = np.ones(len(old["key"]), dtype=bool)
+    removed_mask[old_matched] = False
+    removed = np.flatnonzero(removed_mask)
+
+    def location(side: Dict, i: int) -> Dict[str, str]:
+        return {"book": side["book"][i], "chapter": side["chapter"][i], "verse": side["verse"][i]}
+
+    changed = []
+    for i, j in zip(changed_new.tolist(), changed_old.tolist()):
+        old_text, new_text = old["text"][j], new["text"][i]
+        edits = word_diff(old_text, new_text)
+        changed.append(dict(location(new, i), old=old_text, new=new_text,
+                            whitespace_only=all(edit["op"] == "equal" for edit in edits), edits=edits))
+
+    return {
+        "summary": {
+            "old_verses": len(old["key"]),
+            "new_verses": len(new["key"]),
+            "unchanged": int(len(new_matched) - len(changed_new)),
+            "changed": len(changed),
+            "added": len(added),
+            "removed": len(removed),
+        },
+        "changed": changed,
+        "added": [dict(location(new, i), text=new["text"][i]) for i in added.tolist()],
+        "removed": [dict(location(old, i), text=old["text"][i]) for i in removed.tolist()],
+    }
+
+
+def changes_by_book(diff: Dict) -> Dict[str, Dict[str, int]]:
+    """Changed, added and removed verse counts per book, in the order the books first appear."""
+    counts: Dict[str, Dict[str, int]] = {}
+    for kind in ("changed", "added", "removed"):
+        for verse in diff[kind]:
+            book = counts.setdefault(verse["book"], {"changed": 0, "added": 0, "removed": 0})
+            book[kind] += 1
+    return counts
+
+
+def print_diff(diff: Dict, limit: Optional[int] = None):
+    """Print a diff for reading: a summary, counts per book, then the verses."""
+    summary = diff["summary"]
+    print(f"{summary['old_verses']} -> {summary['new_verses']} verses: {summary['changed']} changed, "
+          f"{summary['added']} added, {summary['removed']} removed, {summary['unchanged']} unchanged")
+    if not (summary["changed"] or summary["added"] or summary["removed"]):
+        return
+
+    print("\nBy book:")
+    for book, counts in changes_by_book(diff).items():
+        print(f"  {book:<8} " + ", ".join(f"{count} {kind}" for kind, count in counts.items() if count))
+
+    for kind, sign in (("changed", "~"), ("removed", "-"), ("added", "+")):
+        verses = diff[kind]
+        if not verses:
+            continue
+        shown = verses if limit is None else verses[:limit]
+        print(f"\n{kind.capitalize()} verses:")
+        for verse in shown:
+            reference = f"{verse['book']} {verse['chapter']}:{verse['verse']}"
+            if kind == "changed":
+                note = " (whitespace only)" if verse["whitespace_only"] else ""
+                print(f"{sign} {reference}{note}\n    {format_word_diff(verse['edits'])}")
+            else:
+                print(f"{sign} {reference}\n    {verse['text']}")
+        if len(shown) < len(verses):
+            print(f"  ... and {len(verses) - len(shown)} more")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show which verses changed between two Bible JSON files.')
+    parser.add_argument('old', type=str, help='Earlier Bible JSON file or shard directory')
+    parser.add_argument('new', type=str, help='Later Bible JSON file or shard directory')
+    parser.add_argument('--book', nargs='+', help='OSIS codes to compare (default: all)')
+    parser.add_argument('--limit', type=int, default=50,
+                        help='Verses listed per kind of change; 0 lists all (default: 50, ignored with --json)')
+    parser.add_argument('--json', action='store_true', help='Print the full diff as JSON')
+    args = parser.parse_args()
+
+    diff = diff_bibles(load_bible(args.old), load_bible(args.new), args.book)
+    if args.json:
+        print(json.dumps(diff, ensure_ascii=False, indent=2))
+    else:
+        print_diff(diff, args.limit or None)
+
+
+if __name__ == "__main__":
+    main()
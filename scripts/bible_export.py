@@ -0,0 +1,290 @@
+import argparse
+import logging
+import os
+import re
+from typing import Dict, Iterator, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+from bible_io import compression_of, open_text
+from bible_shards import Bible, is_sharded
+from bible_stream import Chapter, iter_chapters
+from progress import setup_logging
+
+# Exports the {osis: {title, chapters}} JSON as OSIS XML or USFM.
+#
+# Both writers take the chapters in the order bible_stream reads them and
+# write each one as soon as it arrives, as text, so exporting a whole Bible is
+# one pass over the input in the memory of a single chapter:
+#
+#   OSIS   one document with a <div type="book" osisID="Gen"> per book and
+#          <chapter osisID="Gen.1"> / <verse osisID="Gen.1.1"> containers
+#   USFM   a directory with one file per book (01-GEN.usfm, ...), with \id,
+#          \h, \mt1, \c and \v markers
+#
+#   python3 scripts/bible_export.py data/bible_fr.json --osis data/bible_fr.osis.xml --work FreJer --lang fr
+#   python3 scripts/bible_export.py data/bible_fr.json --usfm data/bible_fr_usfm/
+#
+# Verse labels with a letter ("3a") become osisID "Gen.1.3!a" in OSIS and
+# stay "3a" in USFM. Characters XML cannot hold are dropped from the OSIS
+# output, and backslashes in the text (which USFM reads as markers) are
+# written as U+29F5.
+
+logger = logging.getLogger("bible_export")
+
+OSIS_NAMESPACE = "http://www.bibletechnologies.net/2003/OSIS/namespace"
+OSIS_SCHEMA = "http://www.bibletechnologies.net/osisCore.2.1.1.xsd"
+
+# OSIS book codes to USFM book identifiers
+USFM_BOOKS = {
+    "Gen": "GEN", "Exod": "EXO", "Lev": "LEV", "Num": "NUM", "Deut": "DEU", "Josh": "JOS", "Judg": "JDG",
+    "Ruth": "RUT", "1Sam": "1SA", "2Sam": "2SA", "1Kgs": "1KI", "2Kgs": "2KI", "1Chr": "1CH", "2Chr": "2CH",
+    "Ezra": "EZR", "Neh": "NEH", "Esth": "EST", "Job": "JOB", "Ps": "PSA", "Prov": "PRO", "Eccl": "ECC",
+    "Song": "SNG", "Isa": "ISA", "Jer": "JER", "Lam": "LAM", "Ezek": "EZK", "Dan": "DAN", "Hos": "HOS",
+    "Joel": "JOL", "Amos": "AMO", "Obad": "OBA", "Jonah": "JON", "Mic": "MIC", "Nah": "NAM", "Hab": "HAB",
+    "Zeph": "ZEP", "Hag": "HAG", "Zech": "ZEC", "Mal": "MAL",
+    "Matt": "MAT", "Mark": "MRK", "Luke": "LUK", "John": "JHN", "Acts": "ACT", "Rom": "ROM", "1Cor": "1CO",
+    "2Cor": "2CO", "Gal": "GAL", "Eph": "EPH", "Phil": "PHP", "Col": "COL", "1Thess": "1TH", "2Thess": "2TH",
+    "1Tim": "1TI", "2Tim": "2TI", "Titus": "TIT", "Phlm": "PHM", "Heb": "HEB", "Jas": "JAS", "1Pet": "1PE",
+    "2Pet": "2PE", "1John": "1JN", "2John": "2JN", "3John": "3JN", "Jude": "JUD", "Rev": "REV",
+    "Tob": "TOB", "Jdt": "JDT", "EsthGr": "ESG", "AddEsth": "ESG", "Wis": "WIS", "Sir": "SIR", "Bar": "BAR",
+    "EpJer": "LJE", "PrAzar": "S3Y", "Sus": "SUS", "Bel": "BEL", "DanGr": "DAG", "AddDan": "DAG",
+    "1Macc": "1MA", "2Macc": "2MA", "3Macc": "3MA", "4Macc": "4MA", "1Esd": "1ES", "2Esd": "2ES",
+    "PrMan": "MAN", "Ps151": "PS2", "Odes": "ODA", "PssSol": "PSS", "EpLao": "LAO",
+}
+
+# USFM identifiers for books with no standard one
+USFM_EXTRA_BOOKS = ("XXA", "XXB", "XXC", "XXD", "XXE", "XXF", "XXG")
+
+# Characters not allowed in XML 1.0 (control characters, lone surrogates, U+FFFE/U+FFFF)
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+_LETTERED_LABEL = re.compile(r"(\d+)([a-z]+)")
+
+
+def _xml_text(text: str) -> str:
+    return escape(_INVALID_XML.sub("", text))
+
+
+def _osis_label(label: str) -> str:
+    """A verse label as an osisID segment: "3" -> "3", "3a" -> "3!a"."""
+    match = _LETTERED_LABEL.fullmatch(label)
+    if match:
+        return f"{match.group(1)}!{match.group(2)}"
+    return re.sub(r"[^\w]", "_", label)
+
+
+class _ExportWriter:
+    """
+    Shared chapter-grouping logic of the writers: books start and end as the
+    OSIS code changes. Writers provide _start_book, _end_book, _write_verses,
+    close and abort.
+    """
+
+    def __init__(self):
+        self.osis: Optional[str] = None
+        self.books = 0
+
+    def write_chapter(self, osis: str, title: Optional[str], chapter: Optional[str], verses: Optional[Dict[str, str]]):
+        """Write one chapter (chapter None starts a book without chapters); same arguments as BibleWriter."""
+        if osis != self.osis:
+            if self.osis is not None:
+                self._end_book()
+            self.osis = osis
+            self.books += 1
+            self._start_book(osis, title)
+        if chapter is not None:
+            self._write_verses(osis, str(chapter), verses or {})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class OsisWriter(_ExportWriter):
+    """Writes an OSIS XML document chapter by chapter."""
+
+    def __init__(self, path: str, work: str = "Bible", lang: Optional[str] = None, title: Optional[str] = None):
+        """
+        Args:
+            path: Output file (.gz and .zst are compressed).
+            work: osisIDWork of the text, e.g. "FreJer".
+            lang: xml:lang of the text, e.g. "fr".
+            title: Title of the work in the header (defaults to `work`).
+        """
+        super().__init__()
+        self.path = path
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.f = open_text(self.tmp_path, "w", compression_of(path))
+        lang_attribute = f" xml:lang={quoteattr(lang)}" if lang else ""
+        self.f.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<osis xmlns="{OSIS_NAMESPACE}" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+            f'xsi:schemaLocation="{OSIS_NAMESPACE} {OSIS_SCHEMA}">\n'
+            f'  <osisText osisIDWork={quoteattr(work)} osisRefWork="Bible"{lang_attribute}>\n'
+            '    <header>\n'
+            f'      <work osisWork={quoteattr(work)}>\n'
+            f'        <title>{_xml_text(title or work)}</title>\n'
+            '        <type type="OSIS">Bible</type>\n'
+            f'        <identifier type="OSIS">Bible.{_xml_text(work)}</identifier>\n'
+            '        <refSystem>Bible</refSystem>\n'
+            '      </work>\n'
+            '    </header>\n'
+        )
+
+    def _start_book(self, osis: str, title: Optional[str]):
+        self.f.write(f'    <div type="book" osisID={quoteattr(osis)}>\n')
+        if title:
+            self.f.write(f'      <title type="main">{_xml_text(title)}</title>\n')
+
+    def _end_book(self):
+        self.f.write('    </div>\n')
+
+    def _write_verses(self, osis: str, chapter: str, verses: Dict[str, str]):
+        chapter_id = f"{osis}.{_osis_label(chapter)}"
+        lines = [f'      <chapter osisID={quoteattr(chapter_id)}>\n']
+        for verse, text in verses.items():
+            verse_id = f"{chapter_id}.{_osis_label(verse)}"
+            label = f" n={quoteattr(verse)}" if _osis_label(verse) != verse else ""
+            lines.append(f'        <verse osisID={quoteattr(verse_id)}{label}>{_xml_text(str(text))}</verse>\n')
+        lines.append('      </chapter>\n')
+        self.f.write("".join(lines))
+
+    def close(self):
+        if self.osis is not None:
+            self._end_book()
+        self.f.write('  </osisText>\n</osis>\n')
+        self.f.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """Discard the partially written file."""
+        self.f.close()
+        os.remove(self.tmp_path)
+
+
+class UsfmWriter(_ExportWriter):
+    """Writes one USFM file per book into a directory, chapter by chapter."""
+
+    def __init__(self, directory: str, description: Optional[str] = None):
+        """
+        Args:
+            directory: Output directory (created if missing).
+            description: Text after the book code on each \\id line, e.g. the translation name.
+        """
+        super().__init__()
+        self.directory = directory
+        self.description = description
+        self.f = None
+        self.path: Optional[str] = None
+        self.tmp_path: Optional[str] = None
+        self._extra = iter(USFM_EXTRA_BOOKS)
+        os.makedirs(directory, exist_ok=True)
+
+    def _start_book(self, osis: str, title: Optional[str]):
+        code = USFM_BOOKS.get(osis)
+        if code is None:
+            code = next(self._extra, None)
+            if code is None:
+                raise ValueError(f"No USFM book identifier left for {osis}")
+            logger.warning("%s has no USFM book identifier; writing it as %s", osis, code)
+        self.path = os.path.join(self.directory, f"{self.books:02d}-{code}.usfm")
+        self.tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        self.f = open(self.tmp_path, "w", encoding="utf-8", newline="\n")
+        header = [f"\\id {code}" + (f" {self.description}" if self.description else ""), "\\usfm 3.0", "\\ide UTF-8"]
+        if title:
+            title = self._text(title)
+            header += [f"\\h {title}", f"\\toc1 {title}", f"\\mt1 {title}"]
+        self.f.write("\n".join(header) + "\n")
+
+    @staticmethod
+    def _text(text: str) -> str:
+        return " ".join(str(text).replace("\\", "\u29f5").split())
+
+    def _end_book(self):
+        self.f.close()
+        os.replace(self.tmp_path, self.path)
+        self.f = None
+
+    def _write_verses(self, osis: str, chapter: str, verses: Dict[str, str]):
+        lines = [f"\\c {chapter}", "\\p"]
+        lines += [f"\\v {verse} {self._text(text)}".rstrip() for verse, text in verses.items()]
+        self.f.write("\n".join(lines) + "\n")
+
+    def close(self):
+        if self.f is not None:
+            self._end_book()
+
+    def abort(self):
+        """Discard the book being written; books already finished stay."""
+        if self.f is not None:
+            self.f.close()
+            os.remove(self.tmp_path)
+            self.f = None
+
+
+def read_chapters(path: str) -> Iterator[Chapter]:
+    """The chapters of a Bible JSON file (streamed) or shard directory (one book in memory at a time)."""
+    if not is_sharded(path):
+        yield from iter_chapters(path)
+        return
+    bible = Bible(path)
+    for osis in bible:
+        book = bible[osis]
+        if not book["chapters"]:
+            yield Chapter(osis, book["title"], None, None)
+        for chapter, verses in book["chapters"].items():
+            yield Chapter(osis, book["title"], chapter, verses)
+        bible.unload(osis)
+
+
+def export(path: str, osis_path: Optional[str] = None, usfm_dir: Optional[str] = None,
+           work: str = "Bible", lang: Optional[str] = None, title: Optional[str] = None) -> int:
+    """
+    Export a Bible to OSIS and/or USFM in a single pass over the input.
+
+    Returns:
+        int: Number of books exported.
+    """
+    writers = []
+    try:
+        if osis_path:
+            writers.append(OsisWriter(osis_path, work, lang, title))
+        if usfm_dir:
+            writers.append(UsfmWriter(usfm_dir, title or work))
+        for chapter in read_chapters(path):
+            for writer in writers:
+                writer.write_chapter(*chapter)
+    except BaseException:
+        for writer in writers:
+            writer.abort()
+        raise
+    for writer in writers:
+        writer.close()
+    return writers[0].books if writers else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export a Bible JSON file to OSIS XML and/or USFM.')
+    parser.add_argument('input', type=str, help='Bible JSON file (plain, .gz or .zst) or shard directory')
+    parser.add_argument('--osis', type=str, help='OSIS XML file to write')
+    parser.add_argument('--usfm', type=str, help='Directory to write one USFM file per book into')
+    parser.add_argument('--work', type=str, default='Bible', help='Work identifier, e.g. FreJer (default: Bible)')
+    parser.add_argument('--lang', type=str, help='Language code of the text, e.g. fr')
+    parser.add_argument('--title', type=str, help='Title of the translation (default: the work identifier)')
+    args = parser.parse_args()
+
+    setup_logging("bible_export")
+    if not args.osis and not args.usfm:
+        parser.error("give --osis and/or --usfm")
+
+    books = export(args.input, args.osis, args.usfm, args.work, args.lang, args.title)
+    logger.info("Exported %d books to %s", books, " and ".join(path for path in (args.osis, args.usfm) if path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+import argparse
+import logging
+import os
+import re
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from bible_diff import diff_bibles, print_diff
+from bible_export import USFM_BOOKS
+from bible_io import dump_json, open_binary, open_text
+from bible_shards import load_bible, write_bible
+from crawl_plan import load_index
+from passage_refs import PassageError, lookup_book
+from progress import setup_logging
+
+# Reads Bibles that already exist as files into the usual
+# {osis: {"title": ..., "chapters": {chapter: {verse: text}}}} structure, the
+# counterpart of bible_export.py:
+#
+#   OSIS XML   container (<verse osisID="Gen.1.1">...</verse>) and milestone
+#              (<verse sID=.../> ... <verse eID=.../>) verses
+#   USFM       a file or a directory of .usfm/.sfm files; \id, \h, \c and \v
+#   Zefania    <BIBLEBOOK bnumber=...><CHAPTER cnumber=...><VERS vnumber=...>
+#
+# The XML formats are read with iterparse, clearing every chapter once its
+# verses are taken, so memory holds the result and one chapter of the tree
+# (one book for OSIS files whose chapters are milestones). Notes, headings and
+# other text outside verses are left out and whitespace is collapsed.
+#
+# Book identifiers are mapped to the project's OSIS codes: USFM codes through
+# bible_export.USFM_BOOKS, Zefania book numbers 1-66 by the usual Protestant
+# order, and anything else (OSIS variants, book names in any language)
+# through passage_refs. Books that cannot be identified are skipped with a
+# warning. Files ending in .gz or .zst are decompressed on the fly.
+#
+#   python3 scripts/bible_import.py downloads/fra-lsg.osis.xml --output data/bible_lsg.json
+#   python3 scripts/bible_import.py downloads/engwebp_usfm/ --output data/bible_web.json --compare data/bible_nrsvce.json
+
+logger = logging.getLogger("bible_import")
+
+FORMATS = ("osis", "usfm", "zefania")
+
+# USFM identifiers shared by two OSIS codes (ESG, DAG) map to the later
+# entry, AddEsth/AddDan, which is what the scrapers use
+OSIS_FROM_USFM = {code: osis for osis, code in USFM_BOOKS.items()}
+
+# USFM_BOOKS lists the 66 books of the Protestant canon first, in the order
+# Zefania numbers them; numbers above 66 differ between files, so those books
+# are identified by name
+ZEFANIA_BOOKS = {number: osis for number, osis in enumerate(list(USFM_BOOKS)[:66], 1)}
+
+# USFM markers whose text is not part of any verse: identification, titles,
+# headings, references and comments (titles are picked up separately)
+USFM_SKIPPED = re.compile(r"(id|ide|usfm|sts|rem|h|toc\d*|toca\d*|mt\d*|mte\d*|ms\d*|mr|s\d*|sr|r|d|sp|sd\d*|"
+                          r"cl|cp|cd|is\d*|ip|ipi|im|imi|ipq|imq|ipr|iq\d*|ib|ili\d*|iot|io\d*|iex|imt\d*|ie|"
+                          r"lit|restore)")
+USFM_TITLES = ("h", "toc1", "mt1", "mt")
+_USFM_NOTE = re.compile(r"\\(f|fe|ef|x|ex|fig|va|vp|ca|cat)\b.*?\\\1\*", re.S)
+_USFM_ATTRIBUTES = re.compile(r"\|[^\\]*(?=\\\+?[a-z0-9]+\*)")
+_USFM_MARKER = re.compile(r"\\(\+?[a-z0-9-]*\*|\+?[a-z0-9-]+)")
+# Paragraph markers: text after one of them inside a verse is still that verse's
+USFM_PARAGRAPHS = re.compile(r"(p|m|po|pr|cls|pmo|pm|pmc|pmr|pi\d*|mi|nb|pc|ph\d*|b|q\d*|qr|qc|qa|qm\d*|qd|"
+                             r"lh|li\d*|lf|lim\d*|tr)")
+# Front and back matter, not books of the Bible
+USFM_PERIPHERALS = {"FRT", "INT", "BAK", "OTH", "CNC", "GLO", "TDX", "NDX"}
+
+_KNOWN_CODES = {book["osis"] for book in load_index()} | set(USFM_BOOKS)
+
+
+def _local(tag: str) -> str:
+    """An element name without its namespace."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _clean(text: str) -> str:
+    return " ".join(text.split())
+
+
+def book_code(identifier: str) -> Optional[str]:
+    """The project's OSIS code for a book identifier or name, or None if it cannot be identified."""
+    if identifier in _KNOWN_CODES:
+        return identifier
+    if identifier.upper() in OSIS_FROM_USFM:
+        return OSIS_FROM_USFM[identifier.upper()]
+    try:
+        return lookup_book(identifier)
+    except PassageError:
+        return None
+
+
+class _Collector:
+    """Builds the {osis: {title, chapters}} result, warning once about every unknown book."""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.bible: Dict[str, Dict] = {}
+        self.unknown = set()
+        self._codes: Dict[str, Optional[str]] = {}
+
+    def book(self, identifier: str, title: Optional[str] = None) -> Optional[str]:
+        if identifier not in self._codes:
+            osis = self._codes[identifier] = book_code(identifier)
+            if osis is None:
+                logger.warning("%s: unknown book %r skipped", self.source, identifier)
+                self.unknown.add(identifier)
+            elif identifier != osis:
+                logger.debug("%s: book %r read as %s", self.source, identifier, osis)
+        osis = self._codes[identifier]
+        if osis is not None:
+            book = self.bible.setdefault(osis, {"title": None, "chapters": {}})
+            if title and not book["title"]:
+                book["title"] = title
+        return osis
+
+    def verse(self, osis: str, chapter: str, verse: str, text: str):
+        chapters = self.bible[osis]["chapters"]
+        verses = chapters.setdefault(chapter, {})
+        if verse in verses:
+            # A verse split by a note or a milestone: keep both parts
+            verses[verse] = _clean(verses[verse] + " " + text)
+        else:
+            verses[verse] = _clean(text)
+
+    def result(self) -> Dict[str, Dict]:
+        """The books in canonical order, with the English name for any book that had no title."""
+        index = load_index()
+        order = {book["osis"]: i for i, book in enumerate(index)}
+        names = {book["osis"]: book["display"] for book in index}
+        bible = {}
+        for osis in sorted(self.bible, key=lambda osis: order.get(osis, len(order))):
+            book = self.bible[osis]
+            bible[osis] = {"title": book["title"] or names.get(osis, osis), "chapters": book["chapters"]}
+        return bible
+
+
+def _osis_ref(osis_id: str) -> Optional[Tuple[str, str, str]]:
+    """(book, chapter, verse) of the first reference in an osisID like "KJV:Gen.1.1 Gen.1.2" or "Ps.1.3!a"."""
+    reference = osis_id.split()[0].split(":")[-1]
+    parts = reference.split(".")
+    if len(parts) < 3:
+        return None
+    return parts[0], parts[1], parts[2].replace("!", "")
+
+
+class _OsisVerses:
+    """Walks a finished subtree in document order and hands out the text of each verse."""
+
+    # Elements whose text never belongs to the verse around them
+    SKIPPED = {"note", "title", "header", "rdg", "figure"}
+    # Block and line elements: their text is separated from what comes before and after
+    BREAKS = {"l", "lg", "lb", "p", "q", "div", "list", "item", "chapter"}
+
+    def __init__(self, collector: _Collector):
+        self.collector = collector
+        self.current: Optional[Tuple[str, str, str]] = None
+        self.parts: List[str] = []
+
+    def _start(self, osis_id: str):
+        self._end()
+        ref = _osis_ref(osis_id)
+        if ref is None:
+            return
+        osis = self.collector.book(ref[0])
+        if osis is not None:
+            self.current = (osis, ref[1], ref[2])
+
+    def _end(self):
+        if self.current is not None:
+            self.collector.verse(*self.current, "".join(self.parts))
+        self.current = None
+        self.parts = []
+
+    def _text(self, text: Optional[str]):
+        if text and self.current is not None:
+            self.parts.append(text)
+
+    def walk(self, element: ET.Element):
+        for child in element:
+            tag = _local(child.tag)
+            if tag == "verse":
+                if child.get("eID"):
+                    self._end()
+                elif child.get("sID") or (child.get("osisID") and not len(child) and not child.text):
+                    # Milestone start: the verse runs until its eID (or the next verse)
+                    self._start(child.get("osisID") or child.get("sID"))
+                elif child.get("osisID"):
+                    self._start(child.get("osisID"))
+                    self._text(child.text)
+                    self.walk(child)
+                    self._end()
+                    continue
+            elif tag not in self.SKIPPED:
+                separator = " " if tag in self.BREAKS else ""
+                self._text(separator)
+                self._text(child.text)
+                self.walk(child)
+                self._text(separator)
+            self._text(child.tail)
+
+
+def import_osis(path: str) -> Dict[str, Dict]:
+    """Read an OSIS XML file (see the module comment)."""
+    collector = _Collector(path)
+    verses = _OsisVerses(collector)
+    stack: List[ET.Element] = []
+    book: Optional[str] = None
+    with open_binary(path) as f:
+        for event, element in ET.iterparse(f, events=("start", "end")):
+            tag = _local(element.tag)
+            if event == "start":
+                if tag == "div" and element.get("type") == "book":
+                    book = element.get("osisID")
+                stack.append(element)
+                continue
+
+            stack.pop()
+            parent = stack[-1] if stack else None
+            if tag == "title" and book and parent is not None and parent.get("osisID") == book:
+                # The book's own title (not a heading inside a chapter)
+                collector.book(book, _clean("".join(element.itertext())) or None)
+            elif (tag == "chapter" and not (element.get("sID") or element.get("eID"))) or \
+                    (tag == "div" and element.get("type") == "book"):
+                # Verses inside a finished chapter (or a book whose chapters are milestones)
+                verses.walk(element)
+                if tag == "div":
+                    verses._end()
+                    book = None
+                element.clear()
+    verses._end()
+    return collector.result()
+
+
+def _usfm_books(path: str) -> Iterator[Tuple[str, str]]:
+    """(file name, text) of every USFM file of a directory, or of a single file."""
+    if not os.path.isdir(path):
+        with open_text(path) as f:
+            yield path, f.read()
+        return
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith((".usfm", ".sfm")):
+            with open(os.path.join(path, name), "r", encoding="utf-8-sig") as f:
+                yield name, f.read()
+
+
+def import_usfm(path: str) -> Dict[str, Dict]:
+    """Read a USFM file or a directory of them (see the module comment)."""
+    collector = _Collector(path)
+    for name, text in _usfm_books(path):
+        text = _USFM_ATTRIBUTES.sub("", _USFM_NOTE.sub("", text))
+        osis = chapter = verse = None
+        titles: Dict[str, str] = {}
+        parts: List[str] = []
+        skipping = False
+
+        def end_verse():
+            if osis and chapter and verse:
+                collector.verse(osis, chapter, verse, "".join(parts))
+            parts.clear()
+
+        pieces = _USFM_MARKER.split(text)
+        for marker, content in zip(pieces[1::2], pieces[2::2]):
+            marker = marker.lstrip("+")
+            if not marker.endswith("*") and content[:1].isspace():
+                # The space after an opening marker belongs to the marker
+                content = content[1:]
+            if marker == "id":
+                end_verse()
+                code = content.split()[0].upper() if content.split() else ""
+                if code in USFM_PERIPHERALS:
+                    logger.debug("%s: %s skipped", name, code)
+                    osis = None
+                else:
+                    osis = collector.book(code)
+                chapter, verse, titles = None, None, {}
+                skipping = True
+            elif marker == "c":
+                end_verse()
+                chapter, verse = content.split()[0], None
+                if osis:
+                    book = collector.bible[osis]
+                    if not book["title"]:
+                        book["title"] = next((titles[key] for key in USFM_TITLES if key in titles), None)
+                skipping = True
+            elif marker == "v":
+                end_verse()
+                verse, content = (re.split(r"\s", content.lstrip(), maxsplit=1) + [""])[:2]
+                skipping = False
+                parts.append(content)
+            elif not marker.endswith("*") and USFM_SKIPPED.fullmatch(marker):
+                if marker in USFM_TITLES:
+                    titles.setdefault(marker, _clean(content))
+                skipping = True
+            elif USFM_PARAGRAPHS.fullmatch(marker):
+                skipping = verse is None
+                if not skipping:
+                    parts.append(" " + content)
+            elif not skipping:
+                # Character markers and their closing \marker*: the text carries on
+                parts.append(content)
+        end_verse()
+    return collector.result()
+
+
+def import_zefania(path: str) -> Dict[str, Dict]:
+    """Read a Zefania XML file (see the module comment)."""
+    collector = _Collector(path)
+    osis = chapter = None
+    with open_binary(path) as f:
+        for event, element in ET.iterparse(f, events=("start", "end")):
+            tag = element.tag.upper()
+            if event == "start":
+                if tag == "BIBLEBOOK":
+                    number = int(element.get("bnumber", 0) or 0)
+                    identifier = ZEFANIA_BOOKS.get(number) or element.get("bsname") or element.get("bname", "")
+                    if number not in ZEFANIA_BOOKS and book_code(identifier) is None:
+                        identifier = element.get("bname") or identifier
+                    osis = collector.book(identifier, element.get("bname"))
+                elif tag == "CHAPTER":
+                    chapter = element.get("cnumber")
+                continue
+
+            if tag == "VERS" and osis and chapter:
+                text = "".join(_zefania_text(element))
+                collector.verse(osis, chapter, element.get("vnumber", ""), text)
+                element.clear()
+            elif tag in ("CHAPTER", "BIBLEBOOK"):
+                element.clear()
+    return collector.result()
+
+
+def _zefania_text(element: ET.Element) -> Iterator[str]:
+    """The text of a VERS element without its notes."""
+    if element.text:
+        yield element.text
+    for child in element:
+        if child.tag.upper() != "NOTE":
+            yield from _zefania_text(child)
+        if child.tail:
+            yield child.tail
+
+
+def detect_format(path: str) -> str:
+    """'osis', 'usfm' or 'zefania', from the start of the file (or a directory of USFM files)."""
+    if os.path.isdir(path):
+        return "usfm"
+    with open_binary(path) as f:
+        head = f.read(4096).decode("utf-8", "replace")
+    if "<osis" in head:
+        return "osis"
+    if re.search(r"<XMLBIBLE", head, re.I):
+        return "zefania"
+    if re.search(r"^\\id\s", head.lstrip("\ufeff"), re.M):
+        return "usfm"
+    raise ValueError(f"Cannot tell the format of {path}; pass --format")
+
+
+def import_bible(path: str, format: Optional[str] = None) -> Dict[str, Dict]:
+    """Read a Bible file in any of FORMATS (detected when not given)."""
+    format = format or detect_format(path)
+    readers = {"osis": import_osis, "usfm": import_usfm, "zefania": import_zefania}
+    return readers[format](path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import an OSIS, USFM or Zefania Bible into the JSON format.')
+    parser.add_argument('input', type=str, help='OSIS or Zefania XML file, USFM file or directory of USFM files')
+    parser.add_argument('--format', choices=FORMATS, help='Input format (default: detected)')
+    parser.add_argument('--output', type=str, help='JSON file or shard directory to write')
+    parser.add_argument('--compare', type=str, metavar='BIBLE',
+                        help='Compare the imported text with this Bible JSON file or shard directory')
+    args = parser.parse_args()
+
+    setup_logging("bible_import")
+    if not args.output and not args.compare:
+        parser.error("give --output and/or --compare")
+
+    try:
+        bible_data = import_bible(args.input, args.format)
+    except ValueError as e:
+        parser.error(str(e))
+    chapters = sum(len(book["chapters"]) for book in bible_data.values())
+    verses = sum(len(chapter) for book in bible_data.values() for chapter in book["chapters"].values())
+    logger.info("Read %d books, %d chapters, %d verses from %s", len(bible_data), chapters, verses, args.input)
+
+    if args.output:
+        if os.path.isdir(args.output) or args.output.endswith(("/", os.sep)):
+            write_bible(args.output, bible_data)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+            dump_json(bible_data, args.output)
+        logger.info("Saved to %s", args.output)
+
+    if args.compare:
+        print_diff(diff_bibles(load_bible(args.compare), bible_data), limit=20)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import gzip
+import io
+import os
+from typing import Any, BinaryIO, Dict, Optional, TextIO
+
+try:
+    import zstandard
+except ImportError:  # only needed for .zst files
+    zstandard = None
+
+from bible_schema import COMPACT_SEPARATORS, decode_bible, dumps, loads
+
+# Reading and writing the scraped JSON with compression picked by extension:
+# "bible_es.json.gz" is gzip, "bible_es.json.zst" is Zstandard (needs the
+# optional zstandard package), anything else is plain UTF-8. Data is
+# compressed and decompressed as it streams, and compressed files are written
+# without indentation, since nobody reads them by eye and whitespace costs
+# more than the compressor saves on it. JSON goes through bible_schema, which
+# uses msgspec or orjson when installed.
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+def compression_of(path: str) -> Optional[str]:
+    """'gzip', 'zstd' or None, from the file extension."""
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith(".zst"):
+        return "zstd"
+    return None
+
+
+def sidecar_path(path: str, name: str) -> str:
+    """A file next to `path` with the same format, e.g. bible_rsv.json.gz -> bible_rsv_notes.json.gz."""
+    path = str(path)
+    suffix = ".json" + {"gzip": ".gz", "zstd": ".zst"}.get(compression_of(path), "")
+    stem = path[:-len(suffix)] if path.endswith(suffix) else os.path.splitext(path)[0]
+    return f"{stem}_{name}{suffix}"
+
+
+class _GzipFile(gzip.GzipFile):
+    """GzipFile over a file it owns and closes."""
+
+    def __init__(self, raw: BinaryIO, mode: str):
+        self._owned = raw
+        super().__init__(filename="", mode=mode, compresslevel=GZIP_LEVEL, fileobj=raw, mtime=0)
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._owned.close()
+
+
+def open_binary(path: str, mode: str = "r", compression: Optional[str] = None) -> BinaryIO:
+    """
+    Open a byte stream, compressed according to `compression`
+    (defaults to the one the file extension implies).
+
+    Args:
+        path: File to open.
+        mode: "r" or "w".
+        compression: "gzip", "zstd" or None; pass it when writing to a
+            temporary name that lacks the real extension.
+    """
+    compression = compression or compression_of(str(path))
+    if compression == "gzip":
+        # No file name and mtime=0 in the header keep the output byte-identical
+        # between runs (writers open a temporary name that differs every time)
+        return _GzipFile(open(path, mode + "b"), mode + "b")
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError(".zst files need the zstandard package (pip install zstandard)")
+        raw = open(path, mode + "b")
+        if mode == "r":
+            return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=True)
+    return open(path, mode + "b")
+
+
+def open_text(path: str, mode: str = "r", compression: Optional[str] = None) -> TextIO:
+    """open_binary as a UTF-8 text stream."""
+    compression = compression or compression_of(str(path))
+    if compression is None:
+        return open(path, mode, encoding="utf-8")
+    return io.TextIOWrapper(open_binary(path, mode, compression), encoding="utf-8")
+
+
+def json_format(path: str, indent: Optional[int] = 2) -> dict:
+    """json.dump keyword arguments for a file: compact when compressed, `indent` otherwise."""
+    if compression_of(str(path)):
+        return {"indent": None, "separators": COMPACT_SEPARATORS}
+    return {"indent": indent}
+
+
+def _read(path: str) -> bytes:
+    with open_binary(path) as f:
+        return f.read()
+
+
+def load_json(path: str) -> Any:
+    """json.load a plain, .gz or .zst file."""
+    return loads(_read(path))
+
+
+def load_bible_json(path: str) -> Dict[str, Dict]:
+    """
+    Load a monolithic Bible file (plain, .gz or .zst), checking it against the
+    {osis: {title, chapters}} schema as it is parsed.
+
+    Raises:
+        json.JSONDecodeError: The file is not JSON.
+        bible_schema.SchemaError: The file is JSON but not a Bible.
+    """
+    return decode_bible(_read(path), str(path))
+
+
+def dump_json(data: Any, path: str, indent: Optional[int] = 2):
+    """
+    Write JSON to a plain, .gz or .zst file (compact when compressed).
+
+    The data goes to a temporary file that then replaces `path`, so an
+    interrupted save never leaves a truncated file behind.
+    """
+    path = str(path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    encoded = dumps(data, **json_format(path, indent))
+    with open_binary(tmp_path, "w", compression_of(path)) as f:
+        f.write(encoded)
+    os.replace(tmp_path, path)
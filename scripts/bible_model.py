@@ -0,0 +1,308 @@
+import os
+import sys
+from array import array
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from bible_stream import BibleWriter, iter_chapters
+
+# Compact in-memory representation of a Bible, for code that keeps several
+# translations loaded at once.
+#
+# The {osis: {title, chapters: {chapter: {verse: text}}}} dictionaries cost a
+# dict per chapter, a key string per verse and a str object per verse text,
+# which together outweigh the text itself. Here each book holds:
+#
+#   - its whole text as one UTF-8 buffer, verses back to back (a str would
+#     take 2 or 4 bytes per character for the whole book as soon as one
+#     verse has a character such as a curly apostrophe)
+#   - an array of verse start offsets into that buffer
+#   - an array of where each chapter's verses start
+#   - chapter labels (interned strings) and verse labels (an array of
+#     numbers when they are the usual "1", "2", ..., interned strings when a
+#     book has labels like "3a")
+#
+# Book, Chapter and Verse are lightweight views over that storage. Book and
+# Chapter are read-only mappings like the dictionaries they replace, so
+# `bible["Gen"]["1"]["1"]` works on either:
+#
+#   bible = CompactBible.load("data/bible_es.json")
+#   for verse in bible.verses():
+#       print(verse.osis, verse.chapter, verse.verse, verse.text)
+#   bible.save("data/bible_es_copy.json")
+
+# Verse numbers stored as an unsigned short array ('H') must fit in it
+_MAX_NUMERIC_LABEL = 0xFFFF
+
+
+def _numeric_labels(labels: List[str]) -> Optional[array]:
+    """The labels as an array of numbers if every one is a plain decimal like "12", else None."""
+    numbers = array('H')
+    for label in labels:
+        if not label.isdigit() or (label[0] == "0" and label != "0") or int(label) > _MAX_NUMERIC_LABEL:
+            return None
+        numbers.append(int(label))
+    return numbers
+
+
+class Verse:
+    """One verse of a CompactBible, resolved from its book's buffers on access."""
+
+    __slots__ = ("_book", "_chapter", "_index")
+
+    def __init__(self, book: "Book", chapter: int, index: int):
+        self._book = book
+        self._chapter = chapter
+        self._index = index
+
+    @property
+    def osis(self) -> str:
+        return self._book.osis
+
+    @property
+    def chapter(self) -> str:
+        return self._book._chapter_labels[self._chapter]
+
+    @property
+    def verse(self) -> str:
+        return self._book._verse_label(self._index)
+
+    @property
+    def text(self) -> str:
+        return self._book._verse_text(self._index)
+
+    def __repr__(self) -> str:
+        return f"Verse({self.osis} {self.chapter}:{self.verse})"
+
+
+class Chapter(Mapping):
+    """Read-only {verse: text} view of one chapter of a Book."""
+
+    __slots__ = ("_book", "_index", "_start", "_end")
+
+    def __init__(self, book: "Book", index: int):
+        self._book = book
+        self._index = index
+        self._start = book._chapter_starts[index]
+        self._end = book._chapter_starts[index + 1]
+
+    @property
+    def osis(self) -> str:
+        return self._book.osis
+
+    @property
+    def number(self) -> str:
+        return self._book._chapter_labels[self._index]
+
+    def _find(self, verse: Union[int, str]) -> int:
+        verse = str(verse)
+        labels = self._book._verse_labels
+        if isinstance(labels, array):
+            if not verse.isdigit():
+                raise KeyError(verse)
+            wanted: Union[int, str] = int(verse)
+            if str(wanted) != verse:
+                raise KeyError(verse)
+        else:
+            wanted = verse
+        # Verses are usually numbered from 1 without gaps, so try that position first
+        guess = self._start + wanted - 1 if isinstance(wanted, int) else -1
+        if self._start <= guess < self._end and labels[guess] == wanted:
+            return guess
+        for index in range(self._start, self._end):
+            if labels[index] == wanted:
+                return index
+        raise KeyError(verse)
+
+    def __getitem__(self, verse: str) -> str:
+        return self._book._verse_text(self._find(verse))
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self._start, self._end):
+            yield self._book._verse_label(index)
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        """(verse, text) pairs without looking each verse up again."""
+        book = self._book
+        text, offsets, labels = book._text, book._offsets, book._verse_labels
+        numeric = isinstance(labels, array)
+        for index in range(self._start, self._end):
+            label = labels[index]
+            yield str(label) if numeric else label, text[offsets[index]:offsets[index + 1]].decode("utf-8")
+
+    def verses(self) -> Iterator[Verse]:
+        for index in range(self._start, self._end):
+            yield Verse(self._book, self._index, index)
+
+    def to_dict(self) -> Dict[str, str]:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"Chapter({self.osis} {self.number}, {len(self)} verses)"
+
+
+class Book(Mapping):
+    """
+    One book's text and structure in a few flat buffers, behaving as a
+    read-only {chapter: Chapter} mapping.
+    """
+
+    __slots__ = ("osis", "title", "_text", "_offsets", "_chapter_labels", "_chapter_starts", "_verse_labels")
+
+    def __init__(self, osis: str, title: Optional[str], chapters: Mapping):
+        """
+        Args:
+            osis: OSIS code of the book.
+            title: Book title.
+            chapters: {chapter: {verse: text}}, as in the JSON files.
+        """
+        self.osis = sys.intern(osis)
+        self.title = title
+        texts: List[bytes] = []
+        verse_labels: List[str] = []
+        chapter_labels: List[str] = []
+        chapter_starts = array('I', [0])
+        for chapter, verses in chapters.items():
+            chapter_labels.append(sys.intern(str(chapter)))
+            for verse, text in verses.items():
+                verse_labels.append(str(verse))
+                texts.append(text.encode("utf-8"))
+            chapter_starts.append(len(texts))
+
+        offsets = array('I', [0])
+        position = 0
+        for text in texts:
+            position += len(text)
+            offsets.append(position)
+        self._text = b"".join(texts)
+        self._offsets = offsets
+        self._chapter_labels = tuple(chapter_labels)
+        self._chapter_starts = chapter_starts
+        numbers = _numeric_labels(verse_labels)
+        self._verse_labels = numbers if numbers is not None else tuple(sys.intern(label) for label in verse_labels)
+
+    def _verse_text(self, index: int) -> str:
+        return self._text[self._offsets[index]:self._offsets[index + 1]].decode("utf-8")
+
+    def _verse_label(self, index: int) -> str:
+        label = self._verse_labels[index]
+        return str(label) if isinstance(label, int) else label
+
+    def chapter(self, number: Union[int, str]) -> Chapter:
+        """A chapter by its label ("1" or 1)."""
+        try:
+            return Chapter(self, self._chapter_labels.index(str(number)))
+        except ValueError:
+            raise KeyError(number) from None
+
+    def __getitem__(self, chapter: str) -> Chapter:
+        return self.chapter(chapter)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._chapter_labels)
+
+    def __len__(self) -> int:
+        return len(self._chapter_labels)
+
+    def chapters(self) -> Iterator[Chapter]:
+        for index in range(len(self._chapter_labels)):
+            yield Chapter(self, index)
+
+    def verses(self) -> Iterator[Verse]:
+        for chapter in self.chapters():
+            yield from chapter.verses()
+
+    @property
+    def verse_count(self) -> int:
+        return len(self._offsets) - 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The book in the JSON layout: {"title": ..., "chapters": {chapter: {verse: text}}}."""
+        book: Dict[str, Any] = {} if self.title is None else {"title": self.title}
+        book["chapters"] = {chapter.number: chapter.to_dict() for chapter in self.chapters()}
+        return book
+
+    def __repr__(self) -> str:
+        return f"Book({self.osis}, {len(self)} chapters, {self.verse_count} verses)"
+
+
+class CompactBible(Mapping):
+    """A whole Bible as {osis: Book}, converted from and to the JSON layout."""
+
+    def __init__(self, books: Optional[List[Book]] = None):
+        self._books: Dict[str, Book] = {book.osis: book for book in books or []}
+
+    @classmethod
+    def from_dict(cls, bible_data: Mapping) -> "CompactBible":
+        """Convert the usual {osis: {title, chapters}} dictionary (or a sharded Bible)."""
+        bible = cls()
+        for osis in bible_data:
+            book = bible_data[osis]
+            bible.add_book(osis, book.get("title"), book.get("chapters", {}))
+            if hasattr(bible_data, "unload"):
+                # A sharded Bible keeps parsed books cached; only one is needed at a time
+                bible_data.unload(osis)
+        return bible
+
+    @classmethod
+    def load(cls, path: str) -> "CompactBible":
+        """
+        Read a Bible JSON file (plain, .gz or .zst) or shard directory.
+
+        Files are read chapter by chapter, so the full dictionary form is
+        never in memory at once.
+        """
+        if os.path.isdir(path):
+            from bible_shards import Bible
+            return cls.from_dict(Bible(path))
+
+        bible = cls()
+        osis, title, chapters = None, None, {}
+        for chapter in iter_chapters(path):
+            if chapter.osis != osis:
+                if osis is not None:
+                    bible.add_book(osis, title, chapters)
+                osis, title, chapters = chapter.osis, chapter.title, {}
+            if chapter.chapter is not None:
+                chapters[chapter.chapter] = chapter.verses
+        if osis is not None:
+            bible.add_book(osis, title, chapters)
+        return bible
+
+    def add_book(self, osis: str, title: Optional[str], chapters: Mapping) -> Book:
+        """Add or replace a book from its {chapter: {verse: text}} dictionary."""
+        book = self._books[osis] = Book(osis, title, chapters)
+        return book
+
+    def __getitem__(self, osis: str) -> Book:
+        return self._books[osis]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._books)
+
+    def __len__(self) -> int:
+        return len(self._books)
+
+    def verses(self) -> Iterator[Verse]:
+        """Every verse, in book, chapter and verse order."""
+        for book in self._books.values():
+            yield from book.verses()
+
+    def text(self, osis: str, chapter: Union[int, str], verse: Union[int, str]) -> str:
+        return self._books[osis].chapter(chapter)[str(verse)]
+
+    def to_dict(self) -> Dict[str, Dict]:
+        """The whole Bible in the JSON layout."""
+        return {osis: book.to_dict() for osis, book in self._books.items()}
+
+    def save(self, path: str, indent: Optional[int] = 2):
+        """Write the Bible in the JSON layout, one chapter at a time."""
+        with BibleWriter(path, indent) as writer:
+            for book in self._books.values():
+                if not len(book):
+                    writer.write_chapter(book.osis, book.title, None, None)
+                for chapter in book.chapters():
+                    writer.write_chapter(book.osis, book.title, chapter.number, chapter.to_dict())
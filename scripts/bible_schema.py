@@ -0,0 +1,203 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import msgspec
+except ImportError:  # optional, fastest backend
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:  # optional, used when msgspec is missing
+    orjson = None
+
+# The document model every scraper writes, in one place:
+#
+#   {osis: {"title": str, "chapters": {chapter: {verse: str}}}}
+#
+# decode_bible() parses a file's bytes and checks them against this schema in
+# the same pass (with msgspec, when installed), so a book with a missing title
+# or a verse that is not a string is reported where it is read instead of
+# somewhere downstream. book_errors() is the same check for data already in
+# memory, used by the validators.
+#
+# loads() and dumps() are drop-in replacements for json.loads and
+# json.dumps(..., ensure_ascii=False) that use msgspec or orjson when one is
+# installed. For documents made of strings, integers, lists and objects (all
+# these files hold) dumps() produces the same bytes as the standard library,
+# and it falls back to it for anything the fast encoders format differently
+# (other indents, custom separators, non-string keys). Floats are the one
+# exception: the fast encoders write 1e16 where json.dumps writes 1e+16.
+
+if msgspec is not None:
+    BACKEND = "msgspec"
+elif orjson is not None:
+    BACKEND = "orjson"
+else:
+    BACKEND = "json"
+
+DEFAULT_SEPARATORS = (",", ": ")
+# json.dump's defaults with the spaces removed, for compressed output
+COMPACT_SEPARATORS = (",", ":")
+
+# At most this many problems are listed in a SchemaError message
+MAX_REPORTED_ERRORS = 10
+
+
+class SchemaError(ValueError):
+    """Well-formed JSON that is not a Bible document."""
+
+    def __init__(self, errors: List[str], source: Optional[str] = None):
+        self.errors = errors
+        shown = errors[:MAX_REPORTED_ERRORS]
+        if len(errors) > len(shown):
+            shown.append(f"... and {len(errors) - len(shown)} more")
+        prefix = f"{source} is not a valid Bible document" if source else "Not a valid Bible document"
+        super().__init__(prefix + ":\n  " + "\n  ".join(shown))
+
+
+if msgspec is not None:
+    class _Book(msgspec.Struct, forbid_unknown_fields=True):
+        title: str
+        chapters: Dict[str, Dict[str, str]]
+
+    _bible_decoder = msgspec.json.Decoder(Dict[str, _Book])
+    _book_decoder = msgspec.json.Decoder(_Book)
+    _encoder = msgspec.json.Encoder()
+    _ENCODE_ERRORS = (TypeError, ValueError, msgspec.EncodeError)
+else:
+    _ENCODE_ERRORS = (TypeError, ValueError)
+
+
+def book_errors(book: Any) -> List[str]:
+    """Everything wrong with one book's structure (empty if it matches the schema)."""
+    if not isinstance(book, dict):
+        return ["Book must be an object"]
+
+    errors = []
+    if "title" not in book:
+        errors.append("Missing 'title' field")
+    elif not isinstance(book["title"], str):
+        errors.append("'title' must be a string")
+    for key in book:
+        if key not in ("title", "chapters"):
+            errors.append(f"Unknown field {key!r}")
+    if "chapters" not in book:
+        errors.append("Missing 'chapters' field")
+        return errors
+
+    chapters = book["chapters"]
+    if not isinstance(chapters, dict):
+        errors.append("'chapters' must be an object")
+        return errors
+
+    for chapter_num, chapter_data in chapters.items():
+        if not isinstance(chapter_data, dict):
+            errors.append(f"Chapter {chapter_num} must be an object")
+            continue
+
+        for verse_num, verse_text in chapter_data.items():
+            if not isinstance(verse_text, str):
+                errors.append(f"Verse {chapter_num}:{verse_num} must be a string")
+
+    return errors
+
+
+def bible_errors(bible_data: Any) -> List[str]:
+    """book_errors for a whole Bible, each prefixed with the book's OSIS code."""
+    if not isinstance(bible_data, dict):
+        return ["The document must be an object of books"]
+    return [f"{osis}: {error}" for osis, book in bible_data.items() for error in book_errors(book)]
+
+
+def _malformed(error: Exception, data: bytes) -> json.JSONDecodeError:
+    # Same exception type as the standard library, so existing handlers keep working
+    return json.JSONDecodeError(str(error), data.decode("utf-8", "replace"), 0)
+
+
+def loads(data: bytes) -> Any:
+    """json.loads with the fastest backend available."""
+    if msgspec is not None:
+        try:
+            return msgspec.json.decode(data)
+        except msgspec.DecodeError as e:
+            raise _malformed(e, data) from e
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def decode_bible(data: bytes, source: Optional[str] = None) -> Dict[str, Dict]:
+    """
+    Parse a Bible document and check it against the schema.
+
+    Args:
+        data: The JSON text (bytes or str).
+        source: File name used in error messages.
+
+    Returns:
+        Dict[str, Dict]: The document as plain dictionaries, like json.loads.
+
+    Raises:
+        json.JSONDecodeError: The data is not JSON.
+        SchemaError: The data is JSON but not a Bible document.
+    """
+    if msgspec is not None:
+        try:
+            books = _bible_decoder.decode(data)
+        except msgspec.ValidationError as e:
+            # Decode again without the schema to describe every problem, not just the first
+            raise SchemaError(bible_errors(loads(data)) or [str(e)], source) from None
+        except msgspec.DecodeError as e:
+            raise _malformed(e, data) from e
+        return {osis: {"title": book.title, "chapters": book.chapters} for osis, book in books.items()}
+
+    bible_data = loads(data)
+    errors = bible_errors(bible_data)
+    if errors:
+        raise SchemaError(errors, source)
+    return bible_data
+
+
+def decode_book(data: bytes, source: Optional[str] = None) -> Dict:
+    """decode_bible for a single {"title", "chapters"} object, such as a shard."""
+    if msgspec is not None:
+        try:
+            book = _book_decoder.decode(data)
+        except msgspec.ValidationError as e:
+            raise SchemaError(book_errors(loads(data)) or [str(e)], source) from None
+        except msgspec.DecodeError as e:
+            raise _malformed(e, data) from e
+        return {"title": book.title, "chapters": book.chapters}
+
+    book = loads(data)
+    errors = book_errors(book)
+    if errors:
+        raise SchemaError(errors, source)
+    return book
+
+
+def _fast_dumps(data: Any, indent: Optional[int], separators: Tuple[str, str]) -> Optional[bytes]:
+    """The fast encoders' output when it matches json.dumps, None when it would not."""
+    compact = indent is None and separators == COMPACT_SEPARATORS
+    indented = isinstance(indent, int) and indent > 0 and separators == DEFAULT_SEPARATORS
+    try:
+        if msgspec is not None and (compact or indented):
+            encoded = _encoder.encode(data)
+            return msgspec.json.format(encoded, indent=indent) if indented else encoded
+        if orjson is not None and (compact or (indented and indent == 2)):
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indented else 0)
+    except _ENCODE_ERRORS:
+        # Lone surrogates, keys json.dumps converts but the fast encoders reject, ...
+        pass
+    return None
+
+
+def dumps(data: Any, indent: Optional[int] = 2, separators: Optional[Tuple[str, str]] = None) -> bytes:
+    """UTF-8 bytes of json.dumps(data, ensure_ascii=False, indent=indent, separators=separators)."""
+    if separators is None:
+        separators = DEFAULT_SEPARATORS if indent is not None else (", ", ": ")
+    encoded = _fast_dumps(data, indent, separators)
+    if encoded is None:
+        encoded = json.dumps(data, ensure_ascii=False, indent=indent, separators=separators).encode("utf-8")
+    return encoded
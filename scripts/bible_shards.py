@@ -0,0 +1,254 @@
+import argparse
+import functools
+import hashlib
+import os
+import tempfile
+import time
+from collections.abc import Mapping
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from bible_io import dump_json, load_bible_json
+from bible_schema import decode_book, dumps, loads
+from crawl_plan import load_index
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# One-file-per-book layout for Bible JSON.
+#
+# A sharded Bible is a directory holding one <osis>.json per book, in the same
+# {"title", "chapters"} shape as a book of the monolithic files, plus a small
+# manifest.json with every book's title, chapter and verse counts and the
+# SHA-1 of its shard:
+#
+#   data/bible_es/manifest.json
+#   data/bible_es/Gen.json
+#   data/bible_es/Exod.json
+#   ...
+#
+# Reading one book only parses that book's shard, and writing one only
+# rewrites that shard and its manifest entry, so writers working on different
+# books can run in parallel. Shards are replaced atomically, and each shard
+# and its manifest entry are written together under a lock file.
+#
+#   python3 scripts/bible_shards.py split data/bible_es.json data/bible_es
+#   python3 scripts/bible_shards.py join data/bible_es data/bible_es.json
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+
+
+def is_sharded(path: str) -> bool:
+    """True if `path` is a sharded Bible directory."""
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+@functools.lru_cache(maxsize=None)
+def _book_order() -> Dict[str, int]:
+    return {book["osis"]: i for i, book in enumerate(load_index())}
+
+
+def _canonical_order(books) -> List[str]:
+    order = _book_order()
+    return sorted(books, key=lambda osis: order.get(osis, len(order)))
+
+
+def _write_atomic(path: str, data: bytes):
+    # A unique temporary name, so threads of one process do not share it
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".",
+                                    suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _read_manifest(path: str) -> Dict:
+    with open(os.path.join(path, MANIFEST), 'rb') as f:
+        return loads(f.read())
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(fd: int):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def _manifest_lock(path: str, timeout: float = 60.0) -> Iterator[None]:
+    """
+    Exclusive lock on a shard directory's manifest, shared with other threads
+    and processes. The lock file stays in place; the operating system releases
+    the lock itself when a writer dies, so there are no stale locks to break.
+    """
+    lock_path = os.path.join(path, MANIFEST + ".lock")
+    fd = os.open(lock_path, os.O_CREAT | os.O_RDWR)
+    try:
+        deadline = time.monotonic() + timeout
+        while not _try_lock(fd):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Could not lock {lock_path}")
+            time.sleep(0.01)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+def write_book(path: str, osis: str, book: Dict) -> Dict:
+    """
+    Write or replace one book's shard and update its manifest entry.
+
+    Args:
+        path: Shard directory (created if missing).
+        osis: OSIS code of the book.
+        book: {"title": ..., "chapters": {chapter: {verse: text}}}.
+
+    Returns:
+        Dict: The book's manifest entry.
+    """
+    os.makedirs(path, exist_ok=True)
+    data = dumps(book, indent=2)
+    entry = {
+        "title": book.get("title", osis),
+        "file": f"{osis}.json",
+        "chapters": len(book.get("chapters", {})),
+        "verses": sum(len(chapter) for chapter in book.get("chapters", {}).values()),
+        "sha1": hashlib.sha1(data).hexdigest(),
+    }
+    # The shard is written under the lock too, so the manifest's hash is always the one of the file on disk
+    with _manifest_lock(path):
+        _write_atomic(os.path.join(path, entry["file"]), data)
+        manifest = _read_manifest(path) if is_sharded(path) else {"format": FORMAT_VERSION, "books": {}}
+        manifest["books"][osis] = entry
+        manifest["books"] = {key: manifest["books"][key] for key in _canonical_order(manifest["books"])}
+        _write_atomic(os.path.join(path, MANIFEST), dumps(manifest, indent=2))
+    return entry
+
+
+def write_bible(path: str, bible_data: Dict, books: Optional[List[str]] = None):
+    """Write every book of `bible_data` (or only `books`) as shards."""
+    for osis in books if books is not None else bible_data:
+        write_book(path, osis, bible_data[osis])
+
+
+class Bible(Mapping):
+    """
+    Read-only view of a sharded Bible that parses each book on first access.
+
+    Behaves like the {osis: {title, chapters}} dictionary of a monolithic file,
+    so it can be passed to code written for one. Titles and counts come from
+    the manifest without touching the shards.
+    """
+
+    def __init__(self, path: str, verify: bool = False):
+        self.path = path
+        self.verify = verify
+        self.manifest = _read_manifest(path)
+        self._books: Dict[str, Dict] = {}
+
+    def __getitem__(self, osis: str) -> Dict:
+        book = self._books.get(osis)
+        if book is None:
+            entry = self.manifest["books"][osis]
+            with open(os.path.join(self.path, entry["file"]), 'rb') as f:
+                data = f.read()
+            if self.verify and hashlib.sha1(data).hexdigest() != entry["sha1"]:
+                raise ValueError(f"{entry['file']} does not match the manifest hash")
+            book = self._books[osis] = decode_book(data, entry["file"])
+        return book
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.manifest["books"])
+
+    def __len__(self) -> int:
+        return len(self.manifest["books"])
+
+    def title(self, osis: str) -> str:
+        return self.manifest["books"][osis]["title"]
+
+    def chapter_count(self, osis: str) -> int:
+        return self.manifest["books"][osis]["chapters"]
+
+    def unload(self, osis: Optional[str] = None):
+        """Drop parsed books (one or all) to free memory."""
+        if osis is None:
+            self._books.clear()
+        else:
+            self._books.pop(osis, None)
+
+    def to_dict(self) -> Dict:
+        """Load every book into one monolithic dictionary."""
+        return {osis: self[osis] for osis in self}
+
+
+def load_bible(path: str) -> Mapping:
+    """Open a Bible from either a monolithic JSON file (plain or compressed) or a shard directory."""
+    if os.path.isdir(path):
+        return Bible(path)
+    return load_bible_json(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert between monolithic and per-book Bible JSON.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    split_parser = commands.add_parser('split', help='Write a monolithic file as one shard per book')
+    split_parser.add_argument('input', type=str, help='Monolithic Bible JSON file')
+    split_parser.add_argument('output', type=str, help='Shard directory')
+
+    join_parser = commands.add_parser('join', help='Combine shards into a monolithic file')
+    join_parser.add_argument('input', type=str, help='Shard directory')
+    join_parser.add_argument('output', type=str, help='Monolithic Bible JSON file')
+
+    verify_parser = commands.add_parser('verify', help='Check every shard against the manifest')
+    verify_parser.add_argument('input', type=str, help='Shard directory')
+    args = parser.parse_args()
+
+    if args.command == 'split':
+        bible_data = load_bible_json(args.input)
+        write_bible(args.output, bible_data)
+        print(f"Wrote {len(bible_data)} books to {args.output}")
+    elif args.command == 'join':
+        bible = Bible(args.input)
+        dump_json(bible.to_dict(), args.output)
+        print(f"Wrote {len(bible)} books to {args.output}")
+    elif args.command == 'verify':
+        bible = Bible(args.input, verify=True)
+        bad = []
+        for osis in bible:
+            try:
+                bible[osis]
+            except (OSError, ValueError) as e:
+                bad.append(osis)
+                print(f"{osis}: {e}")
+            bible.unload(osis)
+        print(f"{len(bible) - len(bad)}/{len(bible)} shards OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+import json
+import os
+from typing import Any, Dict, Iterator, NamedTuple, Optional, Tuple
+
+from bible_io import compression_of, json_format, open_text
+from bible_schema import dumps
+
+# Incremental reading and writing of the monolithic {osis: {title, chapters}}
+# JSON files, one chapter at a time.
+#
+# The reader scans the file in chunks and decodes each chapter object on its
+# own, so memory stays at one chapter (plus a read chunk) however large the
+# file is. The writer emits the same bytes json.dump(..., ensure_ascii=False,
+# indent=...) would for the same data, without ever holding more than the
+# chapter being written:
+#
+#   with BibleWriter("data/bible_fr.json") as writer:
+#       for chapter in iter_chapters("data/bible_fr_toclean.json"):
+#           writer.write_chapter(*chapter)
+#
+# Records come out in file order. The writer expects them grouped by book and
+# chapter, as the reader yields them; the title has to precede the chapters,
+# which is how every scraper writes it. Files ending in .gz or .zst are
+# decompressed and compressed on the fly (see bible_io.py).
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class Chapter(NamedTuple):
+    osis: str
+    title: Optional[str]
+    chapter: Optional[str]  # None for a book without a "chapters" object
+    verses: Optional[Dict[str, Any]]
+
+
+class Verse(NamedTuple):
+    osis: str
+    title: Optional[str]
+    chapter: str
+    verse: str
+    text: Any
+
+
+class _Reader:
+    """Chunked JSON tokenizer over a text file, decoding whole values with the stdlib decoder."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what has been consumed so the buffer never grows past a chapter and a chunk
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at the end of the file)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def consume(self, char: str) -> bool:
+        if self.peek() == char:
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, char: str):
+        if not self.consume(char):
+            raise ValueError(f"Expected {char!r} but found {self.peek()!r}")
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value, reading more of the file until it fits."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number can end exactly at the chunk boundary
+            if end == len(self.buf) and not isinstance(value, (dict, list, str)) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def string(self) -> str:
+        if self.peek() != '"':
+            raise ValueError(f"Expected a string but found {self.peek()!r}")
+        return self.value()
+
+
+def iter_events(path: str) -> Iterator[Tuple[str, str, Any]]:
+    """
+    Walk a Bible JSON file as (event, osis, value) tuples:
+
+    ("book", osis, None), ("title", osis, title), ("chapter", osis, (chapter, verses)),
+    ("field", osis, (key, value)) for any other key, including a "chapters" value
+    that is not an object, and ("end_book", osis, None).
+    """
+    with open_text(path) as f:
+        reader = _Reader(f)
+        reader.expect("{")
+        while not reader.consume("}"):
+            osis = reader.string()
+            reader.expect(":")
+            if reader.peek() != "{":
+                yield "book", osis, None
+                yield "field", osis, (None, reader.value())
+                yield "end_book", osis, None
+                reader.consume(",")
+                continue
+
+            reader.expect("{")
+            yield "book", osis, None
+            while not reader.consume("}"):
+                key = reader.string()
+                reader.expect(":")
+                if key == "chapters" and reader.peek() == "{":
+                    reader.expect("{")
+                    while not reader.consume("}"):
+                        chapter = reader.string()
+                        reader.expect(":")
+                        yield "chapter", osis, (chapter, reader.value())
+                        reader.consume(",")
+                elif key == "title":
+                    yield "title", osis, reader.value()
+                else:
+                    yield "field", osis, (key, reader.value())
+                reader.consume(",")
+            yield "end_book", osis, None
+            reader.consume(",")
+
+
+def iter_chapters(path: str) -> Iterator[Chapter]:
+    """Yield every chapter of a Bible JSON file; a book without chapters yields one Chapter with chapter=None."""
+    title = None
+    chapters = 0
+    for event, osis, value in iter_events(path):
+        if event == "book":
+            title, chapters = None, 0
+        elif event == "title":
+            title = value
+        elif event == "chapter":
+            chapters += 1
+            yield Chapter(osis, title, value[0], value[1])
+        elif event == "end_book" and not chapters:
+            yield Chapter(osis, title, None, None)
+
+
+def iter_verses(path: str) -> Iterator[Verse]:
+    """
+    Yield every verse of a Bible JSON file as (osis, title, chapter, verse, text).
+    Books and chapters without verses have no records; use iter_chapters to keep them.
+    """
+    for chapter in iter_chapters(path):
+        if isinstance(chapter.verses, dict):
+            for verse, text in chapter.verses.items():
+                yield Verse(chapter.osis, chapter.title, chapter.chapter, verse, text)
+
+
+def read_outline(path: str) -> Dict:
+    """
+    Read a Bible's structure without its text: the usual {osis: {title, chapters}}
+    dictionary with every verse text replaced by "" (values that are not strings
+    are kept, so type checks still see them). Keys missing from a book stay missing.
+    """
+    outline: Dict[str, Any] = {}
+    for event, osis, value in iter_events(path):
+        if event == "book":
+            outline[osis] = {}
+        elif event == "title":
+            outline[osis]["title"] = value
+        elif event == "chapter":
+            chapter, verses = value
+            if isinstance(verses, dict):
+                verses = {verse: "" if isinstance(text, str) else text for verse, text in verses.items()}
+            outline[osis].setdefault("chapters", {})[chapter] = verses
+        elif event == "field":
+            key, field = value
+            if key is None:
+                outline[osis] = field
+            elif key == "chapters":
+                outline[osis]["chapters"] = field
+            else:
+                outline[osis][key] = None
+    return outline
+
+
+class BibleWriter:
+    """
+    Writes a Bible JSON file chapter by chapter, formatted exactly like
+    json.dump(data, f, ensure_ascii=False, indent=indent, separators=separators).
+
+    The file is written under a temporary name and moved into place on close,
+    so the input and the output may be the same file. Compressed files
+    (.gz, .zst) are always written compact.
+    """
+
+    def __init__(self, path: str, indent: Optional[int] = 2, separators: Optional[Tuple[str, str]] = None):
+        self.path = path
+        json_options = json_format(path, indent)
+        indent = json_options["indent"]
+        separators = json_options.get("separators", separators)
+        self.indent = indent
+        self.item_separator, self.key_separator = separators or ((",", ": ") if indent is not None else (", ", ": "))
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.f = open_text(self.tmp_path, "w", compression_of(path))
+        self.f.write("{")
+        self.books = 0
+        self.osis: Optional[str] = None
+        self.chapters = 0
+        self._pending: Optional[Tuple[str, Optional[str], str, Dict[str, Any]]] = None
+
+    def _newline(self, level: int) -> str:
+        return "" if self.indent is None else "\n" + " " * (self.indent * level)
+
+    def _dumps(self, value: Any, level: int = 0) -> str:
+        text = dumps(value, self.indent, (self.item_separator, self.key_separator)).decode("utf-8")
+        # JSON strings never contain raw newlines, so this only re-indents structure
+        return text.replace("\n", self._newline(level)) if self.indent is not None and level else text
+
+    def _end_book(self):
+        if self.osis is None:
+            return
+        self.f.write((self._newline(2) + "}" if self.chapters else "}") + self._newline(1) + "}")
+        self.osis = None
+
+    def _start_book(self, osis: str, title: Optional[str]):
+        self._end_book()
+        if self.books:
+            self.f.write(self.item_separator)
+        self.f.write(self._newline(1) + self._dumps(osis) + self.key_separator + "{")
+        if title is not None:
+            self.f.write(self._newline(2) + '"title"' + self.key_separator + self._dumps(title) + self.item_separator)
+        self.f.write(self._newline(2) + '"chapters"' + self.key_separator + "{")
+        self.books += 1
+        self.osis = osis
+        self.chapters = 0
+
+    def write_chapter(self, osis: str, title: Optional[str], chapter: Optional[str], verses: Optional[Dict[str, Any]]):
+        """Write one chapter; a chapter of None only makes sure the book exists."""
+        self._flush_pending()
+        if osis != self.osis:
+            self._start_book(osis, title)
+        if chapter is None:
+            return
+        if self.chapters:
+            self.f.write(self.item_separator)
+        self.f.write(self._newline(3) + self._dumps(str(chapter)) + self.key_separator + self._dumps(verses or {}, 3))
+        self.chapters += 1
+
+    def write_verse(self, osis: str, title: Optional[str], chapter: str, verse: str, text: Any):
+        """Collect verses into their chapter, which is written once the next chapter starts."""
+        if self._pending and self._pending[0] == osis and self._pending[2] == chapter:
+            self._pending[3][verse] = text
+            return
+        self._flush_pending()
+        self._pending = (osis, title, chapter, {verse: text})
+
+    def _flush_pending(self):
+        if self._pending:
+            pending, self._pending = self._pending, None
+            self.write_chapter(*pending)
+
+    def close(self):
+        self._flush_pending()
+        self._end_book()
+        self.f.write(self._newline(0) + "}" if self.books else "}")
+        self.f.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """Discard the partially written file."""
+        self.f.close()
+        os.remove(self.tmp_path)
+
+    def __enter__(self) -> "BibleWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -1,8 +1,10 @@
-import json
 import os
 from typing import Dict, List, Set
 from pathlib import Path
 
+from bible_schema import book_errors
+from bible_stream import read_outline
+
 # TODO: move MASTER_BOOKS to it's own file
 
 # Master book list with OSIS codes and English names
@@ -94,7 +96,7 @@ def find_bible_json_files() -> List[str]:
         print("Error: data directory does not exist")
         return []
 
-    json_files = list(data_dir.glob("*.json"))
+    json_files = [f for pattern in ("*.json", "*.json.gz", "*.json.zst") for f in data_dir.glob(pattern)]
     if not json_files:
         print("Error: No JSON files found in data directory")
         return []
@@ -141,10 +143,9 @@ def validate_bible_json(file_path: str) -> None:
         return
 
     try:
-        # Load the Bible JSON file
-        with open(file_path, 'r', encoding='utf-8') as f:
-            bible_data = json.load(f)
-    except json.JSONDecodeError:
+        # Load the Bible's structure; the verse text is not needed here
+        bible_data = read_outline(file_path)
+    except ValueError:
         print(f"Error: {file_path} is not a valid JSON file")
         return
     except Exception as e:
@@ -181,12 +182,8 @@ def validate_bible_json(file_path: str) -> None:
     print("\nBook Structure Validation:")
     structure_errors = []
     for book_code, book_data in bible_data.items():
-        if "title" not in book_data:
-            structure_errors.append(f"  - {book_code}: Missing 'title' field")
-        if "chapters" not in book_data:
-            structure_errors.append(f"  - {book_code}: Missing 'chapters' field")
-        elif not isinstance(book_data["chapters"], dict):
-            structure_errors.append(f"  - {book_code}: 'chapters' is not a dictionary")
+        for error in book_errors(book_data):
+            structure_errors.append(f"  - {book_code}: {error}")
 
     if structure_errors:
         print("\nStructure Errors Found:")
@@ -16,29 +16,22 @@
 # these should be removed.
 # all spaces larger than 1 should be replaced with a single space.
 
-import json
 import re
 from pathlib import Path
 
+from bible_stream import BibleWriter, iter_chapters
+
 def clean_verse_text(text):
     # Replace multiple spaces with a single space
     return re.sub(r'\s+', ' ', text).strip()
 
 def clean_bible_json(input_path, output_path):
-    # Read the input JSON file
-    with open(input_path, 'r', encoding='utf-8') as f:
-        bible_data = json.load(f)
-
-    # Process each book, chapter, and verse
-    for book in bible_data.values():
-        if 'chapters' in book:
-            for chapter in book['chapters'].values():
-                for verse_num, verse_text in chapter.items():
-                    chapter[verse_num] = clean_verse_text(verse_text)
-
-    # Write the cleaned data to a new file
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(bible_data, f, ensure_ascii=False, indent=2)
+    # Stream the file chapter by chapter, writing each cleaned chapter straight out
+    with BibleWriter(str(output_path)) as writer:
+        for osis, title, chapter_num, chapter in iter_chapters(str(input_path)):
+            if chapter is not None:
+                chapter = {verse_num: clean_verse_text(verse_text) for verse_num, verse_text in chapter.items()}
+            writer.write_chapter(osis, title, chapter_num, chapter)
 
 if __name__ == '__main__':
     # Define paths
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import quote_plus
+
+# Builds the list of (osis, chapter) pages a scraper has to fetch without
+# sending a single request. Chapter counts come from biblegateway_index.json
+# ("num_chapters"), corrected per source where a site uses a different
+# versification (e.g. Joel 4 / Malachi 3 in Hebrew-numbered translations,
+# Esther 16 in Vulgate-ordered ones).
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+INDEX_FILE = os.path.join(ROOT_DIR, "biblegateway_index.json")
+CACHE_DIR = os.path.join(ROOT_DIR, "data", ".cache")
+
+logger = logging.getLogger("crawl_plan")
+
+# Per-source URL templates, politeness delays and chapter count overrides.
+# {slug} is the site's book identifier, {translation} the version/edition.
+SOURCES = {
+    "biblegateway": {
+        "url": "https://www.biblegateway.com/passage/?search={slug}%20{chapter}&version={translation}",
+        "translation": "NRSVCE",
+        "delay": 2,
+        "overrides": {},
+    },
+    "bibliacatolica": {
+        "url": "https://www.bibliacatolica.com.br/{translation}/{slug}/{chapter}/",
+        "translation": "biblia-ave-maria",
+        "delay": 2,
+        "overrides": {"Esth": 16},
+    },
+    "gratis": {
+        "url": "https://gratis.bible/fr/{translation}/{slug}/{chapter}/",
+        "translation": "dejer",
+        "delay": 0.5,
+        "overrides": {"Joel": 4, "Mal": 3},
+    },
+    "german": {
+        "url": "https://www.uibk.ac.at/theol/leseraum/bibel/{slug}{chapter}.html",
+        "translation": "eu",
+        "delay": 1,
+        "overrides": {"Joel": 4, "Mal": 3},
+    },
+    "stepbible": {
+        "url": "https://www.stepbible.org/?q=version={translation}@reference={slug}.{chapter}",
+        "translation": "FreCrampon",
+        "delay": 1,
+        "overrides": {"Esth": 16},
+    },
+}
+
+
+class CrawlTask(NamedTuple):
+    osis: str
+    chapter: int
+    url: str
+
+
+def load_index(index_file: str = INDEX_FILE) -> List[Dict]:
+    """Load the book list (display, osis, num_chapters) from the BibleGateway index."""
+    with open(index_file, 'r', encoding='utf-8') as f:
+        index_data = json.load(f)
+
+    return [
+        {"display": book["display"], "osis": book["osis"], "num_chapters": book["num_chapters"]}
+        for book in index_data["data"][0]
+    ]
+
+
+def chapter_counts(source: str, overrides: Optional[Dict[str, int]] = None,
+                   index_file: str = INDEX_FILE) -> Dict[str, int]:
+    """Return {osis: number of chapters} for a source, overrides applied."""
+    counts = {book["osis"]: book["num_chapters"] for book in load_index(index_file)}
+    counts.update(SOURCES[source]["overrides"])
+    counts.update(overrides or {})
+    return counts
+
+
+def _plan_key(source: str, translation: str, books: List[str], slugs: Dict[str, str],
+              overrides: Dict[str, int], index_file: str) -> str:
+    """Fingerprint everything a plan depends on, so stale caches are rebuilt."""
+    with open(index_file, 'rb') as f:
+        index_hash = hashlib.sha1(f.read()).hexdigest()
+
+    payload = json.dumps({
+        "source": source,
+        "spec": SOURCES[source],
+        "translation": translation,
+        "books": books,
+        "slugs": slugs,
+        "overrides": overrides,
+        "index": index_hash,
+    }, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def build_plan(source: str, translation: Optional[str] = None, books: Optional[List[str]] = None,
+               slugs: Optional[Dict[str, str]] = None, overrides: Optional[Dict[str, int]] = None,
+               index_file: str = INDEX_FILE, use_cache: bool = True) -> List[CrawlTask]:
+    """
+    Build the full, deduplicated list of chapter pages to fetch for a source.
+
+    Args:
+        source: Key of SOURCES (e.g. "bibliacatolica").
+        translation: Version/edition filled into the URL (defaults to the source's).
+        books: OSIS codes to include, in crawl order (defaults to the index order).
+        slugs: Mapping of OSIS code to the site's book identifier. Books without
+            a slug fall back to the URL-quoted BibleGateway display name.
+        overrides: Extra {osis: chapter count} corrections for this run.
+        index_file: Path to biblegateway_index.json.
+        use_cache: Reuse a previously built plan from data/.cache when its inputs match.
+
+    Returns:
+        List[CrawlTask]: One task per chapter page, in crawl order.
+    """
+    spec = SOURCES[source]
+    translation = translation or spec["translation"]
+    index = load_index(index_file)
+    display_names = {book["osis"]: book["display"] for book in index}
+    books = list(books) if books is not None else [book["osis"] for book in index]
+    slugs = dict(slugs or {})
+    overrides = dict(overrides or {})
+
+    cache_path = os.path.join(CACHE_DIR, f"plan_{source}_{translation}.json")
+    key = _plan_key(source, translation, books, slugs, overrides, index_file)
+
+    if use_cache and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get("key") == key:
+                return [CrawlTask(*task) for task in cached["tasks"]]
+        except (json.JSONDecodeError, TypeError):
+            pass
+
+    counts = chapter_counts(source, overrides, index_file)
+    tasks = []
+    seen_urls = set()
+    for osis in books:
+        if osis not in counts:
+            logger.warning("%s is not in the index and has no chapter override - skipping", osis)
+            continue
+
+        slug = slugs.get(osis) or quote_plus(display_names.get(osis, osis))
+        for chapter in range(1, counts[osis] + 1):
+            url = spec["url"].format(slug=slug, chapter=chapter, translation=translation)
+            if url in seen_urls:
+                continue
+            seen_urls.add(url)
+            tasks.append(CrawlTask(osis, chapter, url))
+
+    if use_cache:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({"key": key, "tasks": [list(task) for task in tasks]}, f)
+
+    return tasks
+
+
+def pending_tasks(plan: List[CrawlTask], bible_data: Dict) -> List[CrawlTask]:
+    """Drop tasks whose chapter is already present in previously scraped data."""
+    return [
+        task for task in plan
+        if str(task.chapter) not in bible_data.get(task.osis, {}).get("chapters", {})
+    ]
+
+
+def group_by_book(plan: List[CrawlTask]) -> Dict[str, List[CrawlTask]]:
+    """Group tasks by OSIS code, preserving crawl order."""
+    grouped: Dict[str, List[CrawlTask]] = {}
+    for task in plan:
+        grouped.setdefault(task.osis, []).append(task)
+    return grouped
+
+
+def format_duration(seconds: float) -> str:
+    """Format seconds as H:MM:SS."""
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def print_plan_summary(source: str, plan: List[CrawlTask], delay: Optional[float] = None,
+                       seconds_per_request: float = 0.5, concurrency: int = 1):
+    """Print the exact request count and an ETA before anything is sent."""
+    delay = SOURCES[source]["delay"] if delay is None else delay
+    books = len(group_by_book(plan))
+    eta = len(plan) * (delay + seconds_per_request) / max(concurrency, 1)
+    logger.info("Crawl plan for %s: %d requests across %d books, ETA %s",
+                source, len(plan), books, format_duration(eta),
+                extra={"source": source, "requests": len(plan), "books": books, "eta_seconds": round(eta)})
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    for source_name in SOURCES:
+        print_plan_summary(source_name, build_plan(source_name, use_cache=False))
@@ -0,0 +1,372 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple, Union
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.util.retry import Retry
+
+try:
+    import h2  # noqa: F401 - httpx needs it to speak HTTP/2
+    import httpx
+except ImportError:  # only needed for HTTP/2
+    httpx = None
+
+from metrics import Metrics, get_metrics
+
+# Shared fetch layer for the scrapers.
+#
+# Identical requests made at the same time are coalesced into one in-flight
+# request (single-flight), and pages are memoized for the rest of the run, so
+# any number of callers asking for the same page cost one round trip and one
+# parse. Parsed soups are shared between callers and must not be mutated.
+# Every request that goes over the wire is recorded in the shared metrics.
+#
+# Setting SCRAPER_MOCK_URL (e.g. http://127.0.0.1:8765) sends every request to
+# that server instead, keeping the path and query, so the scrapers can be run
+# against benchmarks/mock_server.py. Metrics still report the original host.
+#
+# Hosts listed in SCRAPER_HTTP2 (comma-separated, or "all") are fetched over
+# HTTP/2 with httpx (pip install "httpx[http2]"), which multiplexes every
+# concurrent request to a host over a single connection. Retries, backoff,
+# caching and metrics work as for the requests session, and callers get the
+# same requests responses and exceptions. A host that does not negotiate
+# HTTP/2 is switched back to the requests session after its first response.
+
+logger = logging.getLogger("fetch")
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/110.0.0.0"
+}
+
+# A parsed soup takes roughly this many times the memory of its source text
+SOUP_SIZE_FACTOR = 10
+
+# Retry policy of the session (and of the HTTP/2 client, which mirrors it)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+BACKOFF_FACTOR = 1
+BACKOFF_MAX = 120
+
+POOL_SIZE = 32
+
+
+def _http2_setting() -> Union[bool, Set[str]]:
+    """SCRAPER_HTTP2 as True (every host), a set of hosts, or False."""
+    value = os.environ.get("SCRAPER_HTTP2", "").strip()
+    if value.lower() in ("1", "all", "true", "yes"):
+        return True
+    return {host.strip() for host in value.split(",") if host.strip()}
+
+
+def _backoff(retry: int, response: Optional["httpx.Response"] = None) -> float:
+    """Seconds to wait before the given retry, the way urllib3's Retry computes it."""
+    if response is not None and response.status_code in (429, 503):
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return float(retry_after)
+    if retry <= 1:
+        return 0.0
+    return min(BACKOFF_MAX, BACKOFF_FACTOR * 2 ** (retry - 1))
+
+
+def _as_requests_error(error: Exception) -> requests.exceptions.RequestException:
+    """The requests exception a transport error would have raised through the session."""
+    if isinstance(error, httpx.TimeoutException):
+        return requests.exceptions.Timeout(str(error))
+    return requests.exceptions.ConnectionError(str(error))
+
+
+def _as_requests_response(response: "httpx.Response") -> requests.Response:
+    """Wrap an httpx response so callers see the same object as from the session."""
+    converted = requests.Response()
+    converted.status_code = response.status_code
+    converted.reason = response.reason_phrase
+    converted.headers = CaseInsensitiveDict(response.headers)
+    converted.url = str(response.url)
+    converted.encoding = get_encoding_from_headers(converted.headers)
+    converted.elapsed = response.elapsed
+    # The body has already been read; requests keeps it in _content
+    converted._content = response.content
+    return converted
+
+
+class _Call:
+    """A request in flight that other callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MemoCache:
+    """LRU cache bounded by the approximate size of its values, in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+class Fetcher:
+    def __init__(self, headers: Optional[Dict[str, str]] = None, retries: int = 3,
+                 timeout: float = 30, max_cache_bytes: int = 256 * 1024 * 1024,
+                 metrics: Optional[Metrics] = None, http2: Union[bool, Iterable[str], None] = None):
+        """
+        Args:
+            http2: Hosts to fetch over HTTP/2, or True for every host
+                (defaults to SCRAPER_HTTP2). Ignored without httpx.
+        """
+        self.headers = dict(DEFAULT_HEADERS if headers is None else headers)
+        self.timeout = timeout
+        self.retries = retries
+        self.metrics = metrics or get_metrics()
+        self.mock_url = os.environ.get("SCRAPER_MOCK_URL")
+        self.session = requests.Session()
+
+        # Same retry strategy as the Vatican scraper: exponential backoff on
+        # throttling and server errors
+        retry_strategy = Retry(
+            total=retries,
+            backoff_factor=BACKOFF_FACTOR,
+            status_forcelist=list(RETRY_STATUSES),
+        )
+        adapter = HTTPAdapter(max_retries=retry_strategy, pool_maxsize=POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.cache = MemoCache(max_cache_bytes)
+        self._inflight: Dict[Hashable, _Call] = {}
+        self._inflight_lock = threading.Lock()
+
+        http2 = _http2_setting() if http2 is None else http2
+        self.http2: Union[bool, Set[str]] = http2 if isinstance(http2, bool) else set(http2)
+        if self.http2 and httpx is None:
+            logger.warning('HTTP/2 needs httpx and h2 (pip install "httpx[http2]"); using HTTP/1.1')
+            self.http2 = False
+        self._http1_hosts: Set[str] = set()
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    def _single_flight(self, key: Hashable, compute: Callable[[], Tuple[Any, int]]) -> Any:
+        """
+        Return a memoized value, joining an identical in-flight computation if there is one.
+
+        compute returns the value and its approximate size in bytes.
+        """
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self._inflight_lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                # Re-check under the lock: the previous leader may have just finished
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached
+                call = self._inflight[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result, size = compute()
+            self.cache.put(key, call.result, size)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+            call.done.set()
+
+    def _rewrite(self, url: str) -> str:
+        """Point a URL at the mock server, if one is configured."""
+        if not self.mock_url:
+            return url
+        mock = urlsplit(self.mock_url)
+        parts = urlsplit(url)
+        return urlunsplit((mock.scheme, mock.netloc, parts.path, parts.query, parts.fragment))
+
+    def _uses_http2(self, host: str) -> bool:
+        if not self.http2 or host in self._http1_hosts:
+            return False
+        return self.http2 is True or host in self.http2
+
+    def _http2_client(self) -> "httpx.Client":
+        with self._client_lock:
+            if self._client is None:
+                self._client = httpx.Client(
+                    http2=True, headers=self.headers, timeout=self.timeout, follow_redirects=True,
+                    limits=httpx.Limits(max_connections=POOL_SIZE),
+                )
+            return self._client
+
+    def _request_http2(self, url: str, host: str) -> requests.Response:
+        """_request over the HTTP/2 client, with the session's retry policy."""
+        client = self._http2_client()
+        start = time.perf_counter()
+        retry = 0
+        while True:
+            try:
+                response = client.get(self._rewrite(url))
+            except httpx.TransportError as e:
+                if retry < self.retries:
+                    retry += 1
+                    time.sleep(_backoff(retry))
+                    continue
+                error = _as_requests_error(e)
+                self.metrics.observe_error(host, type(error).__name__)
+                raise error from e
+            if response.status_code in RETRY_STATUSES:
+                if retry < self.retries:
+                    retry += 1
+                    time.sleep(_backoff(retry, response))
+                    continue
+                # What urllib3 raises through the session once the retries are used up
+                self.metrics.observe_error(host, "RetryError")
+                raise requests.exceptions.RetryError(f"{url}: too many {response.status_code} responses")
+            break
+
+        if response.http_version != "HTTP/2" and host not in self._http1_hosts:
+            logger.info("%s did not negotiate HTTP/2 (%s); using the HTTP/1.1 session", host, response.http_version)
+            self._http1_hosts.add(host)
+        self.metrics.observe_request(
+            host,
+            response.status_code,
+            time.perf_counter() - start,
+            response.elapsed.total_seconds(),
+            len(response.content),
+            retry,
+        )
+        converted = _as_requests_response(response)
+        converted.raise_for_status()
+        return converted
+
+    def _request(self, url: str) -> requests.Response:
+        host = urlsplit(url).netloc
+        if self._uses_http2(host):
+            return self._request_http2(url, host)
+        start = time.perf_counter()
+        try:
+            response = self.session.get(self._rewrite(url), headers=self.headers, timeout=self.timeout)
+            size = len(response.content)
+        except requests.exceptions.RequestException as e:
+            self.metrics.observe_error(host, type(e).__name__)
+            raise
+
+        retries = getattr(response.raw, "retries", None)
+        self.metrics.observe_request(
+            host,
+            response.status_code,
+            time.perf_counter() - start,
+            response.elapsed.total_seconds(),
+            size,
+            len(retries.history) if retries is not None else 0,
+        )
+        response.raise_for_status()
+        return response
+
+    def get_content(self, url: str) -> bytes:
+        """Fetch a page as raw bytes, e.g. to let BeautifulSoup detect the encoding."""
+        def compute():
+            content = self._request(url).content
+            return content, len(content)
+
+        return self._single_flight(("content", url), compute)
+
+    def get_text(self, url: str, encoding: Optional[str] = None) -> str:
+        """Fetch a page as text. Raises requests.exceptions.RequestException on failure."""
+        def compute():
+            response = self._request(url)
+            if encoding:
+                response.encoding = encoding
+            text = response.text
+            return text, len(text)
+
+        return self._single_flight(("text", url, encoding), compute)
+
+    def get_soup(self, url: str, encoding: Optional[str] = None, parser: str = "html.parser") -> BeautifulSoup:
+        """Fetch and parse a page. The returned soup is shared; do not modify it."""
+        def compute():
+            text = self.get_text(url, encoding)
+            return BeautifulSoup(text, parser), SOUP_SIZE_FACTOR * len(text)
+
+        return self._single_flight(("soup", url, encoding, parser), compute)
+
+    def get_json(self, url: str) -> Any:
+        """Fetch and decode a JSON document. The returned object is shared; do not modify it."""
+        def compute():
+            text = self.get_text(url, "utf-8")
+            return json.loads(text), SOUP_SIZE_FACTOR * len(text)
+
+        return self._single_flight(("json", url), compute)
+
+    def map(self, fn: Callable[[Any], Any], items: Iterable[Any], max_workers: int = 4) -> List[Any]:
+        """Apply fn to every item concurrently, preserving order."""
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(fn, items))
+
+    def prefetch(self, urls: Iterable[str], max_workers: int = 4, encoding: Optional[str] = None):
+        """Warm the page cache for a list of URLs; errors are left for the real caller to see."""
+        def fetch_quietly(url):
+            try:
+                self.get_text(url, encoding)
+            except requests.exceptions.RequestException:
+                pass
+
+        self.map(fetch_quietly, urls, max_workers)
+
+
+_default_fetcher: Optional[Fetcher] = None
+_default_lock = threading.Lock()
+
+
+def get_fetcher() -> Fetcher:
+    """Return the fetcher shared by every scraper in this process."""
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = Fetcher()
+        return _default_fetcher
@@ -1,8 +1,9 @@
-import json
 import re
 import os
 import argparse
 
+from bible_stream import BibleWriter, iter_chapters
+
 def clean_verse_text(text):
     """Remove parenthetical verse numbers from the verse text."""
     # Remove patterns like (1:11), (65:12), etc.
@@ -31,6 +32,14 @@ def clean_bible_data(bible_data):
 
     return cleaned_data
 
+def clean_bible_file(input_path, output_path):
+    """Clean a Bible JSON file one chapter at a time."""
+    with BibleWriter(output_path) as writer:
+        for osis, title, chapter_num, chapter_data in iter_chapters(input_path):
+            if chapter_data is not None:
+                chapter_data = {verse_num: clean_verse_text(verse_text) for verse_num, verse_text in chapter_data.items()}
+            writer.write_chapter(osis, title, chapter_num, chapter_data)
+
 def main():
     parser = argparse.ArgumentParser(description='Clean French Bible data by removing parenthetical verse numbers.')
     parser.add_argument('--input', type=str, default='data/bible_fr_toclean.json',
@@ -44,22 +53,9 @@ def main():
         print(f"Error: Input file {args.input} does not exist")
         return
 
-    # Load the input data
-    print(f"Loading data from {args.input}")
-    with open(args.input, 'r', encoding='utf-8') as f:
-        bible_data = json.load(f)
-
-    # Clean the data
-    print("Cleaning verse text...")
-    cleaned_data = clean_bible_data(bible_data)
-
-    # Ensure output directory exists
-    os.makedirs(os.path.dirname(args.output), exist_ok=True)
-
-    # Save the cleaned data
-    print(f"Saving cleaned data to {args.output}")
-    with open(args.output, 'w', encoding='utf-8') as f:
-        json.dump(cleaned_data, f, ensure_ascii=False, indent=2)
+    # Clean the data chapter by chapter, straight into the output file
+    print(f"Cleaning {args.input} into {args.output}")
+    clean_bible_file(args.input, args.output)
 
     print("Done!")
 
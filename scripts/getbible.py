@@ -1,7 +1,17 @@
+import argparse
 import os
+import sys
+import logging
 import requests
 import json
 
+from bible_io import dump_json
+from fetch import get_fetcher
+from metrics import get_metrics
+from progress import Progress, setup_logging
+
+logger = logging.getLogger("getbible")
+
 # Mapping of numeric keys to OSIS codes and English names
 # The numbering is based on the getBible's API
 
@@ -84,7 +94,7 @@ number_to_osis = {
 # Create a reverse mapping from English name to OSIS code
 english_to_osis = { mapping["english_name"]: mapping["osis"] for mapping in number_to_osis.values() }
 
-def getBible():
+def getBible(abbreviation=None):
     """
     Fetches the specified Bible version from getBible's API.
     For more information on the API, see: https://getbible.net/docs
@@ -93,29 +103,30 @@ def getBible():
 
     The final Bible verses are written to a file named in the format:
     getbible_[ABBREVIATION].json in the data folder.
+
+    :param abbreviation: The translation to fetch (e.g. "kjv"); when omitted the
+                         user picks one from a menu.
+    :return: True once the output file is written.
     """
     translations_url = "https://api.getbible.net/v2/translations.json"
 
     # Fetch translations JSON from the API
+    fetcher = get_fetcher()
     try:
-        response = requests.get(translations_url)
-        response.raise_for_status()
+        data = json.loads(fetcher.get_text(translations_url, encoding="utf-8"))
     except requests.RequestException as e:
-        print(f"Error fetching translations: {e}")
+        logger.error("Error fetching translations: %s", e)
         return
 
-    data = response.json()
-
     # Save the raw translations JSON for debugging purposes (optional)
     script_dir = os.path.dirname(os.path.realpath(__file__))
     translations_file = os.path.join(script_dir, "..", "data", "getbible_translations.json")
     try:
         os.makedirs(os.path.dirname(translations_file), exist_ok=True)
-        with open(translations_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-        print(f"Translation data saved to {translations_file}")
+        dump_json(data, translations_file, indent=4)
+        logger.info("Translation data saved to %s", translations_file)
     except Exception as e:
-        print(f"Error saving translations JSON to file: {e}")
+        logger.error("Error saving translations JSON to file: %s", e)
 
     # Extract translations list
     translations = []
@@ -127,24 +138,33 @@ def getBible():
         print("No translations found.")
         return
 
-    # Display a menu of available translations
-    print("\nSelect a Bible version:")
-    for idx, (abbr, name) in enumerate(translations, start=1):
-        print(f"{idx}. {abbr} - {name}")
-
-    # Prompt the user to select a translation
-    while True:
-        try:
-            selection = int(input("Enter the number of your chosen Bible version: "))
-            if 1 <= selection <= len(translations):
-                break
-            else:
-                print("Invalid selection. Please choose a valid number.")
-        except ValueError:
-            print("Invalid input. Please enter a number.")
-
-    chosen_abbr, chosen_name = translations[selection - 1]
-    print(f"\nYou selected: {chosen_name} (abbreviation: {chosen_abbr})")
+    if abbreviation:
+        # Chosen on the command line (unattended runs such as orchestrate.py)
+        names = dict(translations)
+        if abbreviation not in names:
+            logger.error("Unknown translation %r; available: %s", abbreviation, ", ".join(sorted(names)))
+            return
+        chosen_abbr, chosen_name = abbreviation, names[abbreviation]
+        logger.info("Fetching %s (abbreviation: %s)", chosen_name, chosen_abbr)
+    else:
+        # Display a menu of available translations
+        print("\nSelect a Bible version:")
+        for idx, (abbr, name) in enumerate(translations, start=1):
+            print(f"{idx}. {abbr} - {name}")
+
+        # Prompt the user to select a translation
+        while True:
+            try:
+                selection = int(input("Enter the number of your chosen Bible version: "))
+                if 1 <= selection <= len(translations):
+                    break
+                else:
+                    print("Invalid selection. Please choose a valid number.")
+            except ValueError:
+                print("Invalid input. Please enter a number.")
+
+        chosen_abbr, chosen_name = translations[selection - 1]
+        print(f"\nYou selected: {chosen_name} (abbreviation: {chosen_abbr})")
 
     # Compute output file path in the data folder using the chosen abbreviation.
     data_dir = os.path.join(script_dir, "..", "data")
@@ -154,25 +174,22 @@ def getBible():
     # Fetch the books index for the chosen Bible version
     books_url = f"https://api.getbible.net/v2/{chosen_abbr}/books.json"
     try:
-        books_response = requests.get(books_url)
-        books_response.raise_for_status()
-        books_data = books_response.json()
+        books_data = json.loads(fetcher.get_text(books_url, encoding="utf-8"))
     except requests.RequestException as e:
-        print(f"Error fetching books index: {e}")
+        logger.error("Error fetching books index: %s", e)
         return
 
     # This dictionary will hold the final Bible verses structure.
     bible_verses = {}
 
     # For each book in the books index, fetch its content and extract verses.
+    progress = Progress(len(books_data), label="books")
     for num_key, book_info in books_data.items():
         book_name = book_info.get("name", "Unknown Book")
         book_url = book_info.get("url")
-        print(f"\nFetching content for {book_name}...")
+        logger.debug("Fetching content for %s...", book_name)
         try:
-            book_response = requests.get(book_url)
-            book_response.raise_for_status()
-            book_content = book_response.json()
+            book_content = json.loads(fetcher.get_text(book_url, encoding="utf-8"))
 
             # Use the outer numeric key to look up the OSIS code from number_to_osis
             osis_entry = number_to_osis.get(num_key)
@@ -200,17 +217,30 @@ def getBible():
                     bible_verses[osis_key]["chapters"][chapter_num][verse_num] = verse_text
 
             # Print the book name from the response as confirmation.
-            print(f"Processed book: {book_content.get('name', 'No name provided')}")
+            logger.info("Processed book: %s", book_content.get('name', 'No name provided'))
+            progress.advance()
         except requests.RequestException as e:
-            print(f"Error fetching content for {book_name}: {e}")
+            logger.error("Error fetching content for %s: %s", book_name, e)
+            progress.advance(failed=True)
+
+    progress.finish()
 
     # Write the complete Bible verses data to the output JSON file.
     try:
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(bible_verses, f, indent=4, ensure_ascii=False)
-        print(f"\nBible verses data saved to {output_file}")
+        with get_metrics().time_checkpoint("getbible"):
+            dump_json(bible_verses, output_file, indent=4)
+        logger.info("Bible verses data saved to %s", output_file)
     except Exception as e:
-        print(f"Error saving bible verses JSON: {e}")
+        logger.error("Error saving bible verses JSON: %s", e)
+        return False
+    finally:
+        get_metrics().report("getbible")
+    return True
 
 if __name__ == "__main__":
-    getBible()
+    parser = argparse.ArgumentParser(description="Fetch a Bible version from getBible's API.")
+    parser.add_argument('--translation', type=str, help='Abbreviation of the version to fetch (e.g. kjv); asks when omitted')
+    args = parser.parse_args()
+    setup_logging("getbible")
+    if not getBible(args.translation):
+        sys.exit(1)
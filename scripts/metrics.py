@@ -0,0 +1,230 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Crawl instrumentation shared by the fetcher and the scrapers.
+#
+# Records per-host request latency (total and time to first byte), bytes,
+# retries, status codes and errors, plus per-source parse time and checkpoint
+# write time. At the end of a run the numbers are logged as a summary and
+# written as a Prometheus textfile (data/metrics/<source>.prom, or
+# $SCRAPER_METRICS_DIR) for node_exporter's textfile collector.
+
+METRICS_DIR = os.environ.get(
+    "SCRAPER_METRICS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "metrics"),
+)
+
+logger = logging.getLogger("metrics")
+
+# Upper bounds in seconds; wide enough for both parse times and slow requests
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, count) pairs for the Prometheus exposition format."""
+        pairs = []
+        running = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            running += bucket_count
+            pairs.append((f"{bound:g}", running))
+        pairs.append(("+Inf", self.count))
+        return pairs
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_bytes(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class Metrics:
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self.request_seconds: Dict[str, Histogram] = {}
+        self.first_byte_seconds: Dict[str, Histogram] = {}
+        self.statuses: Dict[Tuple[str, int], int] = {}
+        self.errors: Dict[Tuple[str, str], int] = {}
+        self.bytes: Dict[str, int] = {}
+        self.retries: Dict[str, int] = {}
+        self.parse_seconds: Dict[str, Histogram] = {}
+        self.checkpoint_seconds: Dict[str, Histogram] = {}
+
+    def observe_request(self, host: str, status: int, seconds: float, first_byte: float,
+                        size: int, retries: int = 0):
+        """Record one completed HTTP request (after urllib3's own retries)."""
+        with self._lock:
+            self.request_seconds.setdefault(host, Histogram()).observe(seconds)
+            self.first_byte_seconds.setdefault(host, Histogram()).observe(first_byte)
+            self.statuses[(host, status)] = self.statuses.get((host, status), 0) + 1
+            self.bytes[host] = self.bytes.get(host, 0) + size
+            self.retries[host] = self.retries.get(host, 0) + retries
+
+    def observe_error(self, host: str, error: str):
+        """Record a request that failed without a response (timeout, connection reset, ...)."""
+        with self._lock:
+            self.errors[(host, error)] = self.errors.get((host, error), 0) + 1
+
+    def _observe(self, histograms: Dict[str, Histogram], label: str, seconds: float):
+        with self._lock:
+            histograms.setdefault(label, Histogram()).observe(seconds)
+
+    @contextmanager
+    def time_parse(self, source: str) -> Iterator[None]:
+        """Time the parsing of one chapter page."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._observe(self.parse_seconds, source, time.perf_counter() - start)
+
+    @contextmanager
+    def time_checkpoint(self, source: str) -> Iterator[None]:
+        """Time one save of the scraped data to disk."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._observe(self.checkpoint_seconds, source, time.perf_counter() - start)
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+
+        def histogram(name: str, help_text: str, label: str, histograms: Dict[str, Histogram]):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for value, hist in sorted(histograms.items()):
+                for le, count in hist.cumulative():
+                    lines.append(f"{name}_bucket{_labels(**{label: value, 'le': le})} {count}")
+                lines.append(f"{name}_sum{_labels(**{label: value})} {hist.sum:.6f}")
+                lines.append(f"{name}_count{_labels(**{label: value})} {hist.count}")
+
+        def counter(name: str, help_text: str, samples: List[Tuple[Dict[str, str], int]]):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(**labels)} {value}")
+
+        with self._lock:
+            histogram("scraper_request_duration_seconds", "Total request time including the body download.",
+                      "host", self.request_seconds)
+            histogram("scraper_time_to_first_byte_seconds", "Time until the response headers were parsed.",
+                      "host", self.first_byte_seconds)
+            counter("scraper_requests_total", "Completed requests by HTTP status.",
+                    [({"host": host, "status": str(status)}, n) for (host, status), n in sorted(self.statuses.items())])
+            counter("scraper_request_errors_total", "Requests that failed without a response.",
+                    [({"host": host, "error": error}, n) for (host, error), n in sorted(self.errors.items())])
+            counter("scraper_response_bytes_total", "Response body bytes received.",
+                    [({"host": host}, n) for host, n in sorted(self.bytes.items())])
+            counter("scraper_retries_total", "Retries performed by the transport.",
+                    [({"host": host}, n) for host, n in sorted(self.retries.items())])
+            histogram("scraper_parse_duration_seconds", "Time spent parsing one chapter page.",
+                      "source", self.parse_seconds)
+            histogram("scraper_checkpoint_write_seconds", "Time spent writing the scraped data to disk.",
+                      "source", self.checkpoint_seconds)
+
+        lines.append("# HELP scraper_run_started_seconds Unix time the run started.")
+        lines.append("# TYPE scraper_run_started_seconds gauge")
+        lines.append(f"scraper_run_started_seconds {self.started:.0f}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        """Write the metrics atomically, as the textfile collector expects."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def summary(self) -> str:
+        """A human-readable end-of-run summary."""
+        with self._lock:
+            lines = [f"Run time: {time.time() - self.started:.1f}s"]
+            for host, hist in sorted(self.request_seconds.items()):
+                statuses = ", ".join(f"{status}x{n}" for (h, status), n in sorted(self.statuses.items()) if h == host)
+                errors = sum(n for (h, _), n in self.errors.items() if h == host)
+                first_byte = self.first_byte_seconds[host]
+                lines.append(
+                    f"{host}: {hist.count} requests ({statuses}), {errors} errors, "
+                    f"{self.retries.get(host, 0)} retries, {_format_bytes(self.bytes.get(host, 0))}; "
+                    f"latency p50 {hist.quantile(0.5):.3f}s p95 {hist.quantile(0.95):.3f}s, "
+                    f"first byte p50 {first_byte.quantile(0.5):.3f}s"
+                )
+            for (host, error), n in sorted(self.errors.items()):
+                if host not in self.request_seconds:
+                    lines.append(f"{host}: {n} x {error}")
+            for source, hist in sorted(self.parse_seconds.items()):
+                lines.append(f"Parse ({source}): {hist.count} pages, p50 {hist.quantile(0.5) * 1000:.1f}ms, "
+                             f"total {hist.sum:.1f}s")
+            for source, hist in sorted(self.checkpoint_seconds.items()):
+                lines.append(f"Checkpoints ({source}): {hist.count} writes, p50 {hist.quantile(0.5) * 1000:.1f}ms, "
+                             f"total {hist.sum:.1f}s")
+        return "\n".join(lines)
+
+    def report(self, name: str, metrics_dir: Optional[str] = None):
+        """Print the summary and write <metrics_dir>/<name>.prom."""
+        path = os.path.join(metrics_dir or METRICS_DIR, f"{name}.prom")
+        logger.info("Crawl metrics:\n%s", self.summary())
+        try:
+            self.write_textfile(path)
+            logger.info("Metrics written to %s", path)
+        except OSError as e:
+            logger.warning("Could not write metrics to %s: %s", path, e)
+
+
+_default_metrics: Optional[Metrics] = None
+_default_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """Return the metrics registry shared by everything in this process."""
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+        return _default_metrics
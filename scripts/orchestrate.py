@@ -0,0 +1,527 @@
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+import sources
+from bible_shards import is_sharded, load_bible
+from crawl_plan import SOURCES as PLAN_SOURCES, CrawlTask, format_duration, pending_tasks
+from fetch import Fetcher
+from metrics import get_metrics
+from progress import LOG_DIR, Progress, setup_logging
+from work_queue import merge_chapters
+
+# Runs every scraper of a refresh at once instead of one after another.
+#
+# A config file (crawl.json at the repository root by default) lists the jobs:
+#
+#   {
+#     "max_concurrency": 8,
+#     "hosts": {"gratis.bible": {"limit": 2, "delay": 0.5}},
+#     "jobs": [
+#       {"source": "gratis", "output": "data/bible_fr.json"},
+#       {"source": "biblegateway", "translation": "RSVCE", "output": "data/bible_rsvce.json"},
+#       {"script": "vatican_es", "args": ["--output", "data/bible_es.json"]}
+#     ]
+#   }
+#
+# Sources of the sources.py registry are crawled in this process, chapter by
+# chapter: chapters already in the output are skipped, the pages are fetched
+# through one shared Fetcher and parsed with the source's own parser, and the
+# output is checkpointed every --checkpoint seconds and when the source is
+# done. Failed chapters are retried after --retry-delay, up to
+# --max-attempts. The scrapers that are not plan-driven (the Vatican ones,
+# getBible) run as child processes; their progress is read from their log.
+#
+# Every job belongs to a host. A host gets `limit` requests in flight at a
+# time (1 by default, and a child process counts as one for as long as it
+# runs) and its own politeness delay between request starts (the source's
+# delay by default), independently of the other hosts. All hosts together
+# never have more than max_concurrency requests in flight. Hosts take turns
+# for free slots, so a source with thousands of chapters left does not hold
+# back the others, and a full refresh takes about as long as its slowest
+# source.
+#
+#   python3 scripts/orchestrate.py                  # everything in crawl.json
+#   python3 scripts/orchestrate.py --only gratis german
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DEFAULT_CONFIG = os.path.join(ROOT_DIR, "crawl.json")
+
+logger = logging.getLogger("orchestrate")
+
+# Scrapers run as child processes: the file, the host they crawl and the name
+# they log under (data/logs/<log>.jsonl)
+SCRIPTS = {
+    "vatican_es": {"file": "scrape_vatican_es.py", "host": "www.vatican.va", "log": "vatican_es"},
+    "vatican_it": {"file": "scrape_vatican_it.py", "host": "www.vatican.va", "log": "vatican_it"},
+    "getbible": {"file": "getbible.py", "host": "api.getbible.net", "log": "getbible"},
+}
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_HOST_LIMIT = 1
+
+# Longest wait between scheduling passes when no host is due
+POLL_SECONDS = 1.0
+
+
+def source_host(source: str) -> str:
+    """The host a registry source's pages are fetched from."""
+    return urlsplit(PLAN_SOURCES[sources.SOURCES[source]["plan"]]["url"]).hostname
+
+
+class SourceJob:
+    """A registry source crawled in this process."""
+
+    def __init__(self, name: str, source: str, translation: str, output: str):
+        self.name = name
+        self.source = source
+        self.translation = translation
+        self.output = output
+        self.host = source_host(source)
+        self.state = "waiting"  # waiting, crawling, done, stopped or failed
+        self.total = 0
+        self.done = 0
+        self.failed: List[CrawlTask] = []
+        self.in_flight = 0
+        self.checkpointing = False
+        self.last_checkpoint = time.monotonic()
+        self.results: List[tuple] = []  # (osis, chapter, verses) not yet written to the output
+        self._ready: List[tuple] = []  # heap of (available_at, order, task, attempts)
+        self._order = itertools.count()
+
+    def load(self):
+        """Build the crawl plan, leaving out chapters the output already has."""
+        plan = sources.source_plan(self.source, self.translation)
+        if os.path.isfile(self.output) or is_sharded(self.output):
+            plan = pending_tasks(plan, load_bible(self.output))
+        for task in plan:
+            self.push(task, 0)
+        self.total = len(plan)
+        self.state = "crawling"
+
+    def push(self, task: CrawlTask, attempts: int, available_at: float = 0.0):
+        heapq.heappush(self._ready, (available_at, next(self._order), task, attempts))
+
+    def pop(self, now: float) -> Optional[tuple]:
+        """The next (task, attempts) whose retry delay has passed, if any."""
+        if self._ready and self._ready[0][0] <= now:
+            _, _, task, attempts = heapq.heappop(self._ready)
+            return task, attempts
+        return None
+
+    @property
+    def drained(self) -> bool:
+        """Every task has finished or run out of attempts."""
+        return not self._ready and not self.in_flight
+
+    def describe(self) -> str:
+        text = f"{self.name} {self.done}/{self.total}"
+        if self.failed:
+            text += f" ({len(self.failed)} failed)"
+        return text if self.state == "crawling" else f"{text} {self.state}"
+
+
+class ScriptJob:
+    """A scraper run as a child process."""
+
+    def __init__(self, name: str, script: str, args: List[str]):
+        spec = SCRIPTS[script]
+        self.name = name
+        self.script = script
+        self.args = args
+        self.host = spec["host"]
+        self.log_path = os.path.join(LOG_DIR, f"{spec['log']}.jsonl")
+        self.state = "waiting"  # waiting, running, done or failed
+        self.process: Optional[subprocess.Popen] = None
+        self.started = 0.0
+        self.ended: Optional[float] = None
+        self.progress: Optional[Dict] = None
+        self._log_offset = 0
+        self._log_lock = threading.Lock()
+
+    def start(self):
+        """Start the scraper, with its console output going to data/logs/<name>.out."""
+        os.makedirs(LOG_DIR, exist_ok=True)
+        self._log_offset = os.path.getsize(self.log_path) if os.path.exists(self.log_path) else 0
+        command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), SCRIPTS[self.script]["file"])]
+        with open(os.path.join(LOG_DIR, f"{self.name}.out"), "ab") as out:
+            self.process = subprocess.Popen(command + self.args, cwd=ROOT_DIR, stdin=subprocess.DEVNULL,
+                                            stdout=out, stderr=subprocess.STDOUT)
+        self.started = time.monotonic()
+        self.state = "running"
+
+    def wait(self) -> int:
+        returncode = self.process.wait()
+        self.ended = time.monotonic()
+        self.read_progress()
+        self.state = "done" if returncode == 0 else "failed"
+        return returncode
+
+    def read_progress(self):
+        """Pick up the latest progress line the scraper logged since it started."""
+        if not os.path.exists(self.log_path):
+            return
+        with self._log_lock:
+            with open(self.log_path, "rb") as f:
+                f.seek(self._log_offset)
+                data = f.read()
+            # Only whole lines; the rest is read again next time
+            end = data.rfind(b"\n") + 1
+            self._log_offset += end
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if "done" in entry and "total" in entry:
+                self.progress = entry
+
+    def describe(self) -> str:
+        if self.state == "waiting":
+            return f"{self.name} waiting"
+        if self.progress:
+            text = f"{self.name} {self.progress['done']}/{self.progress['total']}"
+        else:
+            text = f"{self.name} {format_duration((self.ended or time.monotonic()) - self.started)}"
+        return text if self.state == "running" else f"{text} {self.state}"
+
+
+class HostSlots:
+    """Requests in flight to one host and when the next one may start."""
+
+    def __init__(self, limit: int, delay: float):
+        self.limit = limit
+        self.delay = delay
+        self.active = 0
+        self.next_start = 0.0
+        self.jobs: List = []
+        self.turn = 0
+
+
+class CombinedProgress(Progress):
+    """Progress over the chapters of every source job, followed by one line per job."""
+
+    def __init__(self, jobs: List, interval: float, logger: logging.Logger):
+        super().__init__(0, label="chapters", interval=interval, logger=logger)
+        self.jobs = jobs
+
+    def report(self):
+        for job in self.jobs:
+            if isinstance(job, ScriptJob) and job.state == "running":
+                job.read_progress()
+        super().report()
+        self.logger.info("  " + ", ".join(job.describe() for job in self.jobs))
+
+
+class Orchestrator:
+    """Schedules source and script jobs over per-host slots under one global concurrency cap."""
+
+    def __init__(self, jobs: List, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 hosts: Optional[Dict[str, Dict]] = None, checkpoint_seconds: float = 60.0,
+                 max_attempts: int = 3, retry_delay: float = 30.0, interval: float = 10.0):
+        """
+        Args:
+            jobs: SourceJob and ScriptJob instances.
+            max_concurrency: Requests (and child processes) in flight across every host.
+            hosts: Per-host {"limit": ..., "delay": ...} overrides.
+            checkpoint_seconds: How often a source job's finished chapters are written out.
+            max_attempts: Attempts per chapter before it is given up on.
+            retry_delay: Seconds before a failed chapter is tried again.
+            interval: Seconds between progress lines.
+        """
+        self.jobs = jobs
+        self.max_concurrency = max_concurrency
+        self.checkpoint_seconds = checkpoint_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.active = 0
+        self.stopping = False
+        self.fetcher = Fetcher(max_cache_bytes=0)
+        self.progress = CombinedProgress(jobs, interval, logger)
+        self._cond = threading.Condition()
+
+        overrides = hosts or {}
+        self.hosts: Dict[str, HostSlots] = {}
+        for job in jobs:
+            if job.host not in self.hosts:
+                delay = max((sources.plan_delay(other.source) for other in jobs
+                             if isinstance(other, SourceJob) and other.host == job.host), default=0.0)
+                settings = overrides.get(job.host, {})
+                self.hosts[job.host] = HostSlots(int(settings.get("limit", DEFAULT_HOST_LIMIT)),
+                                                 float(settings.get("delay", delay)))
+            self.hosts[job.host].jobs.append(job)
+
+    def _next_work(self, slots: HostSlots, now: float) -> Optional[tuple]:
+        """The next unit of work for a host, taking its jobs in turn: (job, task, attempts)."""
+        for offset in range(len(slots.jobs)):
+            job = slots.jobs[(slots.turn + offset) % len(slots.jobs)]
+            if isinstance(job, ScriptJob):
+                if job.state == "waiting":
+                    job.state = "running"
+                    work = (job, None, 0)
+                else:
+                    continue
+            elif job.state != "crawling":
+                continue
+            else:
+                due = now - job.last_checkpoint >= self.checkpoint_seconds and job.results
+                if not job.checkpointing and (job.drained or due):
+                    # Writing the output may look up titles on the host, so it takes a slot too
+                    job.checkpointing = True
+                    work = (job, None, 0)
+                else:
+                    popped = job.pop(now)
+                    if popped is None:
+                        continue
+                    job.in_flight += 1
+                    work = (job, popped[0], popped[1])
+            slots.turn = (slots.turn + offset + 1) % len(slots.jobs)
+            return work
+        return None
+
+    def _dispatch(self, pool: ThreadPoolExecutor) -> float:
+        """Start whatever the limits allow; returns how long to wait before trying again."""
+        now = time.monotonic()
+        wait = POLL_SECONDS
+        started = True
+        while started and self.active < self.max_concurrency:
+            # One start per host and pass, hosts with the fewest requests in flight first,
+            # so that free global slots are shared out instead of going to the first host
+            started = False
+            for slots in sorted(self.hosts.values(), key=lambda slots: slots.active):
+                if self.active >= self.max_concurrency:
+                    break
+                if slots.active >= slots.limit:
+                    continue
+                if slots.next_start > now:
+                    wait = min(wait, slots.next_start - now)
+                    continue
+                work = self._next_work(slots, now)
+                if work is None:
+                    continue
+                slots.active += 1
+                self.active += 1
+                if work[1] is not None:
+                    slots.next_start = now + slots.delay
+                pool.submit(self._run, slots, *work)
+                started = True
+        return wait
+
+    def _finished(self) -> bool:
+        return not self.active and all(job.state in ("done", "stopped", "failed") for job in self.jobs)
+
+    def _run(self, slots: HostSlots, job, task: Optional[CrawlTask], attempts: int):
+        try:
+            if isinstance(job, ScriptJob):
+                self._run_script(job)
+            elif task is None:
+                self._checkpoint(job)
+            else:
+                self._crawl(job, task, attempts)
+        except Exception:
+            logger.exception("%s: unexpected error", job.name)
+            if isinstance(job, SourceJob) and task is not None:
+                self._failed(job, task, attempts, "unexpected error")
+        finally:
+            with self._cond:
+                if isinstance(job, SourceJob) and task is not None:
+                    job.in_flight -= 1
+                slots.active -= 1
+                self.active -= 1
+                self._cond.notify()
+
+    def _crawl(self, job: SourceJob, task: CrawlTask, attempts: int):
+        attempts += 1
+        logger.debug("%s: fetching %s %s (attempt %d): %s", job.name, task.osis, task.chapter, attempts, task.url)
+        try:
+            page = self.fetcher.get_text(task.url, encoding=sources.SOURCES[job.source]["encoding"])
+            with get_metrics().time_parse(job.source):
+                verses = sources.parse_page(job.source, page, task.osis, task.chapter, job.translation)
+        except requests.exceptions.RequestException as e:
+            self._failed(job, task, attempts, f"{type(e).__name__}: {e}")
+            return
+        if not verses:
+            self._failed(job, task, attempts, "no verses found")
+            return
+        with self._cond:
+            job.results.append((task.osis, task.chapter, verses))
+            job.done += 1
+        self.progress.advance()
+
+    def _failed(self, job: SourceJob, task: CrawlTask, attempts: int, error: str):
+        with self._cond:
+            if attempts < self.max_attempts and not self.stopping:
+                logger.debug("%s: %s %s failed (%s), retrying in %.0fs",
+                             job.name, task.osis, task.chapter, error, self.retry_delay)
+                job.push(task, attempts, time.monotonic() + self.retry_delay)
+                return
+            job.failed.append(task)
+            job.done += 1
+        logger.warning("%s: %s %s failed: %s", job.name, task.osis, task.chapter, error)
+        self.progress.advance(failed=True)
+
+    def _checkpoint(self, job: SourceJob):
+        with self._cond:
+            results, job.results = job.results, []
+            final = job.drained or self.stopping
+        try:
+            if results:
+                os.makedirs(os.path.dirname(os.path.abspath(job.output)), exist_ok=True)
+                merge_chapters(job.source, results, job.output)
+                logger.info("%s: saved %d chapters to %s", job.name, len(results), job.output)
+        except Exception:
+            with self._cond:
+                # Keep the chapters for the next checkpoint, unless this was the last one
+                job.results[:0] = results
+                if final:
+                    job.state = "failed"
+            raise
+        finally:
+            with self._cond:
+                job.checkpointing = False
+                job.last_checkpoint = time.monotonic()
+                if final and not job.results:
+                    job.state = "stopped" if self.stopping else "done"
+        if final:
+            logger.info("%s: %s, %d chapters crawled, %d failed", job.name,
+                        "stopped" if self.stopping else "finished", job.done - len(job.failed), len(job.failed))
+
+    def _run_script(self, job: ScriptJob):
+        job.start()
+        logger.info("%s: started %s", job.name, " ".join([SCRIPTS[job.script]["file"]] + job.args))
+        returncode = job.wait()
+        if returncode:
+            logger.error("%s: exited with status %d (see %s)", job.name, returncode,
+                         os.path.join(LOG_DIR, f"{job.name}.out"))
+        else:
+            logger.info("%s: finished in %s", job.name, format_duration(job.ended - job.started))
+
+    def stop(self):
+        """Stop handing out work, end child processes and save what was crawled."""
+        with self._cond:
+            self.stopping = True
+            for job in self.jobs:
+                if isinstance(job, SourceJob):
+                    job._ready.clear()
+                elif job.state == "waiting":
+                    job.state = "failed"
+                elif job.process is not None and job.process.poll() is None:
+                    job.process.terminate()
+
+    def run(self):
+        for job in self.jobs:
+            if isinstance(job, SourceJob):
+                job.load()
+                self.progress.total += job.total
+                logger.info("%s: %d chapters to crawl from %s", job.name, job.total, job.host)
+        for host, slots in self.hosts.items():
+            logger.info("%s: %s, %d at a time, %.1fs apart", host,
+                        ", ".join(job.name for job in slots.jobs), slots.limit, slots.delay)
+
+        with ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="crawl") as pool:
+            try:
+                with self._cond:
+                    while not self._finished():
+                        self._cond.wait(self._dispatch(pool))
+                        self.progress.advance(0)
+            except KeyboardInterrupt:
+                logger.warning("Interrupted; saving what was crawled so far")
+                self.stop()
+                with self._cond:
+                    while not self._finished():
+                        self._cond.wait(self._dispatch(pool))
+
+        self.progress.finish()
+        get_metrics().report("orchestrate")
+        return all(job.state == "done" and not getattr(job, "failed", None) for job in self.jobs)
+
+
+def load_config(path: str) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_jobs(config: Dict, only: Optional[List[str]] = None) -> List:
+    """
+    SourceJob and ScriptJob instances for the config's job entries.
+
+    Jobs are named after their source and translation ("gratis/dejer") or
+    their script, unless an entry has its own "name".
+    """
+    jobs = []
+    for entry in config.get("jobs", []):
+        if "source" in entry:
+            source = entry["source"]
+            if source not in sources.SOURCES:
+                raise ValueError(f"Unknown source {source!r} (known: {', '.join(sources.SOURCES)})")
+            if "output" not in entry:
+                raise ValueError(f"Job for {source!r} has no output")
+            translation = entry.get("translation") or sources.SOURCES[source]["translation"]
+            name = entry.get("name", f"{source}/{translation}")
+            job = SourceJob(name, source, translation, os.path.join(ROOT_DIR, entry["output"]))
+        elif "script" in entry:
+            script = entry["script"]
+            if script not in SCRIPTS:
+                raise ValueError(f"Unknown script {script!r} (known: {', '.join(SCRIPTS)})")
+            job = ScriptJob(entry.get("name", script), script, [str(arg) for arg in entry.get("args", [])])
+        else:
+            raise ValueError(f"Job needs a 'source' or a 'script': {entry}")
+
+        if only and job.name not in only and getattr(job, "source", job.name) not in only:
+            continue
+        jobs.append(job)
+
+    names = [job.name for job in jobs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate job names: {', '.join(duplicates)}; give them a 'name'")
+    return jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run every configured scraper at once, with per-host limits.')
+    parser.add_argument('--config', type=str, default=DEFAULT_CONFIG, help='Job list (default: crawl.json)')
+    parser.add_argument('--only', nargs='+', help='Job names or sources to run (default: all)')
+    parser.add_argument('--max-concurrency', type=int, help="Requests in flight across all hosts (default: the config's, or 8)")
+    parser.add_argument('--checkpoint', type=float, default=60.0, help='Seconds between output checkpoints')
+    parser.add_argument('--max-attempts', type=int, default=3, help='Attempts per chapter')
+    parser.add_argument('--retry-delay', type=float, default=30.0, help='Seconds before a failed chapter is retried')
+    parser.add_argument('--verbose', action='store_true', help='Log every chapter')
+    args = parser.parse_args()
+
+    setup_logging("orchestrate", level="DEBUG" if args.verbose else None)
+
+    config = load_config(args.config)
+    try:
+        jobs = build_jobs(config, args.only)
+    except ValueError as e:
+        parser.error(str(e))
+    if not jobs:
+        parser.error("no jobs to run")
+
+    orchestrator = Orchestrator(
+        jobs,
+        max_concurrency=args.max_concurrency or config.get("max_concurrency", DEFAULT_MAX_CONCURRENCY),
+        hosts=config.get("hosts"),
+        checkpoint_seconds=args.checkpoint,
+        max_attempts=args.max_attempts,
+        retry_delay=args.retry_delay,
+    )
+    if not orchestrator.run():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
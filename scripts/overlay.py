@@ -0,0 +1,313 @@
+import argparse
+import json
+import logging
+import os
+import re
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Union
+
+from bible_io import dump_json, load_bible_json, sidecar_path
+from bible_shards import load_bible, write_bible
+from bible_stream import BibleWriter
+from crawl_plan import load_index
+from passage_refs import PassageError, parse, resolve
+from progress import setup_logging
+
+# Composite Bibles built from a base plus an ordered stack of patch files.
+#
+# The fragments in scripts/json/ (a Daniel with the Greek additions, the
+# Esther chapters 11-16, psalm variants) and books a scraper writes on their
+# own (the Vatican's AddDan/AddEsth) are Bible documents of a few books each.
+# A manifest says how each one is laid over the base:
+#
+#   {
+#     "base": "data/bible_es.json",
+#     "patches": [
+#       {"file": "scripts/json/dan_es.json", "select": "Dan"},
+#       {"file": "scripts/json/esther_es.json", "mode": "chapter", "select": "Esth 11-16"},
+#       {"file": "scripts/json/psalms_pr_modern.json", "fill": true}
+#     ],
+#     "drop": ["AddDan", "AddEsth"]
+#   }
+#
+# A patch's mode is what it replaces:
+#
+#   book      each of its books replaces the whole book (the default)
+#   chapter   each of its chapters replaces that chapter, the rest of the book stays
+#   verse     each of its verses is inserted or replaces that verse
+#
+# Later patches win over earlier ones and over the base; a patch with
+# "fill": true only adds books, chapters or verses nothing below it has.
+# "select" (a passage reference, see passage_refs.py) takes only part of a
+# file, "rename" ({"AddDan": "Dan"}) moves its books onto other codes, and
+# "title" replaces the title of the books it touches. "drop" removes books
+# from the result. Paths are relative to the repository root.
+#
+# Overlay reads the result lazily, composing a patched book when it is first
+# looked up and passing the others straight through from the base, and
+# records which file every verse came from. save() writes it out once, with
+# the provenance in a _provenance sidecar file:
+#
+#   python3 scripts/overlay.py overlays/bible_es.json --output data/bible_es_full.json
+#   python3 scripts/overlay.py overlays/bible_es.json --show "Dan 3:24-26"
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+MODES = ("book", "chapter", "verse")
+
+logger = logging.getLogger("overlay")
+
+
+class OverlayError(ValueError):
+    """A manifest or patch that cannot be applied."""
+
+
+def _label_key(label: str):
+    """Sort key for chapter and verse labels: "2" < "3" < "3a" < "10", non-numeric labels last."""
+    match = re.match(r"(\d+)(.*)", label)
+    return (0, int(match.group(1)), match.group(2)) if match else (1, 0, label)
+
+
+def _sorted_labels(mapping: Dict) -> Dict:
+    return {key: mapping[key] for key in sorted(mapping, key=_label_key)}
+
+
+class Patch:
+    """One layer of an overlay: the books of a patch file and how they apply."""
+
+    def __init__(self, name: str, books: Dict[str, Dict], mode: str = "book", fill: bool = False,
+                 title: Optional[str] = None):
+        """
+        Args:
+            name: Recorded as the provenance of every verse the patch supplies.
+            books: {osis: {"title", "chapters"}}, already selected and renamed.
+            mode: "book", "chapter" or "verse".
+            fill: Only add what the layers below do not have.
+            title: Title for every book the patch touches (default: the patch's own,
+                for books the base does not have).
+        """
+        if mode not in MODES:
+            raise OverlayError(f"{name}: unknown mode {mode!r} (expected one of {', '.join(MODES)})")
+        self.name = name
+        self.books = books
+        self.mode = mode
+        self.fill = fill
+        self.title = title
+
+    @classmethod
+    def load(cls, spec: Dict, root: str = ROOT_DIR) -> "Patch":
+        """A patch from its manifest entry (see the module comment)."""
+        if "file" not in spec:
+            raise OverlayError(f"Patch has no 'file': {spec}")
+        name = spec["file"]
+        books = load_bible_json(os.path.join(root, name))
+
+        if spec.get("select"):
+            try:
+                verses = list(resolve(parse(spec["select"]), books))
+            except PassageError as e:
+                raise OverlayError(f"{name}: {e}") from None
+            selected: Dict[str, Dict] = {}
+            for verse in verses:
+                book = selected.setdefault(verse.osis, {"title": books[verse.osis]["title"], "chapters": {}})
+                book["chapters"].setdefault(verse.chapter, {})[verse.verse] = verse.text
+            books = selected
+
+        for old, new in spec.get("rename", {}).items():
+            if old in books:
+                books[new] = books.pop(old)
+
+        if not books:
+            logger.warning("%s: nothing selected", name)
+        return cls(name, books, spec.get("mode", "book"), spec.get("fill", False), spec.get("title"))
+
+
+class Overlay(Mapping):
+    """
+    Read-only {osis: {"title", "chapters"}} view of a base Bible with patches
+    applied, composing each patched book on first access.
+    """
+
+    def __init__(self, base: Mapping, patches: List[Patch], base_name: str = "base",
+                 drop: Optional[List[str]] = None):
+        """
+        Args:
+            base: The base Bible: a loaded file, a bible_shards.Bible, or any
+                mapping of the same shape.
+            patches: Layers, lowest precedence first.
+            base_name: Provenance recorded for verses from the base.
+            drop: Books left out of the result.
+        """
+        self.base = base
+        self.patches = patches
+        self.base_name = base_name
+        self.drop = set(drop or [])
+        self.patched = {osis for patch in patches for osis in patch.books}
+        self._books: Dict[str, Dict] = {}
+        self._provenance: Dict[str, Dict[str, Dict[str, str]]] = {}
+
+        order = {book["osis"]: i for i, book in enumerate(load_index())}
+        books = list(base) + sorted(self.patched - set(base), key=lambda osis: order.get(osis, len(order)))
+        self._order = [osis for osis in sorted(books, key=lambda osis: order.get(osis, len(order)))
+                       if osis not in self.drop]
+
+    def _compose(self, osis: str):
+        title: Optional[str] = None
+        chapters: Dict[str, Dict[str, str]] = {}
+        provenance: Dict[str, Dict[str, str]] = {}
+        if osis in self.base:
+            book = self.base[osis]
+            title = book["title"]
+            for chapter, verses in book["chapters"].items():
+                chapters[chapter] = dict(verses)
+                provenance[chapter] = dict.fromkeys(verses, self.base_name)
+
+        for patch in self.patches:
+            book = patch.books.get(osis)
+            if book is None:
+                continue
+            present = title is not None
+            if patch.mode == "book":
+                if patch.fill and present:
+                    continue
+                chapters = {chapter: dict(verses) for chapter, verses in book["chapters"].items()}
+                provenance = {chapter: dict.fromkeys(verses, patch.name) for chapter, verses in chapters.items()}
+                title = book["title"]
+            else:
+                for chapter, verses in book["chapters"].items():
+                    if patch.mode == "chapter":
+                        if patch.fill and chapters.get(chapter):
+                            continue
+                        chapters[chapter] = dict(verses)
+                        provenance[chapter] = dict.fromkeys(verses, patch.name)
+                        continue
+                    target = chapters.setdefault(chapter, {})
+                    sources = provenance.setdefault(chapter, {})
+                    for verse, text in verses.items():
+                        if patch.fill and verse in target:
+                            continue
+                        target[verse] = text
+                        sources[verse] = patch.name
+                if not present:
+                    title = book["title"]
+            if patch.title:
+                title = patch.title
+
+        chapters = {chapter: _sorted_labels(verses) for chapter, verses in _sorted_labels(chapters).items()}
+        self._books[osis] = {"title": title, "chapters": chapters}
+        self._provenance[osis] = provenance
+
+    def __getitem__(self, osis: str) -> Dict:
+        if osis in self.drop:
+            raise KeyError(osis)
+        if osis not in self.patched:
+            return self.base[osis]
+        if osis not in self._books:
+            self._compose(osis)
+        return self._books[osis]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._order)
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __contains__(self, osis) -> bool:
+        return osis not in self.drop and (osis in self.patched or osis in self.base)
+
+    def provenance(self, osis: str, chapter: Union[int, str], verse: Union[int, str]) -> str:
+        """The name of the base or patch a verse comes from."""
+        if osis not in self.patched:
+            if str(verse) not in self[osis]["chapters"][str(chapter)]:
+                raise KeyError(f"{osis} {chapter}:{verse}")
+            return self.base_name
+        self[osis]
+        return self._provenance[osis][str(chapter)][str(verse)]
+
+    def book_provenance(self, osis: str) -> Union[str, Dict]:
+        """
+        Where a book's verses come from, compactly: the source name when it is
+        a single one, otherwise {chapter: name or [[first, last, name], ...]}
+        with one entry per run of consecutive verses from the same source.
+        """
+        if osis not in self.patched:
+            return self.base_name
+        self[osis]
+        chapters: Dict[str, Union[str, List]] = {}
+        for chapter, verses in self._books[osis]["chapters"].items():
+            sources = self._provenance[osis][chapter]
+            runs: List[List[str]] = []
+            for verse in verses:
+                if runs and runs[-1][2] == sources[verse]:
+                    runs[-1][1] = verse
+                else:
+                    runs.append([verse, verse, sources[verse]])
+            chapters[chapter] = runs[0][2] if len(runs) == 1 else runs
+        names = set(chapters.values()) if all(isinstance(value, str) for value in chapters.values()) else None
+        return names.pop() if names and len(names) == 1 else chapters
+
+    def save(self, path: str, indent: Optional[int] = 2, provenance: bool = True):
+        """
+        Materialize the overlay into a Bible file (plain, .gz or .zst) or a shard
+        directory (a path ending with a separator), plus the provenance sidecar.
+        """
+        if os.path.isdir(path) or path.endswith(("/", os.sep)):
+            write_bible(path, self)
+            provenance_path = os.path.join(path, "provenance.json")
+        else:
+            with BibleWriter(path, indent) as writer:
+                for osis in self:
+                    book = self[osis]
+                    if not book["chapters"]:
+                        writer.write_chapter(osis, book["title"], None, None)
+                    for chapter, verses in book["chapters"].items():
+                        writer.write_chapter(osis, book["title"], chapter, verses)
+                    if hasattr(self.base, "unload"):
+                        self.base.unload(osis)
+            provenance_path = sidecar_path(path, "provenance")
+        if provenance:
+            dump_json({osis: self.book_provenance(osis) for osis in self}, provenance_path)
+
+
+def load_manifest(path: str, root: str = ROOT_DIR) -> Overlay:
+    """An Overlay from a manifest file (see the module comment)."""
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if "base" not in manifest:
+        raise OverlayError(f"{path} has no 'base'")
+    patches = [Patch.load(spec, root) for spec in manifest.get("patches", [])]
+    base = load_bible(os.path.join(root, manifest["base"]))
+    return Overlay(base, patches, manifest["base"], manifest.get("drop"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a Bible from a base and an ordered stack of patch files.')
+    parser.add_argument('manifest', type=str, help='Overlay manifest (JSON)')
+    parser.add_argument('--output', type=str, help='Write the result to this file or shard directory')
+    parser.add_argument('--indent', type=int, default=2, help='JSON indentation of the output (default: 2)')
+    parser.add_argument('--show', type=str, metavar='REFERENCE',
+                        help='Print these verses of the result with where each comes from')
+    args = parser.parse_args()
+
+    setup_logging("overlay")
+    if not args.output and not args.show:
+        parser.error("nothing to do; give --output and/or --show")
+
+    try:
+        overlay = load_manifest(args.manifest)
+    except OverlayError as e:
+        parser.error(str(e))
+
+    if args.show:
+        for verse in resolve(args.show, overlay):
+            source = overlay.provenance(verse.osis, verse.chapter, verse.verse)
+            print(f"{verse.osis} {verse.chapter}:{verse.verse} [{source}] {verse.text}")
+    if args.output:
+        overlay.save(args.output, args.indent)
+        for osis in sorted(overlay.patched - overlay.drop):
+            logger.info("%s: %s", osis, json.dumps(overlay.book_provenance(osis), ensure_ascii=False)[:200])
+        logger.info("Wrote %d books to %s", len(overlay), args.output)
+
+
+if __name__ == "__main__":
+    main()
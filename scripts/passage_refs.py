@@ -0,0 +1,386 @@
+import argparse
+import re
+import unicodedata
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from bible_stream import Verse
+
+# Parsing passage references such as "Ps 23:1-6; Jn 3,16", "1 Koen 8,1" or
+# "Sir 24:1-22" into OSIS ranges, and resolving them against a loaded Bible.
+#
+# Book names are matched against every table the scrapers already have
+# (OSIS codes, the English names, BOOK_MAPPING, OSIS_MAP, OSIS_CODES, the
+# bibliacatolica dictionaries and getBible's number_to_osis), ignoring case,
+# accents, spaces and punctuation. Shortened forms of those names are derived
+# as well ("Primera carta a los Corintios" -> "1 Corintios", "Samuele 1" ->
+# "1 Samuele"), and any unambiguous prefix of a name works ("Deuteron").
+# The tables are compiled once, on first use, into a dictionary of every
+# alias and every alias prefix.
+#
+# Chapter and verse may be separated by ":" (lists of verses by ",") or, in
+# the European style, by "," (lists by "."):
+#
+#   Ps 23:1-6, 8; 24        Joh 3,16.18        Gen 1:26-2:3        Ps 23-24
+#
+# References separated by ";" that start with a number continue the previous
+# book ("Jn 3:16; 4:1").
+
+
+class PassageError(ValueError):
+    """A reference that cannot be parsed, or names a book that cannot be identified."""
+
+
+class Passage(NamedTuple):
+    """
+    A range of verses in one book. chapter None is the whole book; verse None
+    starts at the beginning of `chapter`, end_verse None runs to the end of
+    `end_chapter`.
+    """
+    osis: str
+    chapter: Optional[int] = None
+    verse: Optional[int] = None
+    end_chapter: Optional[int] = None
+    end_verse: Optional[int] = None
+
+    def __str__(self) -> str:
+        """The OSIS reference, e.g. "Ps.23.1-Ps.23.6", "John.3.16" or "Ps.23-Ps.24"."""
+        if self.chapter is None:
+            return self.osis
+        start = f"{self.osis}.{self.chapter}" + (f".{self.verse}" if self.verse is not None else "")
+        end = f"{self.osis}.{self.end_chapter}" + (f".{self.end_verse}" if self.end_verse is not None else "")
+        return start if start == end else f"{start}-{end}"
+
+
+# Abbreviations in common use in English (New American Bible style) that
+# none of the scraper tables contain.
+ENGLISH_ABBREVIATIONS = {
+    "Gen": ["Gn"], "Exod": ["Ex", "Exo"], "Lev": ["Lv"], "Num": ["Nm"], "Deut": ["Dt"],
+    "Josh": ["Jos"], "Judg": ["Jgs", "Jdg"], "Ruth": ["Ru"], "1Sam": ["1 Sm"], "2Sam": ["2 Sm"],
+    "1Kgs": ["1 Kg"], "2Kgs": ["2 Kg"], "1Chr": ["1 Chron"], "2Chr": ["2 Chron"], "Neh": ["Ne"],
+    "Tob": ["Tb"], "Jdt": ["Jdt"], "Esth": ["Est"], "1Macc": ["1 Mc"], "2Macc": ["2 Mc"],
+    "Job": ["Jb"], "Ps": ["Pss", "Psa", "Psalm"], "Prov": ["Prv"], "Eccl": ["Eccles", "Qoh"],
+    "Song": ["Sg", "Cant"], "Wis": ["Ws"], "Sir": ["Ecclus"], "Isa": ["Is"], "Jer": ["Jer"],
+    "Lam": ["Lam"], "Bar": ["Bar"], "Ezek": ["Ez", "Ezk"], "Dan": ["Dn"], "Hos": ["Hos"],
+    "Joel": ["Jl"], "Amos": ["Am"], "Obad": ["Ob"], "Jonah": ["Jon"], "Mic": ["Mi"],
+    "Nah": ["Na"], "Hab": ["Hb"], "Zeph": ["Zep"], "Hag": ["Hg"], "Zech": ["Zec"], "Mal": ["Mal"],
+    "Matt": ["Mt"], "Mark": ["Mk"], "Luke": ["Lk"], "John": ["Jn"], "Acts": ["Act"],
+    "Rom": ["Rm"], "1Cor": ["1 Cor"], "2Cor": ["2 Cor"], "Gal": ["Gal"], "Eph": ["Eph"],
+    "Phil": ["Phil"], "Col": ["Col"], "1Thess": ["1 Thes"], "2Thess": ["2 Thes"],
+    "1Tim": ["1 Tm"], "2Tim": ["2 Tm"], "Titus": ["Ti"], "Phlm": ["Phlm"], "Heb": ["Heb"],
+    "Jas": ["Jas"], "1Pet": ["1 Pt"], "2Pet": ["2 Pt"], "1John": ["1 Jn"], "2John": ["2 Jn"],
+    "3John": ["3 Jn"], "Jude": ["Jude"], "Rev": ["Rv", "Apoc"],
+}
+
+# Words dropped from long book names to derive the short forms people write
+# ("Evangelio según San Mateo" -> "Mateo")
+_FILLER_WORDS = {
+    "a", "aos", "carta", "de", "degli", "dei", "del", "des", "do", "dos", "epitre", "evangelio",
+    "gospel", "la", "las", "libro", "los", "of", "san", "santo", "sao", "saint", "secondo", "segun",
+    "the", "vangelo",
+}
+_ORDINALS = {
+    "i": "1", "ii": "2", "iii": "3", "primer": "1", "primera": "1", "primero": "1", "segundo": "2",
+    "segunda": "2", "tercer": "3", "tercera": "3", "tercero": "3",
+}
+
+# Shortest prefix (letters after any leading book number) that is matched
+_MIN_PREFIX = 2
+
+_NON_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+_PART = re.compile(r"^(?P<book>\d?[^\d]*?[^\W\d_][^\d]*?)?\s*(?P<location>\d.*)?$")
+_NUMBER = re.compile(r"^(\d+)[a-z]?$")
+_LABEL_NUMBER = re.compile(r"^\d+")
+
+
+# German umlauts fold to their ASCII spelling, so "Kön" and "Koen" are the same name
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue"})
+
+
+def _fold(name: str) -> str:
+    """Casefolded, umlauts spelled out and other diacritics dropped."""
+    folded = unicodedata.normalize("NFC", name.casefold()).translate(_UMLAUTS)
+    decomposed = unicodedata.normalize("NFKD", folded)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def normalize(name: str) -> str:
+    """Lowercase ASCII letters and digits only: "1 Kön." -> "1koen", "Ésaïe" -> "esaie"."""
+    return _NON_ALPHANUMERIC.sub("", _fold(name))
+
+
+def _words(name: str) -> List[str]:
+    return [word for word in _NON_ALPHANUMERIC.split(_fold(name)) if word]
+
+
+def short_forms(name: str) -> List[str]:
+    """Shorter spellings of a full book name, with its number moved to the front."""
+    forms = []
+    for part in re.split(r"[()]", name):
+        words = _words(part)
+        if not words:
+            continue
+        number = ""
+        if words[0] in _ORDINALS:
+            number = _ORDINALS[words.pop(0)]
+        elif words[-1].isdigit():
+            number = words.pop()
+        elif words[0].isdigit():
+            number = words.pop(0)
+        rest = [word for word in words if word not in _FILLER_WORDS] or words
+        forms.append(number + "".join(words))
+        forms.append(number + "".join(rest))
+    return forms
+
+
+def _name_tables() -> List[Tuple[int, Dict[str, List[str]]]]:
+    """(priority, {osis: [names]}) for every table of book names; lower priorities win conflicts."""
+    import getbible
+    import scrape_bibliacatolica
+    import scrape_bibliacatolica_fr
+    import scrape_german
+    import scrape_vatican_es
+    import scrape_vatican_it
+    from crawl_plan import load_index
+    from validator import MASTER_BOOKS
+
+    def invert(mapping: Dict[str, str]) -> Dict[str, List[str]]:
+        names: Dict[str, List[str]] = {}
+        for name, osis in mapping.items():
+            names.setdefault(osis, []).append(name)
+        return names
+
+    english: Dict[str, List[str]] = {osis: [name] for osis, name in MASTER_BOOKS.items()}
+    for book in load_index():
+        english.setdefault(book["osis"], []).append(book["display"])
+    for entry in getbible.number_to_osis.values():
+        english.setdefault(entry["osis"], []).append(entry["english_name"])
+
+    names = [
+        invert(scrape_vatican_es.BOOK_MAPPING),
+        invert(scrape_german.OSIS_MAP),
+        invert(scrape_vatican_it.OSIS_CODES),
+        {osis: [book["name"]] for osis, book in scrape_bibliacatolica.bible_dictionary.items()},
+        {osis: [book["name"]] for osis, book in scrape_bibliacatolica_fr.bible_dictionary.items()},
+    ]
+    codes = {osis: [osis] for table in [english] + names for osis in table}
+    return [(0, codes), (1, english), (1, ENGLISH_ABBREVIATIONS)] + [(1, table) for table in names]
+
+
+@lru_cache(maxsize=None)
+def _alias_index() -> Tuple[Dict[str, str], Dict[str, Tuple[str, ...]]]:
+    """
+    Compile the name tables into ({alias: osis}, {prefix: candidate osis codes}).
+
+    Full names and codes come first; derived short forms only fill in aliases
+    nobody else claims, and an alias two books claim at the same priority is
+    dropped.
+    """
+    claims: Dict[str, Tuple[int, set]] = {}
+
+    def claim(alias: str, osis: str, priority: int):
+        if not alias:
+            return
+        current = claims.get(alias)
+        if current is None or priority < current[0]:
+            claims[alias] = (priority, {osis})
+        elif priority == current[0]:
+            current[1].add(osis)
+
+    for priority, table in _name_tables():
+        for osis, names in table.items():
+            for name in names:
+                claim(normalize(name), osis, priority)
+                for form in short_forms(name):
+                    claim(form, osis, 2)
+
+    aliases = {alias: next(iter(books)) for alias, (_, books) in claims.items() if len(books) == 1}
+
+    candidates: Dict[str, set] = {}
+    for alias, osis in aliases.items():
+        digits = len(alias) - len(alias.lstrip("0123456789"))
+        for end in range(digits + _MIN_PREFIX, len(alias)):
+            candidates.setdefault(alias[:end], set()).add(osis)
+    prefixes = {prefix: tuple(sorted(books)) for prefix, books in candidates.items() if prefix not in aliases}
+    return aliases, prefixes
+
+
+def book_aliases() -> Dict[str, str]:
+    """Every known book name and abbreviation, normalized, mapped to its OSIS code."""
+    return dict(_alias_index()[0])
+
+
+def lookup_book(name: str) -> str:
+    """The OSIS code of a book name or abbreviation in any of the scraped languages."""
+    key = normalize(name)
+    aliases, prefixes = _alias_index()
+    osis = aliases.get(key)
+    if osis is not None:
+        return osis
+    books = prefixes.get(key, ())
+    if len(books) == 1:
+        return books[0]
+    if books:
+        raise PassageError(f"Ambiguous book {name!r}: could be {', '.join(books)}")
+    raise PassageError(f"Unknown book {name!r}")
+
+
+def _number(token: str, reference: str) -> int:
+    match = _NUMBER.match(token)
+    if not match:
+        raise PassageError(f"Cannot read {token!r} in {reference!r}")
+    return int(match.group(1))
+
+
+def _location(osis: str, location: str, reference: str) -> List[Passage]:
+    """Passages for the chapter/verse part of one reference, e.g. "23:1-6, 8"."""
+    location = re.sub(r"\s+", "", location.casefold()).rstrip(".,")
+    location = re.sub("[‐-―]", "-", location)
+    if ":" in location:
+        separator, lists = ":", r"[,.]"
+    elif "," in location:
+        separator, lists = ",", r"\."
+    else:
+        separator, lists = ".", None
+
+    passages = []
+    chapter = None
+    for item in re.split(lists, location) if lists else [location]:
+        start, dash, end = item.partition("-")
+        if dash and not end:
+            raise PassageError(f"Open range in {reference!r}")
+        if separator in start:
+            chapter_text, _, verse_text = start.partition(separator)
+            chapter, verse = _number(chapter_text, reference), _number(verse_text, reference)
+        elif chapter is not None:
+            verse = _number(start, reference)
+        else:
+            # No verse yet in this reference: a chapter, or a range of chapters
+            first = _number(start, reference)
+            if not end:
+                passages.append(Passage(osis, first, None, first, None))
+                continue
+            if separator in end:
+                end_chapter, _, end_verse = end.partition(separator)
+                passages.append(Passage(osis, first, None, _number(end_chapter, reference), _number(end_verse, reference)))
+            else:
+                passages.append(Passage(osis, first, None, _number(end, reference), None))
+            continue
+
+        if not end:
+            passages.append(Passage(osis, chapter, verse, chapter, verse))
+        elif separator in end:
+            end_chapter, _, end_verse = end.partition(separator)
+            passages.append(Passage(osis, chapter, verse, _number(end_chapter, reference), _number(end_verse, reference)))
+        else:
+            passages.append(Passage(osis, chapter, verse, chapter, _number(end, reference)))
+
+    for passage in passages:
+        if (passage.end_chapter, passage.end_verse or 0) < (passage.chapter, passage.verse or 0):
+            raise PassageError(f"Range ends before it starts in {reference!r}")
+    return passages
+
+
+@lru_cache(maxsize=65536)
+def _parse(reference: str) -> Tuple[Passage, ...]:
+    passages: List[Passage] = []
+    osis = None
+    for part in reference.split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        match = _PART.match(part)
+        if not match or not (match.group("book") or match.group("location")):
+            raise PassageError(f"Cannot read {part!r}")
+        if match.group("book"):
+            osis = lookup_book(match.group("book"))
+        elif osis is None:
+            raise PassageError(f"No book given in {reference!r}")
+        if match.group("location"):
+            passages.extend(_location(osis, match.group("location"), reference))
+        else:
+            passages.append(Passage(osis))
+    return tuple(passages)
+
+
+def parse(reference: str) -> List[Passage]:
+    """
+    Parse a reference like "Ps 23:1-6; Jn 3,16" into Passages.
+
+    Raises:
+        PassageError: The reference cannot be read or a book is unknown or ambiguous.
+    """
+    return list(_parse(reference))
+
+
+def _label_number(label: str) -> Optional[int]:
+    match = _LABEL_NUMBER.match(str(label))
+    return int(match.group()) if match else None
+
+
+def _book_parts(book) -> Tuple[Optional[str], Mapping]:
+    # Dictionaries from the JSON files, or a bible_model.Book (a mapping of chapters itself)
+    if isinstance(book, dict):
+        return book.get("title"), book.get("chapters", {})
+    return getattr(book, "title", None), book
+
+
+def resolve(passages: Union[str, Iterable[Passage]], bible: Mapping) -> Iterator[Verse]:
+    """
+    Yield the verses of a reference from a loaded Bible, in reference order.
+
+    Args:
+        passages: A reference string or parsed Passages.
+        bible: {osis: {title, chapters}} as loaded from JSON, a sharded
+            bible_shards.Bible or a bible_model.CompactBible.
+
+    Books the Bible does not have yield nothing. Verse labels are compared by
+    their leading number, so "3a" and "3b" both belong to verse 3.
+    """
+    if isinstance(passages, str):
+        passages = _parse(passages)
+    for passage in passages:
+        if passage.osis not in bible:
+            continue
+        title, chapters = _book_parts(bible[passage.osis])
+        for chapter in chapters:
+            number = _label_number(chapter)
+            if passage.chapter is not None:
+                if number is None or not passage.chapter <= number <= passage.end_chapter:
+                    continue
+            first = passage.verse if number == passage.chapter else None
+            last = passage.end_verse if number == passage.end_chapter else None
+            for verse, text in chapters[chapter].items():
+                if first is not None or last is not None:
+                    verse_number = _label_number(verse)
+                    if verse_number is None:
+                        continue
+                    if first is not None and verse_number < first or last is not None and verse_number > last:
+                        continue
+                yield Verse(passage.osis, title, str(chapter), str(verse), text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parse passage references and look them up in a Bible.')
+    parser.add_argument('reference', type=str, help='Reference, e.g. "Ps 23:1-6; Jn 3,16"')
+    parser.add_argument('--bible', type=str, help='Bible JSON file or shard directory to print the verses from')
+    args = parser.parse_args()
+
+    try:
+        passages = parse(args.reference)
+    except PassageError as e:
+        parser.error(str(e))
+
+    if not args.bible:
+        for passage in passages:
+            print(passage)
+        return
+
+    from bible_shards import load_bible
+    for verse in resolve(passages, load_bible(args.bible)):
+        print(f"{verse.osis} {verse.chapter}:{verse.verse} {verse.text}")
+
+
+if __name__ == "__main__":
+    main()
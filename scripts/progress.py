@@ -0,0 +1,141 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from crawl_plan import format_duration
+
+# Logging and progress reporting shared by the scrapers.
+#
+# Messages go to the console as plain text and to a JSON-lines file under
+# data/logs/. At the default INFO level that is book-level events, warnings
+# and a progress/ETA line at most every few seconds; per-chapter and
+# per-verse detail is DEBUG and only produced when asked for
+# (SCRAPER_LOG_LEVEL=DEBUG or --verbose).
+
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "logs")
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record, with any `extra` fields as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Bare messages for INFO, prefixed with the level for anything else."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if record.levelno != logging.INFO:
+            message = f"{record.levelname}: {message}"
+        if record.exc_info:
+            message += "\n" + self.formatException(record.exc_info)
+        return message
+
+
+def setup_logging(name: str, level: Optional[str] = None, log_dir: Optional[str] = None) -> logging.Logger:
+    """
+    Configure the console and the JSON-lines file log for a scraper run.
+
+    Args:
+        name: Run name, used for the log file (data/logs/<name>.jsonl).
+        level: Log level name; defaults to $SCRAPER_LOG_LEVEL or INFO.
+        log_dir: Directory for the log file (defaults to data/logs).
+
+    Returns:
+        logging.Logger: The root logger.
+    """
+    root = logging.getLogger()
+    root.setLevel((level or os.environ.get("SCRAPER_LOG_LEVEL", "INFO")).upper())
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(ConsoleFormatter())
+    root.addHandler(console)
+
+    log_dir = log_dir or LOG_DIR
+    os.makedirs(log_dir, exist_ok=True)
+    file_handler = logging.FileHandler(os.path.join(log_dir, f"{name}.jsonl"), encoding="utf-8")
+    file_handler.setFormatter(JsonLinesFormatter())
+    root.addHandler(file_handler)
+
+    # Keep connection-pool chatter out of the debug output
+    for noisy in ("urllib3", "httpx", "httpcore", "hpack"):
+        logging.getLogger(noisy).setLevel(logging.WARNING)
+    return root
+
+
+class Progress:
+    """
+    Counts finished, failed and skipped work items and logs a progress/ETA
+    line at most once every `interval` seconds.
+    """
+
+    def __init__(self, total: int, label: str = "chapters", interval: float = 5.0,
+                 logger: Optional[logging.Logger] = None):
+        self.total = total
+        self.label = label
+        self.interval = interval
+        self.logger = logger or logging.getLogger("progress")
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+        self.started = time.monotonic()
+        self._last_report = self.started
+        self._lock = threading.Lock()
+
+    def advance(self, count: int = 1, failed: bool = False, skipped: bool = False):
+        """Count finished items; failed and skipped items still count towards the total."""
+        with self._lock:
+            self.done += count
+            if failed:
+                self.failed += count
+            if skipped:
+                self.skipped += count
+            now = time.monotonic()
+            if now - self._last_report < self.interval:
+                return
+            self._last_report = now
+        self.report()
+
+    def report(self):
+        """Log the current counts, rate and ETA."""
+        elapsed = time.monotonic() - self.started
+        worked = self.done - self.skipped
+        rate = worked / elapsed if elapsed > 0 else 0.0
+        remaining = max(self.total - self.done, 0)
+        eta = remaining / rate if rate > 0 else 0.0
+        percent = 100.0 * self.done / self.total if self.total else 100.0
+
+        message = f"Progress: {self.done}/{self.total} {self.label} ({percent:.1f}%), {rate:.2f}/s, ETA {format_duration(eta)}"
+        if self.failed:
+            message += f", {self.failed} failed"
+        self.logger.info(message, extra={
+            "done": self.done, "total": self.total, "failed": self.failed, "skipped": self.skipped,
+            "rate": round(rate, 3), "eta_seconds": round(eta, 1),
+        })
+
+    def finish(self):
+        """Log the final counts regardless of the interval."""
+        self.report()
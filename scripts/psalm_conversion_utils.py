@@ -1,7 +1,8 @@
-import json
-from typing import Dict, Any
+from typing import Any, Dict, Optional
 from pathlib import Path
 
+from bible_stream import BibleWriter, iter_chapters
+
 def vul_and_douay_to_modern(psalm_num: int) -> int:
     if psalm_num == 9 or psalm_num == 113:
         return psalm_num
@@ -26,27 +27,22 @@ def convert_psalm_numbers(input_json_path: str, output_json_path: str) -> None:
         input_json_path: Path to the input JSON file
         output_json_path: Path where the converted JSON will be saved
     """
-    # Read the input JSON file
-    with open(input_json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    # Create a new dictionary for the converted data
-    converted_data: Dict[str, Any] = {
-        "Ps": {
-            "title": data["Ps"]["title"],
-            "chapters": {}
-        }
-    }
-
-    # Convert each psalm number
-    for old_num, content in data["Ps"]["chapters"].items():
-        old_num_int = int(old_num)
-        new_num = vul_and_douay_to_modern(old_num_int)
-        converted_data["Ps"]["chapters"][str(new_num)] = content
-
-    # Write the converted data to the output file
-    with open(output_json_path, 'w', encoding='utf-8') as f:
-        json.dump(converted_data, f, indent=4, ensure_ascii=False)
+    # Stream the input; only "Ps" is kept, and one book fits in memory. Psalms
+    # merged by the conversion (114/115 -> 116, 146/147 -> 147) share a key, so
+    # the later one wins as before, wherever it appears in the input.
+    title: Optional[str] = None
+    chapters: Dict[str, Dict[str, Any]] = {}
+    for osis, book_title, old_num, content in iter_chapters(input_json_path):
+        if osis != "Ps":
+            continue
+        title = book_title
+        if old_num is not None:
+            chapters[str(vul_and_douay_to_modern(int(old_num)))] = content
+    with BibleWriter(output_json_path, indent=4) as writer:
+        if title is not None and not chapters:
+            writer.write_chapter("Ps", title, None, None)
+        for new_num, content in chapters.items():
+            writer.write_chapter("Ps", title, new_num, content)
 
 if __name__ == "__main__":
     # Example usage
@@ -1,111 +1,448 @@
 import os
+import argparse
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString, Tag
 import json
+import logging
 import re
 import time
-from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
 from urllib.parse import quote_plus
 
+from bible_io import dump_json, load_bible_json, sidecar_path
+from crawl_plan import CrawlTask, build_plan, format_duration, print_plan_summary
+from fetch import get_fetcher
+from metrics import get_metrics
+from progress import Progress, setup_logging
 
-def scrape_biblegateway(bible_version="NRSVCE", bible_index_file="biblegateway_index.json", output_file="bible_scraped.json"):
+logger = logging.getLogger("biblegateway")
+
+BASE_URL = "https://www.biblegateway.com/passage/"
+
+# BibleGateway renders several versions side by side when the version
+# parameter lists them separated by ";" (e.g. version=NABRE;RSVCE;NRSVCE).
+# We keep pages to a handful of columns so they stay a reasonable size.
+MAX_VERSIONS_PER_PAGE = 5
+
+# A passage search can cover several chapters ("Genesis 1-3; Exodus 1").
+# BibleGateway truncates very long passages, so batches are capped both by
+# chapter count and, when verse counts are known, by total verses.
+MAX_CHAPTERS_PER_PAGE = 5
+MAX_VERSES_PER_PAGE = 250
+AVERAGE_VERSES_PER_CHAPTER = 30
+
+# Verse spans carry a class like "Gen-1-1" or "1John-3-16"
+VERSE_CLASS = re.compile(r"^(\w+)-(\d+)-(\d+)$")
+NUMERIC = re.compile(r"^\d+$")
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+
+class PassageBatch(NamedTuple):
+    search: str
+    chapters: List[Tuple[str, int]]
+
+
+def load_verse_counts(bible_file):
     """
-    Scrapes the entire Bible from BibleGateway using the specified version.
+    Read per-chapter verse counts from a previously scraped Bible.
 
-    :param bible_version: The translation/version to scrape (e.g., 'NRSVCE', 'KJV', 'ESV').
+    :param bible_file: Path to a Bible JSON file in the usual layout.
+    :return: Dictionary mapping (osis, chapter) to the number of verses.
+    """
+    bible_data = load_bible_json(bible_file)
+
+    return {
+        (osis, int(chapter)): len(verses)
+        for osis, book in bible_data.items()
+        for chapter, verses in book.get("chapters", {}).items()
+        if chapter.isdigit()
+    }
+
+
+def format_search(chapters, display_names):
+    """Build a passage search such as 'Genesis 50; Exodus 1-3' from consecutive (osis, chapter) pairs."""
+    parts = []
+    for osis, chapter in chapters:
+        if parts and parts[-1][0] == osis and parts[-1][2] == chapter - 1:
+            parts[-1][2] = chapter
+        else:
+            parts.append([osis, chapter, chapter])
+
+    return "; ".join(
+        f"{display_names[osis]} {first}" if first == last else f"{display_names[osis]} {first}-{last}"
+        for osis, first, last in parts
+    )
+
+
+def plan_passage_batches(plan: List[CrawlTask], display_names: Dict[str, str],
+                         max_chapters: int = MAX_CHAPTERS_PER_PAGE, max_verses: int = MAX_VERSES_PER_PAGE,
+                         verse_counts: Optional[Dict[Tuple[str, int], int]] = None) -> List[PassageBatch]:
+    """
+    Group a chapter plan into multi-chapter passage requests.
+
+    :param plan: Chapter tasks in crawl order (see crawl_plan.build_plan).
+    :param display_names: Mapping of OSIS codes to the names BibleGateway searches on.
+    :param max_chapters: Maximum chapters per request.
+    :param max_verses: Maximum (known or estimated) verses per request.
+    :param verse_counts: Optional (osis, chapter) -> verse count, e.g. from load_verse_counts.
+    :return: List of batches, each with its search string and the chapters it covers.
+    """
+    verse_counts = verse_counts or {}
+    batches = []
+    current = []
+    current_verses = 0
+
+    for task in plan:
+        verses = verse_counts.get((task.osis, task.chapter), AVERAGE_VERSES_PER_CHAPTER)
+        if current and (len(current) >= max_chapters or current_verses + verses > max_verses):
+            batches.append(PassageBatch(format_search(current, display_names), current))
+            current, current_verses = [], 0
+        current.append((task.osis, task.chapter))
+        current_verses += verses
+
+    if current:
+        batches.append(PassageBatch(format_search(current, display_names), current))
+
+    return batches
+
+
+def passage_url(search, version_param):
+    """Build the passage page URL for a search string and one or more ';'-separated versions."""
+    return f"{BASE_URL}?search={quote_plus(search)}&version={version_param}"
+
+
+def split_versions(soup, versions):
+    """
+    Split a (possibly parallel) passage page into one container per version.
+
+    Each version's text lives in a div carrying a "version-[VERSION]" class. A
+    single-version page without such a div falls back to the whole page.
+
+    :param soup: Parsed passage page.
+    :param versions: Versions requested for the page.
+    :return: Dictionary mapping each version to the list of its top-level containers.
+    """
+    containers = {}
+    for version in versions:
+        version_class = f"version-{version}"
+        divs = soup.find_all("div", class_=version_class)
+        # Keep only outermost containers so nested version divs don't duplicate verses
+        containers[version] = [div for div in divs if div.find_parent("div", class_=version_class) is None]
+
+    if len(versions) == 1 and not containers[versions[0]]:
+        containers[versions[0]] = [soup]
+
+    return containers
+
+
+def extract_passage(container, with_notes=False):
+    """
+    Extract every verse on a passage page in a single walk of the tree.
+
+    Heading context is tracked on the way down, so heading text never leaks into
+    verses, and footnotes, cross-references, verse numbers and chapter numbers
+    are skipped rather than removed from the DOM. The container is not modified.
+
+    :param container: Tag holding a single version's passage text.
+    :param with_notes: Also collect headings and footnotes as sidecar records.
+    :return: Tuple of (dictionary mapping (osis, chapter) to {verse: text},
+             list of heading/footnote records, empty unless with_notes is set).
+    """
+    fragments = {}
+    notes = []
+    footnote_texts = {}
+    pending_headings = []
+
+    # Each frame: (iterator over a node's children, current verse (osis, chapter, verse) or None,
+    # enclosing heading record or None)
+    stack = [(iter(container.contents), None, None)]
+    while stack:
+        children, verse, heading = stack[-1]
+        node = next(children, None)
+
+        if node is None:
+            stack.pop()
+            # Leaving the outermost tag of a heading
+            if heading is not None and (not stack or stack[-1][2] is not heading) and with_notes:
+                heading["text"] = " ".join(heading.pop("parts"))
+                if heading["verse"] is None:
+                    pending_headings.append(heading)
+                else:
+                    notes.append(heading)
+            continue
+
+        if not isinstance(node, Tag):
+            # Plain text only; comments, doctypes and the like are skipped
+            if node.__class__ is NavigableString:
+                text = node.strip()
+                if text:
+                    if heading is not None:
+                        if with_notes:
+                            heading["parts"].append(text)
+                    elif verse is not None:
+                        fragments[verse[:2]][verse[2]].append(text)
+            continue
+
+        name = node.name
+        classes = node.get("class") or ()
+
+        if name == "sup":
+            if "footnote" in classes or "crossreference" in classes:
+                if with_notes and verse is not None and heading is None:
+                    notes.append({
+                        "type": "footnote" if "footnote" in classes else "crossref",
+                        "osis": verse[0], "chapter": verse[1], "verse": verse[2],
+                        "marker": node.get_text(strip=True).strip("[]()"),
+                        "ref": node.get("data-fn") or node.get("data-cr"),
+                    })
+                continue
+            if "versenum" in classes:
+                continue
+            # Unlabelled superscripts: keep numbers other than the verse number, drop the rest
+            text = node.get_text(strip=True)
+            if not NUMERIC.match(text) or (verse is not None and text == verse[2]):
+                continue
+        elif name == "span" and "chapternum" in classes:
+            continue
+        elif name == "li" and node.get("id", "").startswith("fen-"):
+            if with_notes:
+                footnote_text = node.find("span", class_="footnote-text") or node
+                footnote_texts["#" + node["id"]] = footnote_text.get_text(" ", strip=True)
+            continue
+        elif name in HEADING_TAGS and heading is None:
+            heading = {"type": "heading", "osis": None, "chapter": None, "verse": None, "parts": []}
+
+        if name == "span":
+            for class_name in classes:
+                match = VERSE_CLASS.match(class_name)
+                if not match:
+                    continue
+                verse = match.groups()
+                if heading is not None:
+                    # A heading is attached to the verse it introduces
+                    if with_notes and heading["verse"] is None:
+                        heading["osis"], heading["chapter"], heading["verse"] = verse
+                else:
+                    fragments.setdefault(verse[:2], {}).setdefault(verse[2], [])
+                    for pending in pending_headings:
+                        pending["osis"], pending["chapter"], pending["verse"] = verse
+                        notes.append(pending)
+                    pending_headings = []
+                break
+
+        stack.append((iter(node.contents), verse, heading))
+
+    for note in notes:
+        if note["type"] == "footnote":
+            note["text"] = footnote_texts.get(note["ref"], "")
+
+    chapters = {
+        key: {verse_number: " ".join(texts) for verse_number, texts in verses.items()}
+        for key, verses in fragments.items()
+    }
+    return chapters, notes
+
+
+def extract_chapter_verses(container, osis, chapter_number):
+    """
+    Extract the verses of one chapter from a version's passage container.
+
+    :param container: Tag holding a single version's passage text.
+    :param osis: OSIS code of the book (e.g. 'Gen').
+    :param chapter_number: Chapter to extract.
+    :return: Dictionary mapping verse numbers (as strings) to verse text.
+    """
+    chapters, _ = extract_passage(container)
+    return chapters.get((osis, str(chapter_number)), {})
+
+
+def fetch_passage(fetcher, search, versions, with_notes=False):
+    """
+    Fetch one passage page and split it per version.
+
+    :param fetcher: Fetcher used for the request.
+    :param search: Passage search string (see format_search).
+    :param versions: Versions rendered side by side on the page.
+    :param with_notes: Also collect headings and footnotes.
+    :return: Dictionary mapping each version to its {(osis, chapter): verses} and its notes.
+    """
+    # Force UTF-8 to avoid bad characters
+    page = fetcher.get_text(passage_url(search, ";".join(versions)), encoding="utf-8")
+    results = {}
+    with get_metrics().time_parse("biblegateway"):
+        soup = BeautifulSoup(page, "html.parser")
+        for version, containers in split_versions(soup, versions).items():
+            page_chapters, page_notes = {}, []
+            for container in containers:
+                container_chapters, container_notes = extract_passage(container, with_notes=with_notes)
+                for key, verses in container_chapters.items():
+                    page_chapters.setdefault(key, {}).update(verses)
+                page_notes.extend(container_notes)
+            results[version] = (page_chapters, page_notes)
+    return results
+
+
+def group_notes(notes):
+    """Arrange sidecar records as {osis: {chapter: [records]}} for saving."""
+    grouped = {}
+    for note in notes:
+        record = {key: value for key, value in note.items() if key not in ("osis", "chapter")}
+        grouped.setdefault(note["osis"], {}).setdefault(note["chapter"], []).append(record)
+    return grouped
+
+
+def scrape_biblegateway_versions(bible_versions, bible_index_file="biblegateway_index.json", output_files=None,
+                                 max_chapters=MAX_CHAPTERS_PER_PAGE, verse_counts_file=None, with_notes=False):
+    """
+    Scrapes the entire Bible from BibleGateway for several versions at once.
+
+    Each page covers a range of chapters with all versions rendered side by side,
+    then is split into one Bible per version, so k versions cost about one crawl
+    and a full Bible takes several times fewer requests than one per chapter.
+
+    :param bible_versions: The translations/versions to scrape (e.g., ['NABRE', 'RSVCE', 'NRSVCE']).
     :param bible_index_file: JSON file containing the list of books, chapters, and OSIS codes.
-    :param output_file: The filename where the scraped JSON will be saved (default: 'bible_scraped.json').
+    :param output_files: Optional dictionary mapping each version to its output filename
+                         (default: 'bible_[version].json').
+    :param max_chapters: Maximum chapters per page request (1 requests one chapter per page).
+    :param verse_counts_file: Optional previously scraped Bible used to keep pages under MAX_VERSES_PER_PAGE.
+    :param with_notes: Also save headings and footnotes to a '[output]_notes.json' sidecar per version.
     """
+    output_files = output_files or {}
 
     # Ensure the output directory exists
     output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
     os.makedirs(output_dir, exist_ok=True)  # Create "data/" folder if it doesn't exist
-    output_path = os.path.join(output_dir, output_file)  # Full path to output JSON file
 
     # Load JSON data (list of books and chapters)
     with open(bible_index_file, "r", encoding="utf-8") as file:
         bible_index_data = json.load(file)
 
     # Extract book names and OSIS codes
-    books = [(book["display"], book["osis"], book["num_chapters"]) for book in bible_index_data["data"][0]]
+    display_names = {book["osis"]: book["display"] for book in bible_index_data["data"][0]}
+    verse_counts = load_verse_counts(verse_counts_file) if verse_counts_file else None
 
-    # Store all verses in a nested dictionary using the desired structure
-    bible_data = {}
+    # Store all verses per version in a nested dictionary using the desired structure
+    bible_data = {version: {} for version in bible_versions}
+    notes = {version: [] for version in bible_versions}
+    fetcher = get_fetcher()
+    metrics = get_metrics()
 
-    for display_name, osis, num_chapters in books:
-        print(f"Scraping {display_name} ({osis}) in {bible_version}...")
+    for start in range(0, len(bible_versions), MAX_VERSIONS_PER_PAGE):
+        page_versions = bible_versions[start:start + MAX_VERSIONS_PER_PAGE]
+        version_param = ";".join(page_versions)
 
-        # Initialize the dictionary for this book using OSIS as the key and store the title
-        bible_data[osis] = {"title": display_name, "chapters": {}}
+        plan = build_plan("biblegateway", translation=version_param, index_file=bible_index_file)
+        print_plan_summary("biblegateway", plan)
+        batches = plan_passage_batches(plan, display_names, max_chapters=max_chapters, verse_counts=verse_counts)
+        logger.info("Batched into %d page requests, ETA %s", len(batches), format_duration(len(batches) * 2.5))
+        progress = Progress(len(plan))
 
-        # Loop through each chapter
-        for chapter_number in range(1, num_chapters + 1):
-            print(f"Scraping Chapter {chapter_number}...")
+        for search, chapters in batches:
+            logger.debug("Scraping %s in %s...", search, version_param)
 
-            # Construct URL dynamically
-            display_query_string = quote_plus(display_name)
-            URL = f"https://www.biblegateway.com/passage/?search={display_query_string}%20{chapter_number}&version={bible_version}"
+            # Initialize the dictionary for each new book using OSIS as the key and store the title
+            for osis, _ in chapters:
+                for version in page_versions:
+                    bible_data[version].setdefault(osis, {"title": display_names[osis], "chapters": {}})
 
-            # Fetch the webpage
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/110.0.0.0"
-            }
-            response = requests.get(URL, headers=headers)
+            try:
+                results = fetch_passage(fetcher, search, page_versions, with_notes)
+            except requests.exceptions.RequestException as e:
+                logger.error("%s - Skipping %s", e, search)
+                progress.advance(len(chapters), failed=True)
+                continue  # Skip to the next batch
 
-            # Force UTF-8 encoding to avoid bad characters
-            response.encoding = "utf-8"
+            # Chapters a version is missing from the page (a truncated passage, or a
+            # range the site cut at its length limit) are refetched one per request
+            missing = {}
+            for version, (page_chapters, page_notes) in results.items():
+                notes[version].extend(page_notes)
+                for osis, chapter_number in chapters:
+                    verses = page_chapters.get((osis, str(chapter_number)))
+                    if verses:
+                        bible_data[version][osis]["chapters"][str(chapter_number)] = verses
+                    else:
+                        missing.setdefault((osis, chapter_number), []).append(version)
 
-            if response.status_code != 200:
-                print(f"Error: {response.status_code} - Skipping {display_name} {chapter_number}")
-                continue  # Skip to the next chapter
+            failed = 0
+            if missing and len(chapters) > 1:
+                logger.warning("%s: %s missing from the page, refetching them one by one", search,
+                               ", ".join(f"{osis} {chapter_number}" for osis, chapter_number in missing))
+            for (osis, chapter_number), versions in missing.items():
+                verses_by_version = {}
+                if len(chapters) > 1:
+                    time.sleep(2)
+                    try:
+                        retry = fetch_passage(fetcher, format_search([(osis, chapter_number)], display_names),
+                                              versions, with_notes)
+                    except requests.exceptions.RequestException as e:
+                        logger.error("%s - Skipping %s %s", e, osis, chapter_number)
+                        retry = {}
+                    for version, (page_chapters, page_notes) in retry.items():
+                        verses_by_version[version] = page_chapters.get((osis, str(chapter_number)))
+                        notes[version].extend(note for note in page_notes
+                                              if (note["osis"], note["chapter"]) == (osis, str(chapter_number)))
 
-            # Parse the HTML
-            soup = BeautifulSoup(response.text, "html.parser")
+                for version in versions:
+                    if verses_by_version.get(version):
+                        bible_data[version][osis]["chapters"][str(chapter_number)] = verses_by_version[version]
+                if not all(verses_by_version.get(version) for version in versions):
+                    # Left out of the output rather than saved empty
+                    logger.error("No verses found for %s %s in %s", osis, chapter_number,
+                                 ", ".join(version for version in versions if not verses_by_version.get(version)))
+                    failed += 1
 
-            # Dictionary to store merged verse fragments
-            verses_dict = defaultdict(list)
+            progress.advance(len(chapters) - failed)
+            if failed:
+                progress.advance(failed, failed=True)
 
-            # Find all spans where class matches "[OSIS]-[CHAPTER_NUMBER]-N" (e.g., "Gen-1-1")
-            for verse_span in soup.find_all("span", class_=re.compile(fr"{osis}-{chapter_number}-\d+")):
-                # Ensure the span is NOT inside a heading tag (<h1>, <h2>, <h3>, etc.)
-                if verse_span.find_parent(re.compile(r"h\d")):
-                    continue  # Skip headings
+            # Sleep briefly to avoid getting blocked
+            time.sleep(2)
 
-                # Extract the verse number (last part of class name)
-                verse_number = verse_span["class"][1].split("-")[-1]
+        progress.finish()
 
-                # Remove unwanted elements: footnotes and chapter numbers
-                for sup in verse_span.find_all("sup"):
-                    if not re.match(r"^\d+$", sup.get_text(strip=True)):  # If not numeric
-                        sup.insert_before(" ")  # Add space before footnote removal
-                        sup.decompose()  # Remove the footnote tag
-                for chapternum in verse_span.find_all("span", class_="chapternum"):
-                    chapternum.decompose()  # Completely remove chapter numbers
+    # Save each version's verses to its own JSON file with UTF-8 encoding
+    for version in bible_versions:
+        output_path = os.path.join(output_dir, output_files.get(version, f"bible_{version.lower()}.json"))
+        with metrics.time_checkpoint("biblegateway"):
+            dump_json(bible_data[version], output_path, indent=4)
 
-                # Extract cleaned verse text
-                verse_text = verse_span.get_text(" ", strip=True)  # Ensures spacing remains intact
+        logger.info("Scraping complete! All %s verses saved to %s", version, output_path)
 
-                # Remove verse number from text
-                verse_text = verse_text.replace(verse_number, "").strip()
+        if with_notes:
+            notes_path = sidecar_path(output_path, "notes")
+            dump_json(group_notes(notes[version]), notes_path, indent=4)
+            logger.info("Headings and footnotes saved to %s", notes_path)
 
-                # Store text in dictionary, grouped by verse number
-                verses_dict[verse_number].append(verse_text)
+    metrics.report("biblegateway")
 
-            # Ensure the chapter key exists under 'chapters'
-            bible_data[osis]["chapters"][str(chapter_number)] = {}
 
-            # Merge verse fragments and store them in the structured dictionary
-            for verse, texts in verses_dict.items():
-                bible_data[osis]["chapters"][str(chapter_number)][str(verse)] = " ".join(texts)
+def scrape_biblegateway(bible_version="NRSVCE", bible_index_file="biblegateway_index.json", output_file="bible_scraped.json"):
+    """
+    Scrapes the entire Bible from BibleGateway using the specified version.
 
-            # Sleep briefly to avoid getting blocked
-            time.sleep(2)
+    :param bible_version: The translation/version to scrape (e.g., 'NRSVCE', 'KJV', 'ESV').
+    :param bible_index_file: JSON file containing the list of books, chapters, and OSIS codes.
+    :param output_file: The filename where the scraped JSON will be saved (default: 'bible_scraped.json').
+    """
+    scrape_biblegateway_versions([bible_version], bible_index_file, {bible_version: output_file})
 
-    # Save all verses to a JSON file with UTF-8 encoding
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(bible_data, f, indent=4, ensure_ascii=False)
 
-    print(f"Scraping complete! All verses saved to {output_path}")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Scrape one or more Bible versions from BibleGateway.')
+    parser.add_argument('--versions', nargs='+', help='Versions to scrape from shared page requests (e.g. NABRE RSVCE NRSVCE)')
+    parser.add_argument('--index', type=str, default='biblegateway_index.json', help='Path to biblegateway_index.json')
+    parser.add_argument('--max-chapters', type=int, default=MAX_CHAPTERS_PER_PAGE, help='Maximum chapters per page request')
+    parser.add_argument('--verse-counts', type=str, help='Previously scraped Bible JSON used to size multi-chapter pages')
+    parser.add_argument('--notes', action='store_true', help='Also save headings and footnotes to a sidecar JSON file')
+    parser.add_argument('--verbose', action='store_true', help='Log every page request (debug level)')
+    args = parser.parse_args()
 
+    setup_logging("biblegateway", level="DEBUG" if args.verbose else None)
 
-scrape_biblegateway(bible_version="NABRE", output_file="bible_nrsvce.json")
+    if args.versions:
+        scrape_biblegateway_versions(args.versions, bible_index_file=args.index, max_chapters=args.max_chapters,
+                                     verse_counts_file=args.verse_counts, with_notes=args.notes)
+    else:
+        scrape_biblegateway(bible_version="NABRE", bible_index_file=args.index, output_file="bible_nrsvce.json")
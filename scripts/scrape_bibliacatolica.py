@@ -1,10 +1,17 @@
 import os
 import requests
-from bs4 import BeautifulSoup
-import json
+import logging
 import time
 from collections import defaultdict
 
+from bible_io import dump_json, load_bible_json
+from crawl_plan import build_plan, group_by_book, pending_tasks, print_plan_summary
+from fetch import get_fetcher
+from metrics import get_metrics
+from progress import Progress, setup_logging
+
+logger = logging.getLogger("bibliacatolica")
+
 # this script will likely be trashed, too.
 # there's no general solution for removing random parenthesis from the inner text of the verses, e.g.:
 # Eis que uma Virgem conceberá e dará à luz um filho, que se chamará Emanuel (), que significa: Deus conosco.
@@ -91,6 +98,50 @@ bible_dictionary = {
 }
 
 
+def parse_chapter(soup):
+    """
+    Extract the verses of a chapter page.
+
+    :param soup: Parsed chapter page.
+    :return: Dictionary mapping verse numbers to text, or None if the page has no content section.
+    """
+    entry_section = soup.find("section", class_="entry")
+    if not entry_section:
+        return None
+
+    verses = {}
+
+    # Find all verse paragraphs
+    verse_paragraphs = entry_section.find_all("p")
+    for verse_p in verse_paragraphs:
+        # Skip if no strong tag (verse number)
+        if not verse_p.find("strong"):
+            continue
+
+        # Extract verse number and text
+        verse_number = verse_p.find("strong").text.strip().replace(".", "")
+
+        # Get the text after the strong tag (verse number)
+        verse_text = ""
+        for content in verse_p.contents:
+            if content.name != "strong":  # Skip the verse number
+                if isinstance(content, str):  # If it's a text node
+                    verse_text += content
+                elif content.name is None:  # If it's a NavigableString
+                    verse_text += str(content)
+
+        # Clean up the verse text
+        verse_text = verse_text.strip()
+        # Remove asterisk at the end if present
+        if verse_text.endswith("*"):
+            verse_text = verse_text[:-1].strip()
+
+        # Store verse in the dictionary
+        verses[verse_number] = verse_text
+
+    return verses
+
+
 def scrape_bibliacatolica(bible_dictionary=bible_dictionary, output_file="bible_ave_maria.json"):
     """
     Scrapes the entire Bible from Biblia Católica (Ave Maria version).
@@ -109,118 +160,82 @@ def scrape_bibliacatolica(bible_dictionary=bible_dictionary, output_file="bible_
     # Try to load existing data if the file exists
     if os.path.exists(output_path):
         try:
-            with open(output_path, "r", encoding="utf-8") as f:
-                bible_data = json.load(f)
-            print("Loaded existing progress from file")
-        except json.JSONDecodeError:
-            print("Could not load existing progress, starting fresh")
-
-    # Headers for requests
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/110.0.0.0"
-    }
+            bible_data = load_bible_json(output_path)
+            logger.info("Loaded existing progress from file")
+        except ValueError:  # not JSON, or not a Bible (bible_schema.SchemaError)
+            logger.warning("Could not load existing progress, starting fresh")
+
+    # Pages go through the shared fetcher (same User-Agent as before, with retries)
+    fetcher = get_fetcher()
+    metrics = get_metrics()
+
+    # Chapter counts come from the shared index, so no request is spent on
+    # reading each book's chapter list
+    plan = build_plan(
+        "bibliacatolica",
+        translation="biblia-ave-maria",
+        books=list(bible_dictionary),
+        slugs={osis: book_info["slug"] for osis, book_info in bible_dictionary.items()},
+    )
+    pending = pending_tasks(plan, bible_data)
+    print_plan_summary("bibliacatolica", pending)
+    progress = Progress(len(pending))
+    book_plans = group_by_book(plan)
 
     for osis, book_info in bible_dictionary.items():
         # Skip if book is already scraped
         if osis in bible_data:
-            print(f"Skipping {book_info['name']} ({osis}) - already scraped")
+            logger.info("Skipping %s (%s) - already scraped", book_info['name'], osis)
             continue
 
-        print(f"Scraping {book_info['name']} ({osis})...")
+        logger.info("Scraping %s (%s)...", book_info['name'], osis)
         bible_data[osis] = {"title": book_info["name"], "chapters": {}}
 
         try:
-            # First, get the number of chapters for this book
-            book_url = f"https://www.bibliacatolica.com.br/biblia-ave-maria/{book_info['slug']}/1/"
-            response = requests.get(book_url, headers=headers)
-            response.encoding = "utf-8"
-
-            if response.status_code != 200:
-                print(f"Error: {response.status_code} - Skipping {book_info['name']}")
-                continue
-
-            soup = BeautifulSoup(response.text, "html.parser")
-            chapter_list = soup.find("ul", class_="listChapter")
-
-            if not chapter_list:
-                print(f"No chapter list found for {book_info['name']}")
-                continue
-
-            # Get the maximum chapter number from the list
-            max_chapter = max(
-                int(li.find("a").text)
-                for li in chapter_list.find_all("li")
-                if li.find("a")
-            )
-
-            # Now scrape each chapter
-            for chapter_num in range(1, max_chapter + 1):
-                print(f"Scraping Chapter {chapter_num}...")
-                chapter_url = f"https://www.bibliacatolica.com.br/biblia-ave-maria/{book_info['slug']}/{chapter_num}/"
-
-                response = requests.get(chapter_url, headers=headers)
-                response.encoding = "utf-8"
-
-                if response.status_code != 200:
-                    print(f"Error: {response.status_code} - Skipping {book_info['name']} {chapter_num}")
+            # Now scrape each chapter listed in the crawl plan
+            for task in book_plans.get(osis, []):
+                chapter_num, chapter_url = task.chapter, task.url
+                logger.debug("Scraping %s %d...", osis, chapter_num)
+
+                try:
+                    soup = fetcher.get_soup(chapter_url, encoding="utf-8")
+                except requests.exceptions.RequestException as e:
+                    logger.error("%s - Skipping %s %d", e, book_info['name'], chapter_num)
+                    progress.advance(failed=True)
                     continue
 
-                soup = BeautifulSoup(response.text, "html.parser")
-                entry_section = soup.find("section", class_="entry")
-
-                if not entry_section:
-                    print(f"No content found for {book_info['name']} {chapter_num}")
+                with metrics.time_parse("bibliacatolica"):
+                    verses = parse_chapter(soup)
+                if verses is None:
+                    logger.warning("No content found for %s %d", book_info['name'], chapter_num)
+                    progress.advance(failed=True)
                     continue
 
-                # Initialize chapter dictionary
-                bible_data[osis]["chapters"][str(chapter_num)] = {}
-
-                # Find all verse paragraphs
-                verse_paragraphs = entry_section.find_all("p")
-                for verse_p in verse_paragraphs:
-                    # Skip if no strong tag (verse number)
-                    if not verse_p.find("strong"):
-                        continue
-
-                    # Extract verse number and text
-                    verse_number = verse_p.find("strong").text.strip().replace(".", "")
-
-                    # Get the text after the strong tag (verse number)
-                    verse_text = ""
-                    for content in verse_p.contents:
-                        if content.name != "strong":  # Skip the verse number
-                            if isinstance(content, str):  # If it's a text node
-                                verse_text += content
-                            elif content.name is None:  # If it's a NavigableString
-                                verse_text += str(content)
-
-                    # Clean up the verse text
-                    verse_text = verse_text.strip()
-                    # Remove asterisk at the end if present
-                    if verse_text.endswith("*"):
-                        verse_text = verse_text[:-1].strip()
-
-                    # Store verse in the dictionary
-                    bible_data[osis]["chapters"][str(chapter_num)][verse_number] = verse_text
+                # Store the chapter's verses
+                bible_data[osis]["chapters"][str(chapter_num)] = verses
+                progress.advance()
 
                 # Sleep briefly to avoid getting blocked
                 time.sleep(2)
 
             # Save progress after each book is completed
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(bible_data, f, indent=4, ensure_ascii=False)
-            print(f"Saved progress after completing {book_info['name']}")
+            with metrics.time_checkpoint("bibliacatolica"):
+                dump_json(bible_data, output_path, indent=4)
+            logger.info("Saved progress after completing %s", book_info['name'])
 
         except Exception as e:
-            print(f"Error while scraping {book_info['name']}: {str(e)}")
+            logger.exception("Error while scraping %s: %s", book_info['name'], e)
             # Save progress even if there was an error
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(bible_data, f, indent=4, ensure_ascii=False)
-            print(f"Saved progress after error in {book_info['name']}")
+            with metrics.time_checkpoint("bibliacatolica"):
+                dump_json(bible_data, output_path, indent=4)
+            logger.info("Saved progress after error in %s", book_info['name'])
             continue
 
-    print(f"Scraping complete! All verses saved to {output_path}")
+    progress.finish()
+    logger.info("Scraping complete! All verses saved to %s", output_path)
+    metrics.report("bibliacatolica")
 
 
 if __name__ == "__main__":
+    setup_logging("bibliacatolica")
     scrape_bibliacatolica(output_file="bible_ave_maria.json")
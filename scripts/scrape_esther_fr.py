@@ -32,13 +32,51 @@
 
 import requests
 from bs4 import BeautifulSoup
-import json
+import logging
 import os
 from typing import Dict, Any
 import time
 
+from bible_io import dump_json
+from crawl_plan import build_plan, print_plan_summary
+from fetch import get_fetcher
+from metrics import get_metrics
+from progress import Progress, setup_logging
+
+logger = logging.getLogger("stepbible")
+
+def parse_chapter(html: str) -> Dict[str, str]:
+    """Extract the verses from a chapter page."""
+    soup = BeautifulSoup(html, 'html.parser')
+    chapter_data = {}
+
+    # Find all verse elements
+    verse_elements = soup.find_all('span', class_='verse ltrDirection')
+
+    for verse_element in verse_elements:
+        # Get verse number
+        verse_number_span = verse_element.find('span', class_='verseNumber')
+        if not verse_number_span:
+            continue
+
+        verse_number = verse_number_span.text.strip()
+
+        # Get verse text
+        # Remove the verse number and links to get clean text
+        for a in verse_element.find_all('a'):
+            a.decompose()
+        for span in verse_element.find_all('span', class_='verseNumber'):
+            span.decompose()
+
+        verse_text = verse_element.get_text(strip=True)
+        chapter_data[verse_number] = verse_text
+
+    return chapter_data
+
 def scrape_esther() -> Dict[str, Any]:
-    base_url = "https://www.stepbible.org/?q=version=FreCrampon@reference=Est."
+    plan = build_plan("stepbible", translation="FreCrampon", books=["Esth"], slugs={"Esth": "Est"})
+    print_plan_summary("stepbible", plan)
+    progress = Progress(len(plan))
     data = {
         "Esth": {
             "title": "Esther",
@@ -46,44 +84,26 @@ def scrape_esther() -> Dict[str, Any]:
         }
     }
 
-    # There are 16 chapters in Esther
-    for chapter in range(1, 17):
-        url = f"{base_url}{chapter}"
-        print(f"Scraping chapter {chapter}...")
+    # Esther has 16 chapters in the Crampon (see the stepbible overrides in crawl_plan)
+    for _, chapter, url in plan:
+        logger.debug("Scraping chapter %d...", chapter)
 
         # Add delay to be respectful to the server
         time.sleep(1)
 
-        response = requests.get(url)
-        if response.status_code != 200:
-            print(f"Failed to fetch chapter {chapter}")
+        try:
+            html = get_fetcher().get_text(url)
+        except requests.exceptions.RequestException:
+            logger.error("Failed to fetch chapter %d", chapter)
+            progress.advance(failed=True)
             continue
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        chapter_data = {}
-
-        # Find all verse elements
-        verse_elements = soup.find_all('span', class_='verse ltrDirection')
-
-        for verse_element in verse_elements:
-            # Get verse number
-            verse_number_span = verse_element.find('span', class_='verseNumber')
-            if not verse_number_span:
-                continue
-
-            verse_number = verse_number_span.text.strip()
-
-            # Get verse text
-            # Remove the verse number and links to get clean text
-            for a in verse_element.find_all('a'):
-                a.decompose()
-            for span in verse_element.find_all('span', class_='verseNumber'):
-                span.decompose()
-
-            verse_text = verse_element.get_text(strip=True)
-            chapter_data[verse_number] = verse_text
-
+        with get_metrics().time_parse("stepbible"):
+            chapter_data = parse_chapter(html)
         data["Esth"]["chapters"][str(chapter)] = chapter_data
+        progress.advance()
+
+    progress.finish()
 
     return data
 
@@ -92,14 +112,16 @@ def save_data(data: Dict[str, Any]) -> None:
     os.makedirs('data', exist_ok=True)
 
     # Save the data to a JSON file
-    with open('data/esther_fr.json', 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    with get_metrics().time_checkpoint("stepbible"):
+        dump_json(data, 'data/esther_fr.json')
 
 def main():
-    print("Starting Esther French Bible scraper...")
+    setup_logging("stepbible")
+    logger.info("Starting Esther French Bible scraper...")
     data = scrape_esther()
     save_data(data)
-    print("Scraping completed successfully!")
+    logger.info("Scraping completed successfully!")
+    get_metrics().report("stepbible")
 
 if __name__ == "__main__":
     main()
@@ -1,10 +1,19 @@
 import requests
 from bs4 import BeautifulSoup
-import json
+import logging
 import os
 from typing import Dict, List, Optional, Tuple
 import time
 
+from bible_io import dump_json, load_bible_json
+from crawl_plan import build_plan, group_by_book, pending_tasks, print_plan_summary
+from fetch import get_fetcher
+from metrics import get_metrics
+from progress import Progress, setup_logging
+from title_match import matcher_for
+
+logger = logging.getLogger("german")
+
 TABLE_OF_CONTENTS = "https://www.uibk.ac.at/theol/leseraum/bibel/"
 
 # Mapping of German OSIS codes to English OSIS codes
@@ -91,10 +100,26 @@ URL_MAP = {
     # Add other special character mappings if needed
 }
 
+def canonical_book_code(book_code: str, book_title: str) -> Optional[str]:
+    """
+    The OSIS_MAP code of a table of contents row: the code itself when it is
+    known, otherwise the closest match for the code or the title (e.g. "1Kön"
+    for "1Koen"), or None.
+    """
+    if book_code in OSIS_MAP:
+        return book_code
+    german_codes = {osis: code for code, osis in OSIS_MAP.items()}
+    matcher = matcher_for("german", OSIS_MAP)
+    for name in (book_code, book_title):
+        match = matcher.match(name)
+        if match and match.osis in german_codes:
+            return german_codes[match.osis]
+    logger.warning("Unknown book in table of contents: %s (%s)", book_code, book_title)
+    return None
+
 def get_table_of_contents() -> Dict[str, Tuple[str, int]]:
     """Get the table of contents and return a dictionary mapping book codes to their titles and max chapter numbers."""
-    response = requests.get(TABLE_OF_CONTENTS)
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = get_fetcher().get_soup(TABLE_OF_CONTENTS)
 
     book_info = {}
 
@@ -108,13 +133,7 @@ def get_table_of_contents() -> Dict[str, Tuple[str, int]]:
             book_code_link = cells[1].find('a')
             if book_link and book_code_link:
                 book_title = book_link.text.strip()
-                book_code = book_code_link.text.strip()
-
-                # Special handling for Kings books
-                if book_code in ['1Kön', '2Kön']:
-                    book_code = book_code.replace('Kön', 'Koen')
-
-
+                book_code = canonical_book_code(book_code_link.text.strip(), book_title)
 
                 if book_code in OSIS_MAP:
                     # Get all chapter links
@@ -131,22 +150,25 @@ def get_chapter_text(book_code: str, chapter: int) -> Dict[int, str]:
     # Convert book code to URL-safe version if needed
     url_book_code = URL_MAP.get(book_code, book_code.lower())
     url = f"{TABLE_OF_CONTENTS}{url_book_code}{chapter}.html"
-    print(f"\nAttempting to fetch: {url}")
+    logger.debug("Fetching %s", url)
 
     try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        print(f"Response status: {response.status_code}")
+        html = get_fetcher().get_text(url)
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching URL: {e}")
+        logger.error("Error fetching %s: %s", url, e)
         return {}
 
-    soup = BeautifulSoup(response.text, 'html.parser')
+    with get_metrics().time_parse("german"):
+        return parse_chapter_text(html, book_code, chapter)
+
+def parse_chapter_text(html: str, book_code: str, chapter: int) -> Dict[int, str]:
+    """Extract the verses from a chapter page."""
+    soup = BeautifulSoup(html, 'html.parser')
     verses = {}
 
     # Find all table rows that contain verses
     rows = soup.find_all('tr')
-    print(f"Found {len(rows)} table rows")
+    logger.debug("Found %d table rows", len(rows))
 
     for row in rows:
         # Try to find verse cell with width attribute first (standard structure)
@@ -167,7 +189,6 @@ def get_chapter_text(book_code: str, chapter: int) -> Dict[int, str]:
 
         try:
             verse_num = int(verse_id)
-            print(f"Found verse {verse_num}")
 
             # Try to find text cell with width attribute first (standard structure)
             text_cell = row.find('td', width="75%")
@@ -179,14 +200,14 @@ def get_chapter_text(book_code: str, chapter: int) -> Dict[int, str]:
                 # Clean up the text by removing newlines, extra whitespace, and forward slashes
                 verse_text = ' '.join(text_cell.text.strip().replace('/', '').split())
                 verses[verse_num] = verse_text
-                print(f"  {book_code} {chapter}:{verse_num} - {verse_text}")
+                logger.debug("%s %s:%d - %s", book_code, chapter, verse_num, verse_text)
             else:
-                print(f"  Warning: No text cell found for verse {verse_num}")
+                logger.warning("No text cell found for %s %s:%d", book_code, chapter, verse_num)
         except (ValueError, IndexError) as e:
-            print(f"  Warning: Error processing verse: {e}")
+            logger.warning("Error processing verse in %s %s: %s", book_code, chapter, e)
             continue
 
-    print(f"Total verses found: {len(verses)}")
+    logger.debug("Found %d verses in %s %s", len(verses), book_code, chapter)
     return verses
 
 def print_detected_books(book_info: Dict[str, Tuple[str, int]]):
@@ -208,9 +229,22 @@ def scrape_bible(output_dir: str = "data"):
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
 
-    # Get table of contents
-    print("Getting table of contents...")
-    book_info = get_table_of_contents()
+    # The table of contents is only needed for the German titles; chapter
+    # counts come from the shared crawl plan
+    logger.info("Getting table of contents...")
+    toc = get_table_of_contents()
+    german_codes = {osis: book_code for book_code, osis in OSIS_MAP.items()}
+    plan = build_plan(
+        "german",
+        books=list(german_codes),
+        slugs={osis: URL_MAP.get(book_code, book_code.lower()) for osis, book_code in german_codes.items()},
+    )
+    book_plans = group_by_book(plan)
+    book_info = {}
+    for osis, tasks in book_plans.items():
+        book_code = german_codes[osis]
+        book_title = toc[book_code][0] if book_code in toc else book_code
+        book_info[book_code] = (book_title, len(tasks))
 
     # Print detected books
     print_detected_books(book_info)
@@ -222,21 +256,24 @@ def scrape_bible(output_dir: str = "data"):
     # Try to load existing data if file exists
     if os.path.exists(output_file):
         try:
-            with open(output_file, 'r', encoding='utf-8') as f:
-                bible_data = json.load(f)
-            print("Loaded existing data from", output_file)
-        except json.JSONDecodeError:
-            print("Could not load existing data, starting fresh")
+            bible_data = load_bible_json(output_file)
+            logger.info("Loaded existing data from %s", output_file)
+        except ValueError:  # not JSON, or not a Bible (bible_schema.SchemaError)
+            logger.warning("Could not load existing data, starting fresh")
+
+    pending = pending_tasks(plan, bible_data)
+    print_plan_summary("german", pending)
+    progress = Progress(len(pending))
 
     # Scrape each book
     total_books = len(book_info)
     for i, (book_code, (book_title, max_chapter)) in enumerate(book_info.items(), 1):
         # Skip if we already have this book
         if OSIS_MAP[book_code] in bible_data:
-            print(f"[{i}/{total_books}] Skipping {book_code} ({book_title}) - already scraped")
+            logger.info("[%d/%d] Skipping %s (%s) - already scraped", i, total_books, book_code, book_title)
             continue
 
-        print(f"[{i}/{total_books}] Scraping {book_code} ({book_title})...")
+        logger.info("[%d/%d] Scraping %s (%s)...", i, total_books, book_code, book_title)
         book_data = {
             "title": book_title,
             "chapters": {}
@@ -244,29 +281,34 @@ def scrape_bible(output_dir: str = "data"):
 
         # Scrape each chapter
         for chapter in range(1, max_chapter + 1):
-            print(f"  Chapter {chapter}/{max_chapter}...")
+            logger.debug("Chapter %d/%d of %s", chapter, max_chapter, book_code)
             try:
                 verses = get_chapter_text(book_code, chapter)
                 if verses:
                     book_data["chapters"][str(chapter)] = verses
+                progress.advance(failed=not verses)
                 time.sleep(1)  # Be nice to the server
             except Exception as e:
-                print(f"Error scraping {book_code} {chapter}: {e}")
+                logger.error("Error scraping %s %d: %s", book_code, chapter, e)
+                progress.advance(failed=True)
                 continue
 
         # Add book data to Bible and save after each book
         if book_data["chapters"]:
             bible_data[OSIS_MAP[book_code]] = book_data
             # Save after each book
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(bible_data, f, ensure_ascii=False, indent=2)
-            print(f"Saved {book_code} to {output_file}")
+            with get_metrics().time_checkpoint("german"):
+                dump_json(bible_data, output_file)
+            logger.info("Saved %s to %s", book_code, output_file)
         else:
-            print(f"Warning: No chapters found for {book_code}")
+            logger.warning("No chapters found for %s", book_code)
 
-    print(f"Completed scraping all books. Final data saved to {output_file}")
+    progress.finish()
+    logger.info("Completed scraping all books. Final data saved to %s", output_file)
+    get_metrics().report("german")
 
 if __name__ == "__main__":
+    setup_logging("german")
     scrape_bible()
 
 
@@ -1,12 +1,19 @@
 # a script to scrape the gratis bible website:
 # https://gratis.bible/fr/dejer/
 
-import requests
 from bs4 import BeautifulSoup
-import json
+import logging
 import time
 import os
-from typing import Dict, List, Optional
+from typing import Dict, Optional
+
+from bible_io import dump_json, load_bible_json
+from crawl_plan import build_plan, group_by_book, pending_tasks, print_plan_summary
+from fetch import get_fetcher
+from metrics import get_metrics
+from progress import Progress, setup_logging
+
+logger = logging.getLogger("gratis")
 
 # Create data directory if it doesn't exist
 os.makedirs('data', exist_ok=True)
@@ -25,51 +32,28 @@ bible_dictionary = [
 def load_existing_data(file_path: str) -> Dict:
     """Load existing data from JSON file if it exists."""
     if os.path.exists(file_path):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return load_bible_json(file_path)
     return {}
 
 def save_progress(file_path: str, data: Dict):
     """Save data to JSON file."""
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-def get_book_chapters(book_slug: str) -> List[str]:
-    """Get all chapter numbers for a given book."""
-    url = f"https://gratis.bible/fr/dejer/{book_slug}/"
-    response = requests.get(url)
-    response.raise_for_status()
-
-    soup = BeautifulSoup(response.text, 'html.parser')
-    chapter_list = soup.find('ul')
-    if not chapter_list:
-        return []
-
-    chapters = []
-    for link in chapter_list.find_all('a'):
-        # Extract chapter number from href (e.g., "/fr/dejer/gen/1" -> "1")
-        chapter_num = link['href'].split('/')[-1]
-        chapters.append(chapter_num)
-
-    return sorted(chapters, key=int)
+    with get_metrics().time_checkpoint("gratis"):
+        dump_json(data, file_path)
 
 def get_book_title(book_slug: str) -> Optional[str]:
     """Get the localized title of a book."""
-    url = f"https://gratis.bible/fr/dejer/{book_slug}/"
-    response = requests.get(url)
-    response.raise_for_status()
-
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = get_fetcher().get_soup(f"https://gratis.bible/fr/dejer/{book_slug}/")
     title_tag = soup.find('strong')
     return title_tag.text if title_tag else None
 
 def get_chapter_verses(book_slug: str, chapter_num: str) -> Dict[str, str]:
     """Get all verses for a given chapter."""
-    url = f"https://gratis.bible/fr/dejer/{book_slug}/{chapter_num}/"
-    response = requests.get(url)
-    response.raise_for_status()
+    soup = get_fetcher().get_soup(f"https://gratis.bible/fr/dejer/{book_slug}/{chapter_num}/")
+    with get_metrics().time_parse("gratis"):
+        return parse_chapter_verses(soup)
 
-    soup = BeautifulSoup(response.text, 'html.parser')
+def parse_chapter_verses(soup: BeautifulSoup) -> Dict[str, str]:
+    """Extract the verses from a parsed chapter page."""
     verses = {}
 
     # Find all verse spans
@@ -88,24 +72,35 @@ def scrape_bible():
     output_path = os.path.join('data', 'bible_fr.json')
     bible_data = load_existing_data(output_path)
 
+    # Chapter lists come from the shared index instead of each book's landing page
+    plan = build_plan(
+        "gratis",
+        books=bible_dictionary,
+        slugs={book_code: book_code.lower() for book_code in bible_dictionary},
+    )
+    pending = pending_tasks(plan, bible_data)
+    print_plan_summary("gratis", pending)
+    progress = Progress(len(pending))
+    book_plans = group_by_book(plan)
+
     for book_code in bible_dictionary:
         # Skip if book is already scraped
         if book_code in bible_data:
-            print(f"Skipping {book_code} (already scraped)...")
+            logger.info("Skipping %s (already scraped)...", book_code)
             continue
 
-        print(f"Scraping {book_code}...")
+        logger.info("Scraping %s...", book_code)
 
         # Get book title and chapters
         book_slug = book_code.lower()
         title = get_book_title(book_slug)
         if not title:
-            print(f"Warning: Could not find title for {book_code}")
+            logger.warning("Could not find title for %s", book_code)
             continue
 
-        chapters = get_book_chapters(book_slug)
+        chapters = [str(task.chapter) for task in book_plans.get(book_code, [])]
         if not chapters:
-            print(f"Warning: No chapters found for {book_code}")
+            logger.warning("No chapters found for %s", book_code)
             continue
 
         # Initialize book data
@@ -116,23 +111,28 @@ def scrape_bible():
 
         # Scrape each chapter
         for chapter_num in chapters:
-            print(f"  Scraping chapter {chapter_num}...")
+            logger.debug("Scraping %s %s...", book_code, chapter_num)
             verses = get_chapter_verses(book_slug, chapter_num)
             bible_data[book_code]["chapters"][chapter_num] = verses
+            progress.advance(failed=not verses)
 
             # Add a small delay to be nice to the server
             time.sleep(0.5)
 
         # Save progress after each book
         save_progress(output_path, bible_data)
-        print(f"Completed and saved {book_code}")
+        logger.info("Completed and saved %s", book_code)
 
+    progress.finish()
     return bible_data
 
 if __name__ == "__main__":
+    setup_logging("gratis")
     try:
         bible_data = scrape_bible()
-        print("Scraping completed successfully!")
+        logger.info("Scraping completed successfully!")
     except Exception as e:
-        print(f"An error occurred: {e}")
+        logger.exception("An error occurred: %s", e)
+    finally:
+        get_metrics().report("gratis")
 
@@ -1,12 +1,21 @@
 import os
 import re
 import json
+import logging
 import requests
 from bs4 import BeautifulSoup
 import html
 import time
 import argparse
 
+from bible_io import dump_json, load_bible_json
+from fetch import get_fetcher
+from metrics import get_metrics
+from progress import Progress, setup_logging
+from title_match import matcher_for
+
+logger = logging.getLogger("vatican_es")
+
 # transferred from https://github.com/LongbeardCreative/bible-scraper
 
 # Base URL for the Vatican website
@@ -118,26 +127,12 @@ ONE_PAGE_BOOKS = {
 }
 
 def get_html(url):
-    """Fetch the HTML content of a URL with retries and error handling."""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()  # Raise exception for 4XX/5XX responses
-            return response.text
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching {url}: {e}")
-            if attempt < max_retries - 1:
-                sleep_time = 2 ** attempt  # Exponential backoff
-                print(f"Retrying in {sleep_time} seconds...")
-                time.sleep(sleep_time)
-            else:
-                print(f"Failed to fetch {url} after {max_retries} attempts")
-                return None
+    """Fetch the HTML content of a URL; retries and backoff are handled by the shared fetcher."""
+    try:
+        return get_fetcher().get_text(url)
+    except requests.exceptions.RequestException as e:
+        logger.error("Failed to fetch %s: %s", url, e)
+        return None
 
 def extract_verses(html_content):
     """Extract verse numbers and text from the HTML content."""
@@ -210,8 +205,9 @@ def scrape_chapter(url):
     if not html_content:
         return None, None, None
 
-    book_name, chapter_number = extract_book_info(html_content)
-    verses = extract_verses(html_content)
+    with get_metrics().time_parse("vatican_es"):
+        book_name, chapter_number = extract_book_info(html_content)
+        verses = extract_verses(html_content)
 
     return book_name, chapter_number, verses
 
@@ -219,10 +215,9 @@ def load_existing_bible_data(file_path):
     """Load existing Bible data from a JSON file if it exists."""
     if os.path.exists(file_path):
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            print(f"Error loading {file_path}. Starting with empty data.")
+            return load_bible_json(file_path)
+        except ValueError:  # not JSON, or not a Bible (bible_schema.SchemaError)
+            logger.warning("Error loading %s. Starting with empty data.", file_path)
     return {}
 
 def scrape_bible(limit=None, existing_data=None, book_osis=None):
@@ -239,7 +234,7 @@ def scrape_bible(limit=None, existing_data=None, book_osis=None):
     # If a specific book is requested, check if it's a one-page book
     if book_osis:
         if book_osis in ONE_PAGE_BOOKS:
-            print(f"Processing single book: {book_osis}")
+            logger.info("Processing single book: %s", book_osis)
             book_info = ONE_PAGE_BOOKS[book_osis]
             url = BASE_URL + book_info["url"]
 
@@ -247,12 +242,11 @@ def scrape_bible(limit=None, existing_data=None, book_osis=None):
             book_name, chapter_number, verses = scrape_chapter(url)
 
             if not verses:
-                print(f"  Failed to extract verses for {book_osis}")
+                logger.warning("Failed to extract verses for %s", book_osis)
                 return bible_data
 
             # Print book and chapter information
-            print(f"  Scraping {book_info['title']} (OSIS: {book_osis})")
-            print(f"  Found {len(verses)} verses")
+            logger.info("Scraping %s (OSIS: %s) - found %d verses", book_info['title'], book_osis, len(verses))
 
             # Add the book if it doesn't exist
             if book_osis not in bible_data:
@@ -267,12 +261,12 @@ def scrape_bible(limit=None, existing_data=None, book_osis=None):
 
             return bible_data
         else:
-            print(f"Book {book_osis} is not a one-page book. Will search for it in the index.")
+            logger.info("Book %s is not a one-page book. Will search for it in the index.", book_osis)
 
     # First, get the index page
     index_html = get_html(BASE_URL + "_INDEX.HTM")
     if not index_html:
-        print("Failed to fetch the index page")
+        logger.error("Failed to fetch the index page")
         return bible_data
 
     soup = BeautifulSoup(index_html, 'html.parser')
@@ -288,6 +282,7 @@ def scrape_bible(limit=None, existing_data=None, book_osis=None):
 
     # Process each link
     total_links = len(chapter_links)
+    progress = Progress(len({link['href'] for link in chapter_links}))
     for i, link in enumerate(chapter_links):
         chapter_url = link['href']
 
@@ -301,35 +296,40 @@ def scrape_bible(limit=None, existing_data=None, book_osis=None):
 
         processed_chapters.add(chapter_url)
 
-        # Print progress
-        print(f"Processing {i+1}/{total_links}: {chapter_url}")
+        logger.debug("Processing %d/%d: %s", i + 1, total_links, chapter_url)
 
         # Scrape the chapter
         book_name, chapter_number, verses = scrape_chapter(BASE_URL + chapter_url)
 
         if not book_name or not chapter_number or not verses:
-            print(f"  Skipping {chapter_url} - could not extract data")
+            logger.warning("Skipping %s - could not extract data", chapter_url)
+            progress.advance(failed=True)
             continue
 
-        # Map Spanish book name to standardized OSIS abbreviation
+        # Map Spanish book name to standardized OSIS abbreviation (near misses are matched fuzzily)
         if book_name in BOOK_MAPPING:
             osis_abbr = BOOK_MAPPING[book_name]
         else:
-            print(f"  Unknown book name: {book_name}")
-            continue
+            match = matcher_for("vatican_es", BOOK_MAPPING).match(book_name)
+            if match is None:
+                logger.warning("Unknown book name: %s", book_name)
+                progress.advance(failed=True)
+                continue
+            osis_abbr = match.osis
 
         # If a specific book is requested, skip all other books
         if book_osis and osis_abbr != book_osis:
+            progress.advance(skipped=True)
             continue
 
         # Skip if this book is already in the existing data
         if existing_data and osis_abbr in existing_data:
-            print(f"  Skipping {osis_abbr} - already in existing data")
+            logger.debug("Skipping %s - already in existing data", osis_abbr)
+            progress.advance(skipped=True)
             continue
 
-        # Print book and chapter information
-        print(f"  Scraping {book_name} (OSIS: {osis_abbr}) - Chapter {chapter_number}")
-        print(f"  Found {len(verses)} verses")
+        logger.debug("Scraping %s (OSIS: %s) - Chapter %s: %d verses", book_name, osis_abbr, chapter_number, len(verses))
+        progress.advance()
 
         # Add the book if it doesn't exist
         if osis_abbr not in bible_data:
@@ -346,14 +346,15 @@ def scrape_bible(limit=None, existing_data=None, book_osis=None):
 
         # Check if we've reached the limit
         if limit and chapter_count >= limit:
-            print(f"Reached limit of {limit} chapters. Stopping.")
+            logger.info("Reached limit of %d chapters. Stopping.", limit)
             break
 
         # Be nice to the server
         time.sleep(0.5)
 
     # Handle missing books
-    print("Processing missing books...")
+    progress.finish()
+    logger.info("Processing missing books...")
     for osis_abbr, book_info in ONE_PAGE_BOOKS.items():
         # If a specific book is requested, skip all other books
         if book_osis and osis_abbr != book_osis:
@@ -361,22 +362,21 @@ def scrape_bible(limit=None, existing_data=None, book_osis=None):
 
         # Skip if this book is already in the existing data
         if existing_data and osis_abbr in existing_data:
-            print(f"  Skipping {osis_abbr} - already in existing data")
+            logger.info("Skipping %s - already in existing data", osis_abbr)
             continue
 
-        print(f"Processing missing book: {osis_abbr}")
+        logger.info("Processing missing book: %s", osis_abbr)
         url = BASE_URL + book_info["url"]
 
         # Scrape the chapter
         book_name, chapter_number, verses = scrape_chapter(url)
 
         if not verses:
-            print(f"  Failed to extract verses for {osis_abbr}")
+            logger.warning("Failed to extract verses for %s", osis_abbr)
             continue
 
         # Print book and chapter information
-        print(f"  Scraping {book_info['title']} (OSIS: {osis_abbr})")
-        print(f"  Found {len(verses)} verses")
+        logger.info("Scraping %s (OSIS: %s) - found %d verses", book_info['title'], osis_abbr, len(verses))
 
         # Add the book if it doesn't exist
         if osis_abbr not in bible_data:
@@ -402,34 +402,37 @@ def main():
     parser.add_argument('--output', type=str, default='data/bible_es.json', help='Output file path (default: data/bible_es.json)')
     parser.add_argument('--force', action='store_true', help='Force re-scraping of all books')
     parser.add_argument('--book', type=str, help='OSIS code of a single book to scrape (e.g., "Jude")')
+    parser.add_argument('--verbose', action='store_true', help='Log every chapter (debug level)')
     args = parser.parse_args()
 
+    setup_logging("vatican_es", level="DEBUG" if args.verbose else None)
+
     output_file = args.output
 
     # Ensure the output file is in the data directory
     if not output_file.startswith('data/'):
         output_file = f"data/{output_file}"
-        print(f"Output will be saved to {output_file}")
+        logger.info("Output will be saved to %s", output_file)
 
     # Load existing data if available and not forcing re-scrape
     existing_data = None
     if not args.force and os.path.exists(output_file):
-        print(f"Loading existing data from {output_file}")
+        logger.info("Loading existing data from %s", output_file)
         existing_data = load_existing_bible_data(output_file)
-        print(f"Loaded {len(existing_data)} books from existing data")
+        logger.info("Loaded %d books from existing data", len(existing_data))
 
-    print("Starting to scrape the Spanish Bible...")
+    logger.info("Starting to scrape the Spanish Bible...")
     bible_data = scrape_bible(limit=args.limit, existing_data=existing_data, book_osis=args.book)
 
     if bible_data:
         # Ensure the data directory exists
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
 
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(bible_data, f, ensure_ascii=False, indent=2)
+        with get_metrics().time_checkpoint("vatican_es"):
+            dump_json(bible_data, output_file)
 
-        print(f"Bible data saved to {output_file}")
-        print(f"Total books: {len(bible_data)}")
+        logger.info("Bible data saved to %s", output_file)
+        logger.info("Total books: %d", len(bible_data))
 
         # Count the total number of chapters and verses
         total_chapters = 0
@@ -439,10 +442,12 @@ def main():
             for chapter in book["chapters"].values():
                 total_verses += len(chapter)
 
-        print(f"Total chapters: {total_chapters}")
-        print(f"Total verses: {total_verses}")
+        logger.info("Total chapters: %d", total_chapters)
+        logger.info("Total verses: %d", total_verses)
     else:
-        print("Failed to scrape Bible data")
+        logger.error("Failed to scrape Bible data")
+
+    get_metrics().report("vatican_es")
 
 if __name__ == "__main__":
     main()
@@ -1,13 +1,18 @@
 import requests
 from bs4 import BeautifulSoup
-import json
+import logging
 import os
 from typing import List, Dict, Optional
 from urllib.parse import urljoin
 import time
 import re
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+from bible_io import dump_json, load_bible_json
+from fetch import Fetcher
+from metrics import get_metrics
+from progress import Progress, setup_logging
+
+logger = logging.getLogger("vatican_it")
 
 # Map of Italian titles to OSIS codes
 OSIS_CODES = {
@@ -86,20 +91,54 @@ OSIS_CODES = {
     "Apocalisse": "Rev"
 }
 
+def extract_verses(soup: Optional[BeautifulSoup]) -> Dict[str, str]:
+    """Extract verses from a chapter page, where each verse is preceded by a [N] marker."""
+    if not soup:
+        return {}
+
+    verses = {}
+
+    # Find the main content area
+    content = soup.find('body')
+    if not content:
+        return {}
+
+    # Get all text nodes
+    text = content.get_text()
+
+    # Split by verse markers
+    verse_parts = re.split(r'\[(\d+)\]', text)
+
+    # Process each verse
+    for i in range(1, len(verse_parts), 2):
+        verse_num = verse_parts[i]
+        verse_text = verse_parts[i + 1].strip()
+
+        # Clean up the verse text
+        verse_text = re.sub(r'\s+', ' ', verse_text)  # Normalize whitespace
+        verse_text = verse_text.replace('&quot;', '"')
+        verse_text = verse_text.replace('&agrave;', 'à')
+        verse_text = verse_text.replace('&egrave;', 'è')
+        verse_text = verse_text.replace('&igrave;', 'ì')
+        verse_text = verse_text.replace('&ograve;', 'ò')
+        verse_text = verse_text.replace('&ugrave;', 'ù')
+        verse_text = verse_text.replace('&eacute;', 'é')
+
+        # Remove any trailing navigation or copyright text
+        verse_text = re.sub(r'\s*Precedente.*$', '', verse_text)
+        verse_text = re.sub(r'\s*Copyright.*$', '', verse_text)
+
+        verses[verse_num] = verse_text.strip()
+
+    return verses
+
 class VaticanBibleScraper:
     def __init__(self, base_url: str):
         self.base_url = base_url
-        self.session = requests.Session()
-
-        # Configure retry strategy
-        retry_strategy = Retry(
-            total=5,  # number of retries
-            backoff_factor=1,  # wait 1, 2, 4, 8, 16 seconds between retries
-            status_forcelist=[429, 500, 502, 503, 504],  # status codes to retry on
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
+        # Vatican pages are slow to answer under load, so allow more retries
+        # (backoff 1, 2, 4, 8, 16 seconds) than the shared default
+        self.fetcher = Fetcher(retries=5)
+        self.metrics = get_metrics()
 
         # Load existing output if it exists
         self.output_file = "data/vatican_it.json"
@@ -107,24 +146,22 @@ class VaticanBibleScraper:
 
     def load_output(self) -> Dict:
         if os.path.exists(self.output_file):
-            with open(self.output_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return load_bible_json(self.output_file)
         return {}
 
     def save_output(self):
         # Ensure directory exists
         os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            json.dump(self.output, f, ensure_ascii=False, indent=2)
+        with self.metrics.time_checkpoint("vatican_it"):
+            dump_json(self.output, self.output_file)
 
     def get_soup(self, url: str) -> Optional[BeautifulSoup]:
         try:
-            print(f"  Fetching {url}")
-            response = self.session.get(url)
-            response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
+            logger.debug("Fetching %s", url)
+            # Parse the raw bytes so BeautifulSoup picks up the page's declared charset
+            return BeautifulSoup(self.fetcher.get_content(url), 'html.parser')
         except requests.exceptions.RequestException as e:
-            print(f"  Error fetching {url}: {str(e)}")
+            logger.error("Error fetching %s: %s", url, e)
             return None
 
     def extract_books_and_chapters(self) -> Dict[str, Dict]:
@@ -156,64 +193,32 @@ class VaticanBibleScraper:
                         if chapter_num.isdigit():
                             current_book['chapters'][chapter_num] = link['href']
 
-                print(f"Found {len(current_book['chapters'])} chapters for {book_title}")
+                logger.debug("Found %d chapters for %s", len(current_book['chapters']), book_title)
 
         return books
 
     def extract_verses(self, soup: BeautifulSoup) -> Dict[str, str]:
-        if not soup:
-            return {}
-
-        verses = {}
-
-        # Find the main content area
-        content = soup.find('body')
-        if not content:
-            return {}
-
-        # Get all text nodes
-        text = content.get_text()
-
-        # Split by verse markers
-        verse_parts = re.split(r'\[(\d+)\]', text)
-
-        # Process each verse
-        for i in range(1, len(verse_parts), 2):
-            verse_num = verse_parts[i]
-            verse_text = verse_parts[i + 1].strip()
-
-            # Clean up the verse text
-            verse_text = re.sub(r'\s+', ' ', verse_text)  # Normalize whitespace
-            verse_text = verse_text.replace('&quot;', '"')
-            verse_text = verse_text.replace('&agrave;', 'à')
-            verse_text = verse_text.replace('&egrave;', 'è')
-            verse_text = verse_text.replace('&igrave;', 'ì')
-            verse_text = verse_text.replace('&ograve;', 'ò')
-            verse_text = verse_text.replace('&ugrave;', 'ù')
-            verse_text = verse_text.replace('&eacute;', 'é')
-
-            # Remove any trailing navigation or copyright text
-            verse_text = re.sub(r'\s*Precedente.*$', '', verse_text)
-            verse_text = re.sub(r'\s*Copyright.*$', '', verse_text)
-
-            verses[verse_num] = verse_text.strip()
-
-        return verses
+        return extract_verses(soup)
 
     def scrape_chapter_content(self, chapter_url: str) -> Dict[str, str]:
         soup = self.get_soup(urljoin(self.base_url, chapter_url))
-        verses = self.extract_verses(soup)
-        print(f"    Found {len(verses)} verses")
+        with self.metrics.time_parse("vatican_it"):
+            verses = self.extract_verses(soup)
+        logger.debug("Found %d verses", len(verses))
         time.sleep(2)  # Increased delay between requests
         return verses
 
     def scrape_all(self):
         books = self.extract_books_and_chapters()
-        print(f"Found {len(books)} books")
-        print()
+        logger.info("Found %d books", len(books))
+        pending = sum(
+            1 for osis, book in books.items() for chapter_num in book['chapters']
+            if chapter_num not in self.output.get(osis, {}).get('chapters', {})
+        )
+        progress = Progress(pending)
 
         for osis, book in books.items():
-            print(f"Scraping {book['title']}...")
+            logger.info("Scraping %s...", book['title'])
 
             # Initialize or get existing book data
             if osis not in self.output:
@@ -225,22 +230,24 @@ class VaticanBibleScraper:
             for chapter_num, chapter_url in book['chapters'].items():
                 # Skip if we already have this chapter
                 if chapter_num in self.output[osis]['chapters']:
-                    print(f"  Chapter {chapter_num} (already scraped)")
+                    logger.debug("Chapter %s (already scraped)", chapter_num)
                     continue
 
-                print(f"  Chapter {chapter_num}")
+                logger.debug("Chapter %s", chapter_num)
                 verses = self.scrape_chapter_content(chapter_url)
+                progress.advance(failed=not verses)
                 if verses:
                     self.output[osis]['chapters'][chapter_num] = verses
                     # Save progress after each chapter
                     self.save_output()
 
-            print()
-
         # Final save
         self.save_output()
+        progress.finish()
+        self.metrics.report("vatican_it")
 
 def main():
+    setup_logging("vatican_it")
     base_url = "https://www.vatican.va/archive/ITA0001/_INDEX.HTM"
     scraper = VaticanBibleScraper(base_url)
     scraper.scrape_all()
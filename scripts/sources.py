@@ -0,0 +1,150 @@
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+from crawl_plan import SOURCES as PLAN_SOURCES, CrawlTask, build_plan, load_index
+
+# Registry of the plan-driven scrapers for code that runs them generically
+# (the crawl work queue, the load test): for every source, how to build its
+# crawl plan, how to turn one fetched chapter page into {verse: text} and what
+# each book is called in its language. Scraper modules are imported on first
+# use, so a worker only loads the source it is actually crawling.
+#
+# The Vatican scrapers discover their pages from an index page instead of a
+# plan and are not part of the registry.
+
+SOURCES = {
+    "biblegateway": {"plan": "biblegateway", "translation": "NRSVCE", "encoding": "utf-8"},
+    "bibliacatolica": {"plan": "bibliacatolica", "translation": "biblia-ave-maria", "encoding": "utf-8"},
+    "bibliacatolica_fr": {"plan": "bibliacatolica", "translation": "biblia-ave-maria-vs-biblia-de-jerusalem",
+                          "encoding": "utf-8"},
+    "gratis": {"plan": "gratis", "translation": "dejer", "encoding": None},
+    "german": {"plan": "german", "translation": "eu", "encoding": None},
+    "stepbible": {"plan": "stepbible", "translation": "FreCrampon", "encoding": None},
+}
+
+
+def _bibliacatolica_module(source: str):
+    if source == "bibliacatolica":
+        import scrape_bibliacatolica
+        return scrape_bibliacatolica
+    import scrape_bibliacatolica_fr
+    return scrape_bibliacatolica_fr
+
+
+def source_plan(source: str, translation: Optional[str] = None, books: Optional[List[str]] = None,
+                use_cache: bool = True) -> List[CrawlTask]:
+    """
+    Build a source's crawl plan with the books and slugs its scraper uses.
+
+    Args:
+        source: Key of SOURCES.
+        translation: Version/edition (defaults to the source's).
+        books: OSIS codes to restrict the plan to (defaults to every book the scraper covers).
+        use_cache: Passed on to build_plan.
+
+    Returns:
+        List[CrawlTask]: One task per chapter page, in crawl order.
+    """
+    spec = SOURCES[source]
+    translation = translation or spec["translation"]
+
+    if source == "biblegateway":
+        scraper_books, slugs = None, {}
+    elif source in ("bibliacatolica", "bibliacatolica_fr"):
+        module = _bibliacatolica_module(source)
+        scraper_books = list(module.bible_dictionary)
+        slugs = {osis: book["slug"] for osis, book in module.bible_dictionary.items()}
+    elif source == "gratis":
+        import scrape_gratis
+        scraper_books = list(scrape_gratis.bible_dictionary)
+        slugs = {osis: osis.lower() for osis in scrape_gratis.bible_dictionary}
+    elif source == "german":
+        import scrape_german
+        codes = {osis: code for code, osis in scrape_german.OSIS_MAP.items()}
+        scraper_books = list(codes)
+        slugs = {osis: scrape_german.URL_MAP.get(code, code.lower()) for osis, code in codes.items()}
+    elif source == "stepbible":
+        scraper_books, slugs = ["Esth"], {"Esth": "Est"}
+    else:
+        raise ValueError(f"Unknown source: {source}")
+
+    if books is not None:
+        scraper_books = [osis for osis in (scraper_books or books) if osis in books]
+    return build_plan(spec["plan"], translation=translation, books=scraper_books, slugs=slugs,
+                      use_cache=use_cache)
+
+
+def parse_page(source: str, page: str, osis: str, chapter: int, translation: Optional[str] = None) -> Dict[str, str]:
+    """
+    Parse one fetched chapter page with the source's own parser.
+
+    Args:
+        source: Key of SOURCES.
+        page: Page text as fetched.
+        osis: OSIS code of the book the page belongs to.
+        chapter: Chapter number of the page.
+        translation: Version requested (BibleGateway pages are split by version).
+
+    Returns:
+        Dict[str, str]: Verse number (as a string) to verse text; empty if nothing was found.
+    """
+    if source == "biblegateway":
+        import scrape_biblegateway
+        translation = translation or SOURCES[source]["translation"]
+        soup = BeautifulSoup(page, "html.parser")
+        verses = {}
+        for container in scrape_biblegateway.split_versions(soup, [translation])[translation]:
+            chapters, _ = scrape_biblegateway.extract_passage(container)
+            verses.update(chapters.get((osis, str(chapter)), {}))
+        return verses
+    if source in ("bibliacatolica", "bibliacatolica_fr"):
+        return _bibliacatolica_module(source).parse_chapter(BeautifulSoup(page, "html.parser")) or {}
+    if source == "gratis":
+        import scrape_gratis
+        return scrape_gratis.parse_chapter_verses(BeautifulSoup(page, "html.parser"))
+    if source == "german":
+        import scrape_german
+        codes = {book_osis: code for code, book_osis in scrape_german.OSIS_MAP.items()}
+        verses = scrape_german.parse_chapter_text(page, codes.get(osis, osis), chapter)
+        return {str(verse): text for verse, text in verses.items()}
+    if source == "stepbible":
+        import scrape_esther_fr
+        return scrape_esther_fr.parse_chapter(page)
+    raise ValueError(f"Unknown source: {source}")
+
+
+def book_titles(source: str, books: List[str]) -> Dict[str, str]:
+    """
+    Localized book titles as the source's scraper would write them.
+
+    Titles that have to be read from the site (gratis, german) cost one request
+    per book or one for the table of contents. Books the source has no title
+    for fall back to the BibleGateway display name.
+    """
+    titles = {book["osis"]: book["display"] for book in load_index() if book["osis"] in books}
+
+    if source in ("bibliacatolica", "bibliacatolica_fr"):
+        module = _bibliacatolica_module(source)
+        titles.update({osis: book["name"] for osis, book in module.bible_dictionary.items() if osis in books})
+    elif source == "gratis":
+        import scrape_gratis
+        for osis in books:
+            title = scrape_gratis.get_book_title(osis.lower())
+            if title:
+                titles[osis] = title
+    elif source == "german":
+        import scrape_german
+        for code, (title, _) in scrape_german.get_table_of_contents().items():
+            osis = scrape_german.OSIS_MAP[code]
+            if osis in books:
+                titles[osis] = title
+    elif source == "stepbible":
+        titles.update({"Esth": "Esther"} if "Esth" in books else {})
+
+    return titles
+
+
+def plan_delay(source: str) -> float:
+    """The politeness delay between requests to a source's host."""
+    return PLAN_SOURCES[SOURCES[source]["plan"]]["delay"]
@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from crawl_plan import CACHE_DIR
+from passage_refs import book_aliases, normalize, short_forms
+
+# Maps book titles scraped from a site to OSIS codes when they are not exactly
+# the ones a scraper's table expects, so that a site changing an accent, a
+# space or a word in a title costs a log line instead of a whole book.
+#
+# Titles are compared after normalization (case, accents, spacing and
+# punctuation are ignored, "ö" also matches "oe"). Anything still unknown is
+# looked up by trigram overlap among the source's own titles and every name
+# passage_refs knows, and the closest candidates are scored by edit distance.
+# A match has to be close (MIN_SCORE) and strictly closer than the best
+# candidate for any other book, so "Marco" still finds "Marcos" rather than
+# "Mateo" but "1Kor"/"1Kon" stay unmatched.
+#
+# Fuzzy matches are remembered per source in data/.cache/titles_<source>.json
+# so that later runs map the same title the same way without searching, and
+# the file shows at a glance what was guessed.
+
+logger = logging.getLogger("title_match")
+
+MIN_SCORE = 0.8
+
+# Candidates (by trigram overlap) scored by edit distance per lookup
+CANDIDATES = 8
+
+class TitleMatch(NamedTuple):
+    osis: str
+    name: str  # the known title it matched
+    score: float  # 1.0 for an exact match after normalization
+
+
+def _trigrams(text: str) -> List[str]:
+    padded = f"  {text} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance between two strings."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+class TitleMatcher:
+    """Fuzzy lookup of book titles against a table of known names."""
+
+    def __init__(self, names: Dict[str, str], source: Optional[str] = None, min_score: float = MIN_SCORE):
+        """
+        Args:
+            names: Known title (in any spelling) -> OSIS code. Titles that
+                normalize to the same text for different books are dropped.
+            source: Name of the cache file to remember fuzzy matches in
+                (None keeps them in memory only).
+            min_score: Lowest similarity (0-1) accepted as a match.
+        """
+        self.min_score = min_score
+        self.names: Dict[str, str] = {}
+        self.osis: Dict[str, str] = {}
+        conflicts = set()
+        for name, osis in names.items():
+            key = normalize(name)
+            if not key or key in conflicts:
+                continue
+            if key in self.osis and self.osis[key] != osis:
+                conflicts.add(key)
+                del self.osis[key]
+                continue
+            self.osis[key] = osis
+            self.names.setdefault(key, name)
+
+        self.index: Dict[str, List[str]] = {}
+        for key in self.osis:
+            for trigram in set(_trigrams(key)):
+                self.index.setdefault(trigram, []).append(key)
+
+        self.cache_path = os.path.join(CACHE_DIR, f"titles_{source}.json") if source else None
+        self.cache: Dict[str, List] = {}
+        if self.cache_path and os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    self.cache = json.load(f)
+            except json.JSONDecodeError:
+                logger.warning("Ignoring unreadable title cache %s", self.cache_path)
+
+    def _search(self, keys: List[str]) -> Optional[TitleMatch]:
+        counts: Dict[str, int] = {}
+        for key in keys:
+            for trigram in set(_trigrams(key)):
+                for candidate in self.index.get(trigram, ()):
+                    counts[candidate] = counts.get(candidate, 0) + 1
+        shortlist = sorted(counts, key=counts.get, reverse=True)[:CANDIDATES]
+
+        # Closest spelling of every book on the shortlist, as (distance, match)
+        best: Dict[str, Tuple[int, TitleMatch]] = {}
+        for candidate in shortlist:
+            osis = self.osis[candidate]
+            for key in keys:
+                distance = edit_distance(key, candidate)
+                score = 1 - distance / max(len(key), len(candidate))
+                if osis not in best or score > best[osis][1].score:
+                    best[osis] = (distance, TitleMatch(osis, self.names[candidate], round(score, 3)))
+        ranked = sorted(best.values(), key=lambda entry: (-entry[1].score, entry[0]))
+        if not ranked or ranked[0][1].score < self.min_score:
+            return None
+        if len(ranked) > 1 and min(distance for distance, _ in ranked[1:]) <= ranked[0][0]:
+            return None
+        return ranked[0][1]
+
+    def match(self, title: str) -> Optional[TitleMatch]:
+        """
+        The book a scraped title most likely names, or None if no known title is
+        close enough (or another book is as close).
+        """
+        key = normalize(title)
+        if key in self.osis:
+            return TitleMatch(self.osis[key], self.names[key], 1.0)
+
+        cached = self.cache.get(title)
+        if cached:
+            return TitleMatch(*cached)
+
+        # The title without filler words ("Carta a los ...") may be a known short name
+        keys = [key for key in dict.fromkeys([key] + short_forms(title)) if key]
+        exact = [key for key in keys if key in self.osis]
+        if exact:
+            match = TitleMatch(self.osis[exact[0]], self.names[exact[0]], 1.0)
+        else:
+            match = self._search(keys)
+        if match is None:
+            return None
+        logger.warning("Unknown book title %r matched to %s (%r, score %.2f)",
+                       title, match.osis, match.name, match.score)
+        self.cache[title] = list(match)
+        self._save()
+        return match
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump(self.cache, f, ensure_ascii=False, indent=2)
+
+
+_matchers: Dict[str, TitleMatcher] = {}
+
+
+def matcher_for(source: str, names: Dict[str, str]) -> TitleMatcher:
+    """
+    The process-wide matcher of a source: its own title table (`names`, which
+    wins over any other spelling) plus every name passage_refs knows.
+    """
+    if source not in _matchers:
+        own = {normalize(name) for name in names}
+        known = {alias: osis for alias, osis in book_aliases().items() if alias not in own}
+        known.update(names)
+        _matchers[source] = TitleMatcher(known, source)
+    return _matchers[source]
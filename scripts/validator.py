@@ -1,8 +1,10 @@
-import json
 import os
 from pathlib import Path
 from typing import Dict, List, Optional, Set
 
+from bible_schema import book_errors
+from bible_stream import read_outline
+
 # Master book list with OSIS codes and English names
 MASTER_BOOKS = {
     "Gen": "Genesis",
@@ -81,32 +83,8 @@ MASTER_BOOKS = {
 }
 
 def validate_book_structure(book_data: Dict) -> List[str]:
-    """Validate the structure of a single book."""
-    errors = []
-
-    # Check required fields
-    if "title" not in book_data:
-        errors.append("Missing 'title' field")
-    if "chapters" not in book_data:
-        errors.append("Missing 'chapters' field")
-        return errors
-
-    # Validate chapters structure
-    chapters = book_data["chapters"]
-    if not isinstance(chapters, dict):
-        errors.append("'chapters' must be an object")
-        return errors
-
-    for chapter_num, chapter_data in chapters.items():
-        if not isinstance(chapter_data, dict):
-            errors.append(f"Chapter {chapter_num} must be an object")
-            continue
-
-        for verse_num, verse_text in chapter_data.items():
-            if not isinstance(verse_text, str):
-                errors.append(f"Verse {chapter_num}:{verse_num} must be a string")
-
-    return errors
+    """Validate the structure of a single book (see bible_schema.book_errors)."""
+    return book_errors(book_data)
 
 def compare_verses(master_data: Dict, test_data: Dict) -> Dict[str, Dict[str, Set[int]]]:
     """Compare verse counts between master and test data."""
@@ -183,7 +161,7 @@ def get_available_bibles() -> List[str]:
     if not data_dir.exists():
         return []
 
-    return sorted([f.name for f in data_dir.glob("*.json")])
+    return sorted(f.name for pattern in ("*.json", "*.json.gz", "*.json.zst") for f in data_dir.glob(pattern))
 
 def select_file(files: List[str]) -> Optional[str]:
     """Simple interactive file selection."""
@@ -220,10 +198,10 @@ def main():
 
     file_path = Path(__file__).parent.parent / "data" / selected_file
 
+    # Only the structure is needed, so the verse text is never held in memory
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except json.JSONDecodeError as e:
+        data = read_outline(str(file_path))
+    except ValueError as e:
         print(f"Error: Invalid JSON file - {str(e)}")
         return
     except Exception as e:
@@ -255,8 +233,7 @@ def main():
     master_path = Path(__file__).parent.parent / "data" / "bible_master.json"
     if master_path.exists():
         try:
-            with open(master_path, 'r', encoding='utf-8') as f:
-                master_data = json.load(f)
+            master_data = read_outline(str(master_path))
 
             # Compare counts
             count_differences = compare_counts(master_data, data)
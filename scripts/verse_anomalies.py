@@ -0,0 +1,302 @@
+import argparse
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from bible_io import load_bible_json
+from bible_shards import load_bible
+
+# Screens a scraped Bible for verses that look like parse bugs: empty or
+# merged verses, half-missing text, leftover markers such as "[16b]" or
+# "(1:11)", empty "()" parentheses, stray HTML. Every verse is turned into a
+# row of NumPy features, compared against its book's distribution and (when a
+# master file is available) against the same verse in the master, and ranked
+# in one vectorized pass. Regexes are only run on the top-ranked verses to
+# explain why they were flagged.
+
+# Single characters counted for every verse, with the weight of each hit
+CHAR_WEIGHTS = {
+    "[": 2.0,
+    "]": 2.0,
+    "<": 3.0,
+    ">": 3.0,
+    "&": 1.0,
+    "*": 1.0,
+}
+
+# Character pairs/triples, e.g. the empty "()" left behind by bibliacatolica footnotes
+EMPTY_PARENS_WEIGHT = 4.0
+DOUBLE_SPACE_WEIGHT = 1.0
+# "1:11"-style references, as left in the French text before fix_bible_fr.py
+VERSE_REFERENCE_WEIGHT = 3.0
+
+# Patterns used to label flagged verses (see the cleanup scripts for where each comes from)
+REASON_PATTERNS = {
+    "empty parentheses": re.compile(r"\(\s*\)"),
+    "bracketed verse marker": re.compile(r"\[\d+[a-z]?\]"),
+    "parenthetical verse reference": re.compile(r"\(\d+:\d+\)"),
+    "leading verse number": re.compile(r"^\s*\d+\s"),
+    "html remnant": re.compile(r"<[^>]+>|&[a-z]+;"),
+    "repeated whitespace": re.compile(r"\s{2,}"),
+}
+
+Z_CLIP = 8.0
+
+# Floors for the spread estimates (log length, digit count, log length ratio)
+MIN_LENGTH_MAD = 0.1
+MIN_DIGIT_MAD = 1.0
+MIN_RATIO_MAD = 0.1
+
+
+def flatten_bible(bible_data: Dict) -> Dict[str, np.ndarray]:
+    """Turn {osis: {title, chapters}} into parallel arrays of book, chapter, verse and text."""
+    books, chapters, verses, texts = [], [], [], []
+    for osis, book in bible_data.items():
+        for chapter_num, chapter in book.get("chapters", {}).items():
+            for verse_num, verse_text in chapter.items():
+                books.append(osis)
+                chapters.append(chapter_num)
+                verses.append(verse_num)
+                texts.append(verse_text.strip() if isinstance(verse_text, str) else "")
+
+    string_dtype = np.dtypes.StringDType()
+    return {
+        "book": np.array(books, dtype=string_dtype),
+        "chapter": np.array(chapters, dtype=string_dtype),
+        "verse": np.array(verses, dtype=string_dtype),
+        "text": np.array(texts, dtype=string_dtype),
+    }
+
+
+def _segment_sums(mask: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Sum a per-character mask over each verse's [start, end) slice."""
+    cumulative = np.concatenate(([0], np.cumsum(mask, dtype=np.int64)))
+    return cumulative[ends] - cumulative[starts]
+
+
+def compute_features(text: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Per-verse lengths, character-class counts and token hits.
+
+    All verses are laid out as one array of code points, so each feature is a
+    handful of array comparisons plus a cumulative sum rather than a Python loop.
+    """
+    lengths = np.strings.str_len(text).astype(np.int64)
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    codes = np.frombuffer("".join(text.tolist()).encode("utf-32-le"), dtype=np.uint32)
+
+    digit_mask = (codes >= ord("0")) & (codes <= ord("9"))
+    token_score = np.zeros(len(lengths), dtype=np.float64)
+    for char, weight in CHAR_WEIGHTS.items():
+        token_score += weight * _segment_sums(codes == ord(char), starts, ends)
+
+    # Pairs are attributed to the verse of their first character; pairs that
+    # straddle two verses are masked out
+    follows = np.ones(len(codes), dtype=bool)
+    follows[starts[lengths > 0]] = False
+    next_follows = np.append(follows[1:], False)
+    open_paren, close_paren, space = codes == ord("("), codes == ord(")"), codes == ord(" ")
+    empty_parens = np.zeros(len(codes), dtype=bool)
+    empty_parens[:-1] = open_paren[:-1] & close_paren[1:] & next_follows[:-1]
+    spaced_parens = np.zeros(len(codes), dtype=bool)
+    spaced_parens[:-2] = open_paren[:-2] & space[1:-1] & close_paren[2:] & next_follows[:-2] & next_follows[1:-1]
+    double_space = np.zeros(len(codes), dtype=bool)
+    double_space[:-1] = space[:-1] & space[1:] & next_follows[:-1]
+    verse_reference = np.zeros(len(codes), dtype=bool)
+    verse_reference[:-2] = (digit_mask[:-2] & (codes[1:-1] == ord(":")) & digit_mask[2:]
+                            & next_follows[:-2] & next_follows[1:-1])
+
+    token_score += EMPTY_PARENS_WEIGHT * _segment_sums(empty_parens | spaced_parens, starts, ends)
+    token_score += DOUBLE_SPACE_WEIGHT * _segment_sums(double_space, starts, ends)
+    token_score += VERSE_REFERENCE_WEIGHT * _segment_sums(verse_reference, starts, ends)
+
+    leading_digit = np.zeros(len(lengths), dtype=bool)
+    non_empty = lengths > 0
+    leading_digit[non_empty] = digit_mask[starts[non_empty]]
+
+    return {
+        "length": lengths.astype(np.float64),
+        "digits": _segment_sums(digit_mask, starts, ends).astype(np.float64),
+        "leading_digit": leading_digit,
+        "token_score": token_score,
+    }
+
+
+def robust_z(values: np.ndarray, groups: np.ndarray, min_mad: float) -> np.ndarray:
+    """Median/MAD z-scores of values within each group; min_mad keeps near-constant groups from exploding."""
+    z = np.zeros(len(values), dtype=np.float64)
+    group_ids, inverse = np.unique(groups, return_inverse=True)
+    for group_index in range(len(group_ids)):
+        mask = inverse == group_index
+        group_values = values[mask]
+        median = np.median(group_values)
+        mad = max(np.median(np.abs(group_values - median)) * 1.4826, min_mad)
+        z[mask] = (group_values - median) / mad
+    return np.clip(z, -Z_CLIP, Z_CLIP)
+
+
+def verse_keys(arrays: Dict[str, np.ndarray]) -> np.ndarray:
+    """Join book, chapter and verse into "Gen.1.1" style keys."""
+    dotted_book = np.strings.add(arrays["book"], ".")
+    dotted_chapter = np.strings.add(arrays["chapter"], ".")
+    return np.strings.add(np.strings.add(dotted_book, dotted_chapter), arrays["verse"])
+
+
+def master_ratio_z(arrays: Dict[str, np.ndarray], lengths: np.ndarray,
+                   master_arrays: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Compare each verse's length with the same verse in the master.
+
+    Lengths are compared as log ratios, centred on the translation's overall
+    ratio (a French Bible is simply longer than an English one), so merged
+    verses stand out as large positive scores and truncated ones as negative.
+    """
+    keys = verse_keys(arrays)
+    master_keys = verse_keys(master_arrays)
+    master_lengths = np.strings.str_len(master_arrays["text"]).astype(np.float64)
+
+    z = np.zeros(len(keys), dtype=np.float64)
+    if len(master_keys) == 0:
+        return z
+
+    order = np.argsort(master_keys)
+    sorted_keys = master_keys[order]
+    positions = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    matched = sorted_keys[positions] == keys
+
+    reference = master_lengths[order][positions]
+    usable = matched & (reference > 0)
+    if not usable.any():
+        return z
+    log_ratio = np.log1p(lengths[usable]) - np.log1p(reference[usable])
+    median = np.median(log_ratio)
+    mad = max(np.median(np.abs(log_ratio - median)) * 1.4826, MIN_RATIO_MAD)
+    z[usable] = (log_ratio - median) / mad
+    return np.clip(z, -Z_CLIP, Z_CLIP)
+
+
+def score_verses(bible_data: Dict, master_data: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+    """
+    Score every verse; higher scores are more suspicious.
+
+    Returns the flattened arrays plus "score" and the individual components.
+    """
+    arrays = flatten_bible(bible_data)
+    features = compute_features(arrays["text"])
+    lengths = features["length"]
+
+    length_z = robust_z(np.log1p(lengths), arrays["book"], MIN_LENGTH_MAD)
+    digit_z = robust_z(features["digits"], arrays["book"], MIN_DIGIT_MAD)
+    master_z = master_ratio_z(arrays, lengths, flatten_bible(master_data)) if master_data else np.zeros(len(lengths))
+
+    score = (
+        np.abs(length_z) * 0.5
+        + np.maximum(digit_z, 0) * 0.5
+        + np.abs(master_z)
+        + features["token_score"]
+        + features["leading_digit"] * 3.0
+        + (lengths == 0) * 10.0
+    )
+
+    arrays.update(features)
+    arrays.update({"length_z": length_z, "digit_z": digit_z, "master_z": master_z, "score": score})
+    return arrays
+
+
+def explain(text: str, length: float, length_z: float, master_z: float) -> List[str]:
+    """Human-readable reasons for a flagged verse."""
+    reasons = [name for name, pattern in REASON_PATTERNS.items() if pattern.search(text)]
+    if length == 0:
+        reasons.append("empty verse")
+    if master_z >= 3:
+        reasons.append("much longer than master (merged verse?)")
+    elif master_z <= -3:
+        reasons.append("much shorter than master (truncated verse?)")
+    elif abs(length_z) >= 3:
+        reasons.append("unusual length for this book")
+    return reasons
+
+
+def rank_anomalies(scored: Dict[str, np.ndarray], top: int = 50, min_score: float = 3.0) -> List[Dict]:
+    """Return the highest scoring verses as records, most suspicious first."""
+    order = np.argsort(-scored["score"], kind="stable")[:top]
+    records = []
+    for i in order:
+        if scored["score"][i] < min_score:
+            break
+        text = str(scored["text"][i])
+        records.append({
+            "book": str(scored["book"][i]),
+            "chapter": str(scored["chapter"][i]),
+            "verse": str(scored["verse"][i]),
+            "score": round(float(scored["score"][i]), 2),
+            "reasons": explain(text, scored["length"][i], scored["length_z"][i], scored["master_z"][i]),
+            "text": text,
+        })
+    return records
+
+
+def rank_chapters(scored: Dict[str, np.ndarray], top: int = 20, min_score: float = 3.0) -> List[Dict]:
+    """Rank chapters by how many suspicious verses they contain."""
+    flagged = scored["score"] >= min_score
+    if not flagged.any():
+        return []
+
+    chapter_keys = np.strings.add(np.strings.add(scored["book"][flagged], " "), scored["chapter"][flagged])
+    keys, inverse = np.unique(chapter_keys, return_inverse=True)
+    counts = np.bincount(inverse)
+    totals = np.bincount(inverse, weights=scored["score"][flagged])
+    order = np.lexsort((-totals, -counts))[:top]
+    return [
+        {"chapter": str(keys[i]), "flagged_verses": int(counts[i]), "total_score": round(float(totals[i]), 2)}
+        for i in order
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rank suspicious verses in a scraped Bible JSON file.')
+    parser.add_argument('input', type=str, help='Bible JSON file or shard directory to screen')
+    parser.add_argument('--master', type=str, default=None,
+                        help='Master Bible to compare verse lengths with (default: data/bible_master.json if present)')
+    parser.add_argument('--top', type=int, default=50, help='Number of verses to report (default: 50)')
+    parser.add_argument('--min-score', type=float, default=3.0, help='Minimum score to report (default: 3.0)')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    bible_data = load_bible(args.input)
+
+    master_path = Path(args.master) if args.master else Path(__file__).parent.parent / "data" / "bible_master.json"
+    master_data = None
+    if master_path.exists() and master_path.resolve() != Path(args.input).resolve():
+        master_data = load_bible_json(str(master_path))
+
+    scored = score_verses(bible_data, master_data)
+    verses = rank_anomalies(scored, args.top, args.min_score)
+    chapters = rank_chapters(scored, min_score=args.min_score)
+
+    if args.json:
+        print(json.dumps({"verses": verses, "chapters": chapters}, ensure_ascii=False, indent=2))
+        return
+
+    print(f"Screened {len(scored['score'])} verses" + (f" against {master_path.name}" if master_data else ""))
+    if not verses:
+        print("No suspicious verses found.")
+        return
+
+    print("\nMost suspicious chapters:")
+    for chapter in chapters:
+        print(f"  {chapter['chapter']:<12} {chapter['flagged_verses']:>4} verses  score {chapter['total_score']}")
+
+    print("\nMost suspicious verses:")
+    for record in verses:
+        reasons = ", ".join(record["reasons"]) or "statistical outlier"
+        print(f"\n  {record['book']} {record['chapter']}:{record['verse']} (score {record['score']}) - {reasons}")
+        print(f"    {record['text'][:160]}")
+
+
+if __name__ == "__main__":
+    main()
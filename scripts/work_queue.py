@@ -0,0 +1,489 @@
+import argparse
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, NamedTuple, Optional
+
+import requests
+
+import sources
+from bible_io import dump_json, load_bible_json
+from bible_shards import Bible, is_sharded, write_bible
+from crawl_plan import load_index, pending_tasks, print_plan_summary
+from fetch import Fetcher
+from metrics import get_metrics
+from progress import Progress, setup_logging
+
+# Work-queue mode for crawling one source from several machines at once.
+#
+# A coordinator enqueues one task per (source, translation, osis, chapter) into
+# a SQLite database and serves it over HTTP. Workers, as local processes or on
+# other hosts, lease a few tasks at a time, fetch and parse the pages with the
+# source's own parser and post the verses back. A lease that is not completed
+# in time (a worker died or lost its connection) expires and the task is handed
+# out again; failed tasks are retried with a delay up to --max-attempts. Each
+# worker keeps the source's politeness delay, so every machine added brings
+# its own per-client budget. Finished chapters are merged into the usual
+# {osis: {title, chapters}} file:
+#
+#   python3 scripts/work_queue.py enqueue gratis
+#   python3 scripts/work_queue.py serve --host 0.0.0.0 --port 8700       # no authentication: trusted networks only
+#   python3 scripts/work_queue.py work --queue http://coordinator:8700   # on every worker machine
+#   python3 scripts/work_queue.py merge gratis --output data/bible_fr.json
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "queue.db")
+
+logger = logging.getLogger("work_queue")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    osis TEXT NOT NULL,
+    chapter INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',  -- pending, leased, done or failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,   -- pending: earliest retry; leased: lease expiry
+    worker TEXT,
+    error TEXT,
+    result TEXT,                            -- JSON {verse: text} once done
+    updated REAL,
+    UNIQUE (source, translation, osis, chapter)
+);
+CREATE INDEX IF NOT EXISTS tasks_available ON tasks (state, available_at);
+"""
+
+
+class QueueTask(NamedTuple):
+    id: int
+    source: str
+    translation: str
+    osis: str
+    chapter: int
+    url: str
+    attempts: int
+
+
+class WorkQueue:
+    """Durable task queue in a SQLite file, safe to share between threads and local processes."""
+
+    def __init__(self, path: str = DEFAULT_DB, max_attempts: int = 5, retry_delay: float = 60.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def enqueue(self, source: str, translation: str, tasks) -> int:
+        """Add crawl tasks; chapters already queued are left as they are. Returns the number added."""
+        with self._lock:
+            before = self._db.total_changes
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.executemany(
+                "INSERT OR IGNORE INTO tasks (source, translation, osis, chapter, url, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                [(source, translation, task.osis, task.chapter, task.url, time.time()) for task in tasks],
+            )
+            self._db.execute("COMMIT")
+            return self._db.total_changes - before
+
+    def lease(self, worker: str, limit: int = 5, lease_seconds: float = 300.0,
+              source: Optional[str] = None) -> List[QueueTask]:
+        """
+        Hand out up to `limit` tasks to a worker until now + lease_seconds.
+
+        Pending tasks whose retry delay has passed and leased tasks whose lease
+        expired are both eligible. Expired leases that used up their attempts
+        are marked failed instead.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "UPDATE tasks SET state = 'failed', error = 'lease expired', worker = NULL, updated = ? "
+                    "WHERE state = 'leased' AND available_at <= ? AND attempts >= ?",
+                    (now, now, self.max_attempts),
+                )
+                query = ("SELECT id, source, translation, osis, chapter, url, attempts FROM tasks "
+                         "WHERE state IN ('pending', 'leased') AND available_at <= ?")
+                params: list = [now]
+                if source:
+                    query += " AND source = ?"
+                    params.append(source)
+                rows = self._db.execute(query + " ORDER BY id LIMIT ?", params + [limit]).fetchall()
+                self._db.executemany(
+                    "UPDATE tasks SET state = 'leased', worker = ?, attempts = attempts + 1, "
+                    "available_at = ?, updated = ? WHERE id = ?",
+                    [(worker, now + lease_seconds, now, row[0]) for row in rows],
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return [QueueTask(*row[:6], attempts=row[6] + 1) for row in rows]
+
+    def complete(self, task_id: int, worker: str, verses: Dict[str, str]) -> bool:
+        """
+        Store a task's verses. A result that arrives after the lease expired is
+        still accepted as long as nobody else finished the task first.
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE tasks SET state = 'done', result = ?, worker = ?, error = NULL, updated = ? "
+                "WHERE id = ? AND state != 'done'",
+                (json.dumps(verses, ensure_ascii=False), worker, time.time(), task_id),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, task_id: int, worker: str, error: str) -> bool:
+        """Give a task back for a delayed retry, or mark it failed once it is out of attempts."""
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "available_at = ?, worker = NULL, error = ?, updated = ? "
+                "WHERE id = ? AND state = 'leased' AND worker = ?",
+                (self.max_attempts, now + self.retry_delay, error, now, task_id, worker),
+            )
+            return cursor.rowcount == 1
+
+    def retry_failed(self, source: Optional[str] = None) -> int:
+        """Put failed tasks back in the queue with a fresh set of attempts."""
+        query = "UPDATE tasks SET state = 'pending', attempts = 0, available_at = 0, updated = ? WHERE state = 'failed'"
+        params: list = [time.time()]
+        if source:
+            query += " AND source = ?"
+            params.append(source)
+        with self._lock:
+            return self._db.execute(query, params).rowcount
+
+    def status(self) -> Dict[str, Dict[str, int]]:
+        """Task counts per state, by 'source/translation'."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT source, translation, state, COUNT(*) FROM tasks GROUP BY source, translation, state"
+            ).fetchall()
+        counts: Dict[str, Dict[str, int]] = {}
+        for source, translation, state, count in rows:
+            counts.setdefault(f"{source}/{translation}", {})[state] = count
+        return counts
+
+    def results(self, source: str, translation: str) -> List[tuple]:
+        """(osis, chapter, verses) of every finished task of a source, in crawl order."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT osis, chapter, result FROM tasks WHERE source = ? AND translation = ? AND state = 'done' "
+                "ORDER BY id", (source, translation),
+            ).fetchall()
+        return [(osis, chapter, json.loads(result)) for osis, chapter, result in rows]
+
+    def failures(self, source: str, translation: str) -> List[tuple]:
+        """(osis, chapter, last error) of every task that ran out of attempts."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT osis, chapter, error FROM tasks WHERE source = ? AND translation = ? AND state = 'failed' "
+                "ORDER BY id", (source, translation),
+            ).fetchall()
+
+
+class RemoteQueue:
+    """Client for a queue served by `work_queue.py serve`, with the worker-facing WorkQueue methods."""
+
+    def __init__(self, url: str, timeout: float = 30):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _post(self, path: str, payload: Dict):
+        response = self.session.post(self.url + path, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def lease(self, worker: str, limit: int = 5, lease_seconds: float = 300.0,
+              source: Optional[str] = None) -> List[QueueTask]:
+        tasks = self._post("/lease", {"worker": worker, "limit": limit, "lease_seconds": lease_seconds,
+                                      "source": source})
+        return [QueueTask(**task) for task in tasks]
+
+    def complete(self, task_id: int, worker: str, verses: Dict[str, str]) -> bool:
+        return self._post("/complete", {"id": task_id, "worker": worker, "verses": verses})["ok"]
+
+    def fail(self, task_id: int, worker: str, error: str) -> bool:
+        return self._post("/fail", {"id": task_id, "worker": worker, "error": error})["ok"]
+
+    def status(self) -> Dict[str, Dict[str, int]]:
+        response = self.session.get(self.url + "/status", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+def serve(queue: WorkQueue, host: str = "127.0.0.1", port: int = 8700):
+    """
+    Expose a queue to remote workers as a small JSON API until interrupted.
+
+    The API has no authentication: anyone who can reach it can lease, complete
+    and fail tasks. It listens on the loopback interface unless `host` says
+    otherwise (e.g. "0.0.0.0" on a trusted network).
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, payload, status: int = 200):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/status":
+                self._reply(queue.status())
+            else:
+                self._reply({"error": "not found"}, 404)
+
+        def do_POST(self):
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path == "/lease":
+                    tasks = queue.lease(request["worker"], int(request.get("limit", 5)),
+                                        float(request.get("lease_seconds", 300)), request.get("source"))
+                    self._reply([task._asdict() for task in tasks])
+                elif self.path == "/complete":
+                    self._reply({"ok": queue.complete(int(request["id"]), request["worker"], request["verses"])})
+                elif self.path == "/fail":
+                    self._reply({"ok": queue.fail(int(request["id"]), request["worker"], str(request["error"]))})
+                else:
+                    self._reply({"error": "not found"}, 404)
+            except (KeyError, ValueError, TypeError) as e:
+                self._reply({"error": f"bad request: {e}"}, 400)
+
+        def log_message(self, format, *args):
+            logger.debug("%s - %s", self.address_string(), format % args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    logger.info("Serving %s on http://%s:%d", queue.path, host, port)
+    if host not in ("127.0.0.1", "localhost", "::1"):
+        logger.warning("The queue API has no authentication; anyone who can reach %s:%d can change the queue",
+                       host, port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def run_worker(queue, worker: str, source: Optional[str] = None, batch: int = 5, lease_seconds: float = 300.0,
+               poll: float = 10.0):
+    """
+    Lease, fetch, parse and report tasks until the queue has nothing left to hand out.
+
+    Args:
+        queue: A WorkQueue or RemoteQueue.
+        worker: Name recorded on leased tasks.
+        source: Only take tasks of this source.
+        batch: Tasks leased at a time; keep batch * (delay + fetch time) well under lease_seconds.
+        lease_seconds: How long a task stays with this worker before it is handed out again.
+        poll: Seconds to wait when tasks are only held by other workers or waiting for a retry.
+    """
+    # Every page is fetched once, so there is nothing worth caching
+    fetcher = Fetcher(max_cache_bytes=0)
+    metrics = get_metrics()
+    progress = Progress(0, label="chapters", logger=logger)
+    last_request: Dict[str, float] = {}
+
+    while True:
+        tasks = queue.lease(worker, batch, lease_seconds, source)
+        if not tasks:
+            remaining = sum(counts.get("pending", 0) + counts.get("leased", 0)
+                            for name, counts in queue.status().items()
+                            if source is None or name.startswith(f"{source}/"))
+            if not remaining:
+                break
+            time.sleep(poll)
+            continue
+
+        progress.total += len(tasks)
+        for task in tasks:
+            # Politeness delay per source host, counted from this worker's previous request
+            delay = sources.plan_delay(task.source) - (time.monotonic() - last_request.get(task.source, 0))
+            if delay > 0:
+                time.sleep(delay)
+            last_request[task.source] = time.monotonic()
+
+            logger.debug("Fetching %s %s (attempt %d): %s", task.osis, task.chapter, task.attempts, task.url)
+            try:
+                page = fetcher.get_text(task.url, encoding=sources.SOURCES[task.source]["encoding"])
+            except requests.exceptions.RequestException as e:
+                queue.fail(task.id, worker, f"{type(e).__name__}: {e}")
+                progress.advance(failed=True)
+                continue
+            try:
+                with metrics.time_parse(task.source):
+                    verses = sources.parse_page(task.source, page, task.osis, task.chapter, task.translation)
+            except Exception as e:
+                # A page the parser does not understand fails this task, not the worker
+                logger.warning("Parsing %s %s failed: %s: %s", task.osis, task.chapter, type(e).__name__, e)
+                queue.fail(task.id, worker, f"{type(e).__name__}: {e}")
+                progress.advance(failed=True)
+                continue
+
+            if not verses:
+                queue.fail(task.id, worker, "no verses found")
+                progress.advance(failed=True)
+                continue
+            if not queue.complete(task.id, worker, verses):
+                logger.debug("%s %s was already finished by another worker", task.osis, task.chapter)
+            progress.advance()
+
+    progress.finish()
+    metrics.report(f"work_queue_{worker}")
+
+
+def _sort_chapters(book: Dict) -> Dict:
+    chapters = book["chapters"]
+    return dict(book, chapters={
+        chapter: chapters[chapter]
+        for chapter in sorted(chapters, key=lambda chapter: (not chapter.isdigit(), int(chapter) if chapter.isdigit() else 0, chapter))
+    })
+
+
+def merge_chapters(source: str, results: List[tuple], output: str) -> Dict:
+    """
+    Merge (osis, chapter, verses) results into a {osis: {title, chapters}}
+    file, or into a per-book shard directory (see bible_shards.py) when
+    `output` is a directory or ends with a path separator.
+
+    Chapters already in the output are replaced by the new version, books
+    and chapters come out in canonical order, and titles are looked up only
+    for books the output does not have yet. In a shard directory only the
+    books that received chapters are read and rewritten.
+    """
+    sharded = os.path.isdir(output) or output.endswith(("/", os.sep))
+    touched = {osis for osis, _, _ in results}
+
+    bible_data = {}
+    if sharded and is_sharded(output):
+        existing = Bible(output)
+        bible_data = {osis: existing[osis] for osis in touched if osis in existing}
+    elif not sharded and os.path.exists(output):
+        bible_data = load_bible_json(output)
+
+    new_books = sorted(touched - set(bible_data))
+    titles = sources.book_titles(source, new_books) if new_books else {}
+    for osis, chapter, verses in results:
+        book = bible_data.setdefault(osis, {"title": titles.get(osis, osis), "chapters": {}})
+        book["chapters"][str(chapter)] = verses
+
+    order = {book["osis"]: i for i, book in enumerate(load_index())}
+    merged = {osis: _sort_chapters(bible_data[osis])
+              for osis in sorted(bible_data, key=lambda osis: order.get(osis, len(order)))}
+
+    with get_metrics().time_checkpoint(source):
+        if sharded:
+            write_bible(output, merged)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+            dump_json(merged, output)
+    return merged
+
+
+def merge(queue: WorkQueue, source: str, translation: str, output: str) -> Dict:
+    """Merge every finished chapter of a source in the queue into its output (see merge_chapters)."""
+    results = queue.results(source, translation)
+    merged = merge_chapters(source, results, output)
+    for osis, chapter, error in queue.failures(source, translation):
+        logger.warning("%s %s failed: %s", osis, chapter, error)
+    logger.info("Merged %d chapters into %s", len(results), output)
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl a source from several workers through a shared task queue.')
+    parser.add_argument('--db', type=str, default=DEFAULT_DB, help='SQLite queue file (default: data/queue.db)')
+    parser.add_argument('--verbose', action='store_true', help='Log every chapter')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue_parser = commands.add_parser('enqueue', help='Queue every chapter of a source')
+    enqueue_parser.add_argument('source', choices=list(sources.SOURCES))
+    enqueue_parser.add_argument('--translation', type=str, help="Version/edition (defaults to the source's)")
+    enqueue_parser.add_argument('--books', nargs='+', help='OSIS codes to queue (default: all)')
+    enqueue_parser.add_argument('--skip-existing', type=str, metavar='FILE',
+                                help='Leave out chapters already present in this output file')
+    enqueue_parser.add_argument('--retry-failed', action='store_true', help='Also requeue tasks that ran out of attempts')
+
+    serve_parser = commands.add_parser('serve', help='Serve the queue to remote workers')
+    serve_parser.add_argument('--host', type=str, default='127.0.0.1',
+                              help='Address to listen on (default: 127.0.0.1; use 0.0.0.0 for remote workers '
+                                   'on a trusted network, the API has no authentication)')
+    serve_parser.add_argument('--port', type=int, default=8700)
+    serve_parser.add_argument('--max-attempts', type=int, default=5, help='Attempts per task before it fails')
+    serve_parser.add_argument('--retry-delay', type=float, default=60.0, help='Seconds before a failed task is retried')
+
+    work_parser = commands.add_parser('work', help='Work through queued tasks')
+    work_parser.add_argument('--queue', type=str, help='Coordinator URL; without it the local --db is used')
+    work_parser.add_argument('--worker', type=str, default=f"{socket.gethostname()}-{os.getpid()}",
+                             help='Worker name (default: host-pid)')
+    work_parser.add_argument('--source', choices=list(sources.SOURCES), help='Only take tasks of this source')
+    work_parser.add_argument('--batch', type=int, default=5, help='Tasks leased at a time')
+    work_parser.add_argument('--lease', type=float, default=300.0, help='Lease duration in seconds')
+
+    merge_parser = commands.add_parser('merge', help='Write finished chapters to the JSON output')
+    merge_parser.add_argument('source', choices=list(sources.SOURCES))
+    merge_parser.add_argument('--translation', type=str, help="Version/edition (defaults to the source's)")
+    merge_parser.add_argument('--output', type=str, required=True, help='JSON file or shard directory to merge into')
+
+    commands.add_parser('status', help='Show task counts')
+    args = parser.parse_args()
+
+    setup_logging(f"work_queue_{args.command}", level="DEBUG" if args.verbose else None)
+
+    if args.command == 'work' and args.queue:
+        run_worker(RemoteQueue(args.queue), args.worker, args.source, args.batch, args.lease)
+        return
+
+    if args.command == 'serve':
+        queue = WorkQueue(args.db, max_attempts=args.max_attempts, retry_delay=args.retry_delay)
+    else:
+        queue = WorkQueue(args.db)
+    try:
+        if args.command == 'enqueue':
+            translation = args.translation or sources.SOURCES[args.source]["translation"]
+            plan = sources.source_plan(args.source, translation, args.books)
+            if args.skip_existing and os.path.exists(args.skip_existing):
+                plan = pending_tasks(plan, load_bible_json(args.skip_existing))
+            print_plan_summary(sources.SOURCES[args.source]["plan"], plan)
+            added = queue.enqueue(args.source, translation, plan)
+            if args.retry_failed:
+                added += queue.retry_failed(args.source)
+            logger.info("Queued %d new tasks for %s/%s", added, args.source, translation)
+        elif args.command == 'serve':
+            serve(queue, args.host, args.port)
+        elif args.command == 'work':
+            run_worker(queue, args.worker, args.source, args.batch, args.lease)
+        elif args.command == 'merge':
+            translation = args.translation or sources.SOURCES[args.source]["translation"]
+            merge(queue, args.source, translation, args.output)
+        elif args.command == 'status':
+            for name, counts in sorted(queue.status().items()):
+                print(f"{name}: " + ", ".join(f"{counts.get(state, 0)} {state}"
+                                              for state in ("pending", "leased", "done", "failed")))
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()